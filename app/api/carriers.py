@@ -1,7 +1,16 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from typing import List
-from app.models.carrier import Carrier
-from app.services.carrier_service import get_all_carriers
+from app.api.responses import (
+    adapter_response,
+    cache_response,
+    cached_response,
+    is_not_modified,
+    not_modified_response,
+    snapshot_etag,
+    with_etag
+)
+from app.models.carrier import Carrier, CarrierListAdapter
+from app.services.carrier_service import get_all_carriers_async, get_carriers_snapshot_async
 
 router = APIRouter(
     prefix="/carriers",
@@ -12,14 +21,28 @@ router = APIRouter(
     "",
     response_model=List[Carrier],
     summary="List all carriers",
-    description="Fetch a list of all available carriers from the mock API."
+    description="Fetch a list of all available carriers from the mock API. "
+                "Responses carry an `ETag`; send it back in `If-None-Match` to get `304 Not Modified` while the list is unchanged.",
+    responses={304: {"description": "Carriers unchanged since the given ETag"}}
 )
-def list_carriers():
+async def list_carriers(request: Request):
     """
     Retrieve all carriers from the mock API.
     Returns a list of `Carrier` objects.
     """
     try:
-        return get_all_carriers()
+        snapshot = await get_carriers_snapshot_async()
+        etag = snapshot_etag(request, snapshot.key)
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        cached = cached_response(request, etag)
+        if cached is not None:
+            return cached
+        return await cache_response(
+            request,
+            etag,
+            lambda: get_all_carriers_async(snapshot.value),
+            lambda carriers: with_etag(adapter_response(CarrierListAdapter, carriers), etag)
+        )
     except Exception:
         raise HTTPException(status_code=500, detail="Internal Server Error")
@@ -0,0 +1,22 @@
+from fastapi import APIRouter
+from app.api.responses import model_response
+from app.models.health import HealthStatus
+from app.services.health_service import get_health
+
+router = APIRouter(
+    prefix="/health",
+    tags=["Health"]
+)
+
+@router.get(
+    "",
+    response_model=HealthStatus,
+    summary="Service health",
+    description="Report the circuit breaker state of each upstream endpoint. "
+                "While a circuit is open, calls to that endpoint fail fast and cached data is served where available."
+)
+async def health():
+    """
+    Returns `HealthStatus`; always 200 so it can be polled while the upstream is degraded.
+    """
+    return model_response(get_health())
@@ -0,0 +1,57 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.api.responses import response_cache
+from app.services.carrier_service import carrier_cache
+from app.services.metrics import MetricFamily, registry
+from app.services.package_events import package_events
+from app.services.package_service import city_cache, tracking_cache
+
+# Prometheus text exposition format
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"]
+)
+
+
+def _cache_metrics():
+    """
+    Scrape-time view of the caches' own counters, so reads on the hot path record nothing extra.
+    """
+    snapshots = {"tracking": tracking_cache.stats(), "carriers": carrier_cache.stats()}
+    caches = {"city": city_cache.stats(), "responses": response_cache.stats()}
+
+    requests = [({"cache": name, "result": "hit"}, stats["hits"]) for name, stats in {**snapshots, **caches}.items()]
+    requests += [({"cache": name, "result": "stale"}, stats["stale_hits"]) for name, stats in snapshots.items()]
+    requests += [({"cache": name, "result": "miss"}, stats["misses"]) for name, stats in {**snapshots, **caches}.items()]
+    yield MetricFamily("cache_requests_total", "counter", "Cache reads by cache and result (hit, stale or miss).", requests)
+    yield MetricFamily("cache_entries", "gauge", "Entries held per cache.", [({"cache": name}, stats["size"]) for name, stats in caches.items()])
+    yield MetricFamily("cache_bytes", "gauge", "Encoded bytes held by the response cache.", [({"cache": "responses"}, caches["responses"]["bytes"])])
+    yield MetricFamily(
+        "snapshot_age_seconds", "gauge", "Age of the current upstream snapshot.",
+        [({"snapshot": name}, stats["age_seconds"]) for name, stats in snapshots.items()]
+    )
+    yield MetricFamily(
+        "snapshot_version", "gauge", "Version of the current upstream snapshot; it changes whenever the data does.",
+        [({"snapshot": name}, stats["version"]) for name, stats in snapshots.items()]
+    )
+    # Long-lived streams are kept out of the HTTP in-flight gauge and counted here instead
+    yield MetricFamily("stream_subscribers", "gauge", "Open /packages/stream subscriptions.", [({}, len(package_events))])
+
+
+registry.add_collector(_cache_metrics)
+
+
+@router.get(
+    "",
+    response_class=PlainTextResponse,
+    summary="Prometheus metrics",
+    description="Request and upstream latency histograms, status counters, payload sizes, "
+                "in-flight gauges and cache statistics in the Prometheus text format."
+)
+async def metrics():
+    """
+    Render every registered metric for a Prometheus scrape.
+    """
+    return PlainTextResponse(registry.render(), media_type=METRICS_MEDIA_TYPE)
@@ -0,0 +1,184 @@
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import random
+import threading
+import time
+import uuid
+from typing import Optional
+from starlette.datastructures import MutableHeaders
+from app import config
+from app.services.metrics import http_in_flight, http_request_duration, http_requests, http_response_size
+from app.services.profiling import RequestProfile, start_profile, stop_profile
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency, status, response size and in-flight count per route.
+
+    Requests are labelled with the matched route template (e.g. `/packages/{tracking_id}`), which
+    the router leaves in the scope, so label cardinality stays bounded; unmatched paths share one label.
+    A streamed response is timed until its last chunk is sent. Server-Sent Event streams stay open
+    for as long as the client listens, so they leave the in-flight gauge once their headers are sent
+    and are left out of the duration histogram; `stream_subscribers` counts them instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        size = 0
+        in_flight = http_in_flight.labels()
+        event_stream = False
+
+        async def send_and_record(message):
+            nonlocal status, size, event_stream
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if _is_event_stream(message):
+                    event_stream = True
+                    in_flight.dec()
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_record)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            if not event_stream:
+                in_flight.dec()
+                http_request_duration.labels(route, scope["method"]).observe(elapsed)
+            http_requests.labels(route, scope["method"], status).inc()
+            http_response_size.labels(route).observe(size)
+
+
+def _is_event_stream(message) -> bool:
+    for name, value in message.get("headers", ()):
+        if name.lower() == b"content-type":
+            return value.split(b";")[0].strip().lower() == b"text/event-stream"
+    return False
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware that profiles single requests on demand.
+
+    A request is profiled when it carries the `header` (any value) or is picked at `sample_rate`.
+    Its upstream I/O, validation and serialization times go in a `Server-Timing` response header.
+    A report is written to `report_dir`, named in the `X-Profile-Report` header: the phase totals
+    plus a cProfile listing by cumulative time with each function's callees, and a `.prof` file
+    for pstats or snakeviz. Only the newest `max_reports` reports are kept, so clients sending the
+    header cannot fill the disk.
+
+    cProfile traces the event loop thread, so work for other requests running concurrently can show
+    up in the listing; only one request is traced at a time, and others still get phase timings.
+    Headers are sent before a streamed body is written, so `Server-Timing` omits work done while
+    streaming; the report covers the whole request.
+    """
+
+    def __init__(
+            self,
+            app,
+            header: str = config.PROFILING_HEADER,
+            sample_rate: float = config.PROFILING_SAMPLE_RATE,
+            report_dir: str = config.PROFILING_DIR,
+            top: int = config.PROFILING_TOP_FUNCTIONS,
+            max_reports: int = config.PROFILING_MAX_REPORTS
+    ):
+        self.app = app
+        self.header = header.lower().encode("latin-1")
+        self.sample_rate = sample_rate
+        self.report_dir = report_dir
+        self.top = top
+        self.max_reports = max_reports
+        self._tracing = threading.Lock()  # One cProfile trace at a time
+
+    def _wanted(self, scope) -> bool:
+        if any(name == self.header for name, _ in scope["headers"]):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        report_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        profile = start_profile()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("Server-Timing", profile.server_timing())
+                headers.append("X-Profile-Report", report_id)
+            await send(message)
+
+        profiler = cProfile.Profile() if self._tracing.acquire(blocking=False) else None
+        try:
+            if profiler is not None:
+                profiler.enable()
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._tracing.release()
+            stop_profile(profile)
+            report = f"{scope['method']} {scope['path']} -> {status}"
+            await asyncio.to_thread(self.write_report, report_id, report, profile, profiler)
+
+    def write_report(self, report_id: str, title: str, profile: RequestProfile, profiler: Optional[cProfile.Profile]) -> str:
+        """
+        Write `<report_id>.txt` (and `<report_id>.prof` when traced) to the report directory and return the text path.
+        """
+        os.makedirs(self.report_dir, exist_ok=True)
+        path = os.path.join(self.report_dir, report_id)
+
+        out = io.StringIO()
+        out.write(f"{title}\ntotal {profile.elapsed() * 1000:.2f} ms\n\n")
+        for name, seconds in sorted(profile.phases.items(), key=lambda item: -item[1]):
+            out.write(f"{name:16} {seconds * 1000:10.2f} ms  ({profile.calls[name]} calls)\n")
+        if profiler is not None:
+            profiler.dump_stats(path + ".prof")
+            stats = pstats.Stats(profiler, stream=out)
+            stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top)
+            stats.print_callees(self.top)
+        else:
+            out.write("\n(not traced: another request was being traced)\n")
+
+        with open(path + ".txt", "w") as f:
+            f.write(out.getvalue())
+        self.prune_reports()
+        return path + ".txt"
+
+    def prune_reports(self):
+        """
+        Delete the oldest reports (their `.txt` and `.prof` files) beyond `max_reports`.
+        """
+        reports = []
+        for entry in os.scandir(self.report_dir):
+            if entry.name.endswith(".txt"):
+                try:
+                    reports.append((entry.stat().st_mtime_ns, entry.path[:-len(".txt")]))
+                except FileNotFoundError:  # Pruned by a concurrent request
+                    pass
+        reports.sort()
+        for _, path in reports[:max(0, len(reports) - self.max_reports)]:
+            for suffix in (".txt", ".prof"):
+                try:
+                    os.remove(path + suffix)
+                except FileNotFoundError:
+                    pass
@@ -1,12 +1,42 @@
-from fastapi import APIRouter, HTTPException, Query
-from typing import List, Optional
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, Iterable, List, Optional
 
-from app.models.package import Package, SortBy, PackageStatus
-from app.models.enriched_package import EnrichedPackage
+from app import config
+from app.models.package import Package, PackageChanges, PackageListAdapter, SortBy, PackageStatus
+from app.models.enriched_package import (
+    EnrichedPackage,
+    EnrichmentRequest,
+    EnrichmentResult,
+    EnrichmentResultListAdapter
+)
+from app.api.responses import (
+    JSON_MEDIA_TYPE,
+    adapter_response,
+    cache_response,
+    cached_response,
+    is_not_modified,
+    model_response,
+    not_modified_response,
+    snapshot_etag,
+    with_etag
+)
+from app.services.change_log import InvalidSyncTokenError
+from app.services.geo_index import InvalidLocationError
+from app.services.package_events import Subscription, package_events
+from app.services.pagination import InvalidCursorError
 from app.services.package_service import (
-    get_all_packages,
-    get_package_by_tracking_id,
-    get_enriched_package
+    get_tracking_snapshot_async,
+    get_changes_async,
+    get_warm_tracking_key,
+    get_all_packages_async,
+    iter_packages_async,
+    get_packages_page_async,
+    get_packages_near_async,
+    get_package_by_tracking_id_async,
+    get_enriched_package_async,
+    get_enriched_packages_async
 )
 
 router = APIRouter(
@@ -14,13 +44,56 @@ router = APIRouter(
     tags=["Packages"]
 )
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+SSE_MEDIA_TYPE = "text/event-stream"
+
+
+def _wants_ndjson(request: Request, stream: bool) -> bool:
+    return stream or NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+async def _ndjson_lines(packages: Iterable[Package]) -> AsyncIterator[bytes]:
+    """
+    Encode packages as newline-delimited JSON, a batch of lines per chunk.
+    """
+    batch = []
+    for pkg in packages:
+        batch.append(pkg.model_dump_json())
+        if len(batch) == config.NDJSON_CHUNK_SIZE:
+            yield ("\n".join(batch) + "\n").encode()
+            batch = []
+    if batch:
+        yield ("\n".join(batch) + "\n").encode()
+
+def _with_page_headers(response: Response, request: Request, next_cursor: Optional[str], etag: str) -> Response:
+    """
+    Link to the next page, if any, and attach the validator. The link is relative (path and query only):
+    the response is cached and replayed to clients that may have reached this service under another host.
+    """
+    if next_cursor:
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        response.headers["X-Next-Cursor"] = next_cursor
+        response.headers["Link"] = f'<{next_url.path}?{next_url.query}>; rel="next"'
+    return with_etag(response, etag)
+
+
 @router.get(
     "",
     response_model=List[Package],
     summary="List packages",
-    description="Retrieve a list of all packages with optional filtering by status and sorting by ETA or last updated time."
+    description="Retrieve a list of all packages with optional filtering by status and sorting by ETA or last updated time. "
+                "Pass `limit` (and then `cursor`) to page through results; the next page's cursor is returned "
+                "in the `X-Next-Cursor` header and a `Link: rel=\"next\"` header. "
+                "Send `Accept: application/x-ndjson` or `stream=true` to receive one package per line, streamed as it is encoded. "
+                "Responses carry an `ETag`; send it back in `If-None-Match` to get `304 Not Modified` while the result is unchanged.",
+    responses={
+        200: {"content": {NDJSON_MEDIA_TYPE: {}}},
+        304: {"description": "Result unchanged since the given ETag"},
+        400: {"description": "Invalid cursor"}
+    }
 )
-def list_packages(
+async def list_packages(
+        request: Request,
         status: Optional[PackageStatus] = Query(
             None,
             description="Filter packages by status.",
@@ -30,16 +103,291 @@ def list_packages(
             None,
             description="Sort by 'eta' (ascending) or 'last_updated' (descending).",
             example="eta"
+        ),
+        limit: Optional[int] = Query(
+            None,
+            ge=1,
+            le=config.PAGE_MAX_LIMIT,
+            description="Maximum number of packages to return. Enables pagination."
+        ),
+        cursor: Optional[str] = Query(
+            None,
+            description="Opaque cursor from a previous page's `X-Next-Cursor` header."
+        ),
+        stream: bool = Query(
+            False,
+            description="Stream the result as newline-delimited JSON (same as `Accept: application/x-ndjson`)."
         )
 ):
     """
     Returns a list of packages optionally filtered by status and sorted by ETA or last updated timestamp.
+    When `limit` or `cursor` is given, returns a single page and links to the next one.
+    """
+    ndjson = _wants_ndjson(request, stream)
+
+    try:
+        snapshot = await get_tracking_snapshot_async()
+        etag = snapshot_etag(request, snapshot.key, NDJSON_MEDIA_TYPE if ndjson else JSON_MEDIA_TYPE)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    # Encoded JSON bodies are cached per snapshot version; NDJSON stays streamed and uncached
+    if not ndjson:
+        cached = cached_response(request, etag)
+        if cached is not None:
+            return cached
+
+    if limit is None and cursor is None:
+        try:
+            if ndjson:
+                response = StreamingResponse(
+                    _ndjson_lines(await iter_packages_async(status=status, sort_by=sort, snapshot=snapshot.value)),
+                    media_type=NDJSON_MEDIA_TYPE
+                )
+                return with_etag(response, etag)
+            return await cache_response(
+                request,
+                etag,
+                lambda: get_all_packages_async(status=status, sort_by=sort, snapshot=snapshot.value),
+                lambda packages: with_etag(adapter_response(PackageListAdapter, packages), etag)
+            )
+        except Exception:
+            raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    def load_page():
+        return get_packages_page_async(
+            status=status,
+            sort_by=sort,
+            limit=limit or config.PAGE_DEFAULT_LIMIT,
+            cursor=cursor,
+            snapshot=snapshot.value
+        )
+
+    try:
+        if ndjson:
+            packages, next_cursor = await load_page()
+            response = StreamingResponse(_ndjson_lines(packages), media_type=NDJSON_MEDIA_TYPE)
+            return _with_page_headers(response, request, next_cursor, etag)
+        return await cache_response(
+            request,
+            etag,
+            load_page,
+            lambda page: _with_page_headers(adapter_response(PackageListAdapter, page[0]), request, page[1], etag)
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.get(
+    "/changes",
+    response_model=PackageChanges,
+    summary="Package change feed",
+    description="Return only the packages added, updated or removed since `since`, plus a `token` for the next poll. "
+                "`since` is a sync token from a previous poll, or an ISO-8601 timestamp "
+                "(e.g. `2025-06-12T09:30:00Z`) matched against `last_updated` and the times this service saw packages change. "
+                "Without `since`, or when it is too old to diff from, all packages are returned with `reset: true`. "
+                "Responses carry an `ETag`; send it back in `If-None-Match` to get `304 Not Modified` while nothing has changed.",
+    responses={
+        304: {"description": "No new snapshot since the given ETag"},
+        400: {"description": "Invalid sync token or timestamp"}
+    }
+)
+async def list_package_changes(
+        request: Request,
+        since: Optional[str] = Query(
+            None,
+            description="Sync token from the previous poll, or an ISO-8601 timestamp."
+        )
+):
+    """
+    Returns a `PackageChanges` delta; cost scales with the number of changes when polling with a token.
+    """
+    try:
+        snapshot = await get_tracking_snapshot_async()
+        etag = snapshot_etag(request, snapshot.key)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    if is_not_modified(request, etag):
+        return not_modified_response(etag)
+
+    cached = cached_response(request, etag)
+    if cached is not None:
+        return cached
+
+    try:
+        return await cache_response(
+            request,
+            etag,
+            lambda: get_changes_async(since, snapshot=snapshot.value),
+            lambda changes: with_etag(model_response(changes), etag)
+        )
+    except InvalidSyncTokenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+@router.get(
+    "/near",
+    response_model=List[Package],
+    summary="List packages near a point",
+    description="Retrieve the packages whose current city is within `radius_km` of a point, using city coordinates "
+                "from the location metadata. Optionally filter by status and sort by ETA or last updated time; "
+                "without a sort, packages in the nearest cities come first. "
+                "Packages in cities with no known coordinates are not returned.",
+    responses={
+        400: {"description": "Invalid location"}
+    }
+)
+async def list_packages_near(
+        lat: float = Query(
+            ...,
+            ge=-90,
+            le=90,
+            description="Latitude of the point, in degrees.",
+            example=39.9526
+        ),
+        lon: float = Query(
+            ...,
+            ge=-180,
+            le=180,
+            description="Longitude of the point, in degrees.",
+            example=-75.1652
+        ),
+        radius_km: float = Query(
+            ...,
+            ge=0,
+            le=config.GEO_MAX_RADIUS_KM,
+            description="Search radius in kilometres.",
+            example=50
+        ),
+        status: Optional[PackageStatus] = Query(
+            None,
+            description="Filter packages by status.",
+            example="In Transit"
+        ),
+        sort: Optional[SortBy] = Query(
+            None,
+            description="Sort by 'eta' (ascending) or 'last_updated' (descending) instead of by distance.",
+            example="eta"
+        )
+):
+    """
+    Returns the packages within the radius, answered from a geo index over the current snapshot.
     """
     try:
-        return get_all_packages(status=status, sort_by=sort)
+        packages = await get_packages_near_async(lat, lon, radius_km, status=status, sort_by=sort)
+    except InvalidLocationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
+    return adapter_response(PackageListAdapter, packages)
+
+
+async def _sse_events(request: Request, subscription: Subscription) -> AsyncIterator[bytes]:
+    """
+    Send a subscription's events as they arrive, everything already queued in one chunk,
+    with a comment line on idle connections so proxies keep them open and disconnects are noticed.
+    """
+    yield b": subscribed\n\n"
+    while not await request.is_disconnected():
+        try:
+            event = await asyncio.wait_for(subscription.get(), config.SSE_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            yield b": keep-alive\n\n"
+            continue
+        chunk = [event.encode()]
+        while not subscription.queue.empty():
+            chunk.append(subscription.queue.get_nowait().encode())
+        yield b"".join(chunk)
+
+
+class _EventStreamResponse(StreamingResponse):
+    """
+    SSE response that owns its subscription and unsubscribes however the response ends: after the
+    stream, on a disconnect or cancellation, or when sending fails before the body iterator ever started
+    (where neither the generator's cleanup nor a background task would run).
+    """
+
+    def __init__(self, request: Request, subscription: Subscription):
+        super().__init__(
+            _sse_events(request, subscription),
+            media_type=SSE_MEDIA_TYPE,
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+        self.subscription = subscription
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            package_events.unsubscribe(self.subscription)
+
+
+@router.get(
+    "/stream",
+    summary="Stream package updates",
+    description="Subscribe to package changes as Server-Sent Events instead of polling. "
+                "Filter by any mix of `tracking_id`, `status` and `carrier` (each repeatable); with no filter every change is sent. "
+                "An `update` event carries the package as JSON whenever a refreshed `/tracking` snapshot changes a matching package "
+                "(including one that stops matching, e.g. leaves a watched status), and `removed` carries the tracking ID of a package "
+                "that left the feed. A `resync` event means updates were missed (the client fell behind or the service reloaded): "
+                "re-fetch what you display.",
+    responses={
+        200: {"content": {SSE_MEDIA_TYPE: {}}},
+        503: {"description": "Too many subscribers"}
+    }
+)
+async def stream_package_updates(
+        request: Request,
+        tracking_id: List[str] = Query(
+            [],
+            description="Only packages with these tracking IDs."
+        ),
+        status: List[PackageStatus] = Query(
+            [],
+            description="Only packages with (or leaving) these statuses."
+        ),
+        carrier: List[str] = Query(
+            [],
+            description="Only packages handled by these carriers."
+        )
+):
+    """
+    Returns a `text/event-stream` that stays open until the client disconnects.
+    """
+    subscription = Subscription(frozenset(tracking_id), frozenset(status), frozenset(carrier))
+    if not package_events.subscribe(subscription):
+        raise HTTPException(status_code=503, detail="Too many subscribers")
+
+    return _EventStreamResponse(request, subscription)
+
+
+@router.post(
+    "/enriched",
+    response_model=List[EnrichmentResult],
+    summary="Enrich packages in bulk",
+    description="Retrieve many packages with location metadata in one call. "
+                "Packages that cannot be enriched are reported inline with an error instead of failing the request."
+)
+async def enrich_packages(request: EnrichmentRequest):
+    """
+    Returns one `EnrichmentResult` per distinct tracking ID, in request order.
+    """
+    try:
+        results = await get_enriched_packages_async(request.tracking_ids)
+    except Exception:
+        raise HTTPException(status_code=500, detail="Internal Server Error")
+
+    return adapter_response(EnrichmentResultListAdapter, results)
+
 
 @router.get(
     "/{tracking_id}",
@@ -65,19 +413,32 @@ def list_packages(
         404: {"description": "Package not found"}
     }
 )
-def get_package(tracking_id: str):
+async def get_package(request: Request, tracking_id: str):
     """
     Returns a package by tracking ID, or 404 if not found.
+    While the package comes from a warm snapshot, the response carries an ETag and its bytes are cached.
     """
-    try:
-        package = get_package_by_tracking_id(tracking_id)
-    except Exception:
-        raise HTTPException(status_code=500, detail="Internal Server Error")
+    key = get_warm_tracking_key()
+    etag = snapshot_etag(request, key) if key is not None else None
+    if etag is not None:
+        if is_not_modified(request, etag):
+            return not_modified_response(etag)
+        cached = cached_response(request, etag)
+        if cached is not None:
+            return cached
 
-    if not package:
-        raise HTTPException(status_code=404, detail="Package not found")
+    async def load() -> Package:
+        try:
+            package = await get_package_by_tracking_id_async(tracking_id)
+        except Exception:
+            raise HTTPException(status_code=500, detail="Internal Server Error")
+        if not package:
+            raise HTTPException(status_code=404, detail="Package not found")
+        return package
 
-    return package
+    if etag is None:
+        return model_response(await load())
+    return await cache_response(request, etag, load, lambda package: with_etag(model_response(package), etag))
 
 
 @router.get(
@@ -90,16 +451,16 @@ def get_package(tracking_id: str):
         404: {"description": "Package not found"}
     }
 )
-def get_enriched_package_by_id(tracking_id: str):
+async def get_enriched_package_by_id(tracking_id: str):
     """
     Returns an enriched package with location metadata, or 404 if not found.
     """
     try:
-        enriched = get_enriched_package(tracking_id)
+        enriched = await get_enriched_package_async(tracking_id)
     except Exception:
         raise HTTPException(status_code=500, detail="Internal Server Error")
 
     if not enriched:
         raise HTTPException(status_code=404, detail="Package not found")
 
-    return enriched
+    return model_response(enriched)
@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+from fastapi import Request, Response
+from pydantic import BaseModel, TypeAdapter
+from app import config
+from app.services.profiling import phase
+from app.services.response_cache import CachedResponse, ResponseCache
+
+JSON_MEDIA_TYPE = "application/json"
+
+# Encoded bodies keyed by ETag, which already pins the snapshot content, route, query and media type
+response_cache = ResponseCache(
+    max_bytes=config.RESPONSE_CACHE_MAX_BYTES,
+    gzip_min_bytes=config.RESPONSE_CACHE_GZIP_MIN_BYTES,
+    compress=config.RESPONSE_CACHE_GZIP
+)
+
+# Builds in progress by ETag, so concurrent misses for the same response share one build
+_inflight_builds: Dict[str, asyncio.Future] = {}
+
+T = TypeVar("T")
+
+# Headers that are recomputed for every delivery instead of being stored with a cached body
+_PER_DELIVERY_HEADERS = {"content-length", "content-type", "content-encoding", "vary"}
+
+# Responses built here are returned to FastAPI as raw `Response` objects. FastAPI then sends them
+# as-is instead of re-validating the data against the route's `response_model`; the service layer
+# already validated it on the way in. The `response_model` stays on each route for the OpenAPI docs.
+
+
+def adapter_response(adapter: TypeAdapter, value: Any) -> Response:
+    """
+    Serialize `value` to JSON bytes in one call with a compiled list adapter.
+    """
+    with phase("serialization"):
+        return Response(content=adapter.dump_json(value), media_type=JSON_MEDIA_TYPE)
+
+
+def model_response(model: BaseModel) -> Response:
+    """
+    Serialize a single model straight to JSON bytes.
+    """
+    with phase("serialization"):
+        return Response(content=model.model_dump_json(), media_type=JSON_MEDIA_TYPE)
+
+
+def snapshot_etag(request: Request, content_key: str, media_type: str = JSON_MEDIA_TYPE) -> str:
+    """
+    Strong ETag for a response built from the snapshot with `content_key` (`Snapshot.key`): the same
+    path, query parameters (in any order) and media type over the same content always produce the
+    same bytes. The key comes from the content rather than a process-local version, so a poll that
+    reaches another worker, or a restarted one, holding the same data still gets a 304.
+    """
+    query = sorted(request.query_params.multi_items())
+    key = f"{content_key}:{request.url.path}:{query}:{media_type}"
+    return '"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """
+    True when the request's If-None-Match lists `etag` (or is `*`).
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    # If-None-Match uses weak comparison, so a W/ prefix added by a proxy still matches
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+
+def not_modified_response(etag: str) -> Response:
+    return with_etag(Response(status_code=304), etag)
+
+
+def with_etag(response: Response, etag: str) -> Response:
+    """
+    Attach the validator, and ask clients to revalidate instead of reusing the body unchecked.
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def cached_response(request: Request, etag: str) -> Optional[Response]:
+    """
+    The cached encoded response for `etag`, or None on a miss.
+    """
+    entry = response_cache.get(etag)
+    return _deliver(request, entry) if entry is not None else None
+
+
+async def cache_response(
+        request: Request,
+        etag: str,
+        load: Callable[[], Awaitable[T]],
+        render: Callable[[T], Response]
+) -> Response:
+    """
+    Build a (non-streaming) response, store it under `etag` and deliver it, gzipped if the client
+    accepts it: `load` fetches the data, and `render` encodes it on a worker thread, off the event
+    loop, where it is also compressed. Concurrent calls for the same `etag` share one build, so a
+    new snapshot version is loaded, encoded and compressed once however many requests miss at once;
+    an error raised by `load` or `render` is raised to each of them.
+    """
+    build = _inflight_builds.get(etag)
+    # A build left pending by an event loop that has since closed will never finish
+    if build is None or build.get_loop() is not asyncio.get_running_loop():
+        build = asyncio.ensure_future(_build_entry(etag, load, render))
+        _inflight_builds[etag] = build
+        build.add_done_callback(lambda done: _finish_build(etag, done))
+    # Shield the shared build so one cancelled request does not cancel it for everyone else
+    entry = await asyncio.shield(build)
+    return _deliver(request, entry)
+
+
+def _finish_build(etag: str, build: asyncio.Future):
+    if _inflight_builds.get(etag) is build:
+        del _inflight_builds[etag]
+    if not build.cancelled():
+        build.exception()  # Retrieved by every waiter; marked here in case they were all cancelled
+
+
+async def _build_entry(etag: str, load: Callable[[], Awaitable[T]], render: Callable[[T], Response]) -> CachedResponse:
+    value = await load()
+    return await asyncio.to_thread(_render_entry, etag, render, value)
+
+
+def _render_entry(etag: str, render: Callable[[T], Response], value: T) -> CachedResponse:
+    response = render(value)
+    headers = {name: value for name, value in response.headers.items() if name not in _PER_DELIVERY_HEADERS}
+    with phase("serialization"):  # Includes the gzip copy
+        return response_cache.put(etag, response.body, response.media_type, headers)
+
+
+def _accepts_gzip(request: Request) -> bool:
+    for part in request.headers.get("accept-encoding", "").split(","):
+        coding, _, params = part.partition(";")
+        if coding.strip().lower() in ("gzip", "*") and params.replace(" ", "") not in ("q=0", "q=0.0"):
+            return True
+    return False
+
+
+def _deliver(request: Request, entry: CachedResponse) -> Response:
+    headers = dict(entry.headers)
+    headers["Vary"] = "Accept-Encoding"
+    if entry.gzipped is not None and _accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=entry.gzipped, media_type=entry.media_type, headers=headers)
+    return Response(content=entry.body, media_type=entry.media_type, headers=headers)
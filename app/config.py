@@ -0,0 +1,111 @@
+import os
+import tempfile
+
+# Runtime configuration for the service, read once from the environment at import time.
+# Every value has a default that works against the local WireMock from docker-compose.yml.
+
+# Upstream mock API
+MOCK_API_BASE_URL = os.getenv("MOCK_API_BASE_URL", "http://localhost:8080")
+
+# Connection pool and timeouts for the upstream HTTP client
+HTTP_POOL_CONNECTIONS = int(os.getenv("HTTP_POOL_CONNECTIONS", "10"))  # number of hosts to keep pools for
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "32"))  # keep-alive connections per host
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_STREAM_CHUNK_SIZE = int(os.getenv("HTTP_STREAM_CHUNK_SIZE", "65536"))  # bytes read at a time from streamed bodies
+
+# Snapshot caches for upstream payloads. Past its TTL a snapshot is still served for up to
+# *_MAX_STALE_SECONDS while a refresh runs or keeps failing
+TRACKING_CACHE_TTL_SECONDS = float(os.getenv("TRACKING_CACHE_TTL_SECONDS", "30"))
+TRACKING_MAX_STALE_SECONDS = float(os.getenv("TRACKING_MAX_STALE_SECONDS", "300"))
+CARRIERS_CACHE_TTL_SECONDS = float(os.getenv("CARRIERS_CACHE_TTL_SECONDS", "300"))
+CARRIERS_MAX_STALE_SECONDS = float(os.getenv("CARRIERS_MAX_STALE_SECONDS", "3600"))
+# Refreshes that add, change or remove at most this many packages patch the previous
+# snapshot's sorted indexes in place instead of re-sorting every package
+TRACKING_INCREMENTAL_MAX_CHANGES = int(os.getenv("TRACKING_INCREMENTAL_MAX_CHANGES", "256"))
+# Rows left behind by removed packages are compacted once they outnumber live rows (and this minimum)
+TRACKING_COMPACT_MIN_DEAD_ROWS = int(os.getenv("TRACKING_COMPACT_MIN_DEAD_ROWS", "1024"))
+# Snapshot diffs kept for GET /packages/changes; older sync tokens get a full resync
+CHANGE_LOG_MAX_ENTRIES = int(os.getenv("CHANGE_LOG_MAX_ENTRIES", "1000"))
+
+# Server-Sent Events on GET /packages/stream
+SSE_MAX_SUBSCRIBERS = int(os.getenv("SSE_MAX_SUBSCRIBERS", "10000"))
+SSE_QUEUE_MAX_EVENTS = int(os.getenv("SSE_QUEUE_MAX_EVENTS", "256"))  # per connection; a full queue is replaced by one resync event
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))  # comment line sent on idle connections
+
+# Background refresher started with the app: every check interval, snapshots older than
+# REFRESH_AHEAD_FRACTION of their TTL are refreshed so requests never find them expired
+BACKGROUND_REFRESH_ENABLED = os.getenv("BACKGROUND_REFRESH_ENABLED", "true").lower() in ("1", "true", "yes")
+REFRESH_AHEAD_FRACTION = float(os.getenv("REFRESH_AHEAD_FRACTION", "0.8"))
+REFRESH_CHECK_INTERVAL_SECONDS = float(os.getenv("REFRESH_CHECK_INTERVAL_SECONDS", "1"))
+
+# Snapshot file the upstream caches are saved to and restored from at startup, so a new worker
+# serves its first requests without waiting on the upstream. Empty (the default) disables it; use a
+# path per deployment. Files older than SNAPSHOT_FILE_MAX_AGE_SECONDS, or saved from a different
+# MOCK_API_BASE_URL, are ignored
+SNAPSHOT_FILE_PATH = os.getenv("SNAPSHOT_FILE_PATH", "")
+SNAPSHOT_FILE_MAX_AGE_SECONDS = float(os.getenv("SNAPSHOT_FILE_MAX_AGE_SECONDS", "3600"))
+SNAPSHOT_FILE_SAVE_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_FILE_SAVE_INTERVAL_SECONDS", "60"))  # rewritten only when something changed
+# Share the snapshot file between the workers on a host: one worker (holding a lock on
+# SNAPSHOT_FILE_PATH + ".lock") refreshes from the upstream and publishes; the others read the file.
+# Needs fcntl, so it is ignored on Windows
+SHARED_CACHE_ENABLED = os.getenv("SHARED_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# Upstream records validated per call to a compiled list adapter
+VALIDATION_BATCH_SIZE = int(os.getenv("VALIDATION_BATCH_SIZE", "1000"))
+
+# City metadata cache used for enrichment
+CITY_CACHE_MAXSIZE = int(os.getenv("CITY_CACHE_MAXSIZE", "4096"))
+CITY_CACHE_TTL_SECONDS = float(os.getenv("CITY_CACHE_TTL_SECONDS", "86400"))
+CITY_CACHE_NEGATIVE_TTL_SECONDS = float(os.getenv("CITY_CACHE_NEGATIVE_TTL_SECONDS", "300"))
+
+# Batch enrichment
+ENRICH_BATCH_MAX_IDS = int(os.getenv("ENRICH_BATCH_MAX_IDS", "1000"))
+ENRICH_CITY_CONCURRENCY = int(os.getenv("ENRICH_CITY_CONCURRENCY", "8"))  # max concurrent /locations calls per batch
+
+# Grid cell size, in degrees of latitude and longitude, of the city index behind GET /packages/near
+GEO_GRID_CELL_DEGREES = float(os.getenv("GEO_GRID_CELL_DEGREES", "0.5"))
+GEO_MAX_RADIUS_KM = float(os.getenv("GEO_MAX_RADIUS_KM", "20000"))  # about half the Earth's circumference
+
+# Pagination on GET /packages
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "1000"))
+
+# Streaming NDJSON responses
+NDJSON_CHUNK_SIZE = int(os.getenv("NDJSON_CHUNK_SIZE", "256"))  # packages encoded per chunk written to the socket
+
+# Retries for idempotent upstream GETs: capped exponential backoff with full jitter
+HTTP_RETRY_MAX_ATTEMPTS = int(os.getenv("HTTP_RETRY_MAX_ATTEMPTS", "3"))  # total attempts, including the first
+HTTP_RETRY_BASE_DELAY = float(os.getenv("HTTP_RETRY_BASE_DELAY", "0.1"))
+HTTP_RETRY_MAX_DELAY = float(os.getenv("HTTP_RETRY_MAX_DELAY", "2"))
+
+# Hedged requests: when enabled, a GET still running after the endpoint's recent p95 latency
+# (clamped to the min/max below) gets a duplicate request and the first response wins
+HTTP_HEDGE_ENABLED = os.getenv("HTTP_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+HTTP_HEDGE_PERCENTILE = float(os.getenv("HTTP_HEDGE_PERCENTILE", "0.95"))
+HTTP_HEDGE_MIN_DELAY = float(os.getenv("HTTP_HEDGE_MIN_DELAY", "0.05"))
+HTTP_HEDGE_MAX_DELAY = float(os.getenv("HTTP_HEDGE_MAX_DELAY", "2"))
+HTTP_LATENCY_WINDOW = int(os.getenv("HTTP_LATENCY_WINDOW", "200"))  # recent calls per endpoint used for the percentile
+
+# Per-endpoint circuit breaker
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))  # consecutive failed calls before opening
+CIRCUIT_RESET_TIMEOUT_SECONDS = float(os.getenv("CIRCUIT_RESET_TIMEOUT_SECONDS", "30"))
+
+# Encoded response bodies cached per snapshot version (GET /packages, /packages/{id}, /carriers)
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESPONSE_CACHE_GZIP = os.getenv("RESPONSE_CACHE_GZIP", "true").lower() in ("1", "true", "yes")
+RESPONSE_CACHE_GZIP_MIN_BYTES = int(os.getenv("RESPONSE_CACHE_GZIP_MIN_BYTES", "1024"))  # smaller bodies are not worth compressing
+
+# Request metrics on GET /metrics; upstream call and cache metrics are always recorded
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# On-demand profiling of single requests. When enabled, a request carrying PROFILING_HEADER (or picked
+# at PROFILING_SAMPLE_RATE) runs under cProfile; its report is written to PROFILING_DIR and its phase
+# timings are returned in a Server-Timing header. When disabled the middleware is not installed at all
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in ("1", "true", "yes")
+PROFILING_HEADER = os.getenv("PROFILING_HEADER", "X-Profile")
+PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))  # share of requests profiled without the header
+PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "package-tracker-profiles"))
+PROFILING_TOP_FUNCTIONS = int(os.getenv("PROFILING_TOP_FUNCTIONS", "40"))  # functions listed in each report
+# Reports kept in PROFILING_DIR; the oldest are deleted past this, since any client can ask for one
+PROFILING_MAX_REPORTS = int(os.getenv("PROFILING_MAX_REPORTS", "100"))
@@ -1,6 +1,56 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from app import config
 from app.api import carriers
 from app.api import packages
+from app.api import health
+from app.api import metrics
+from app.api.middleware import MetricsMiddleware, ProfilingMiddleware
+from app.services.carrier_service import carrier_cache, refresh_carriers
+from app.services.http_client import client, async_client
+from app.services.package_service import tracking_cache, refresh_tracking_snapshot
+from app.services.refresher import BackgroundRefresher, RefreshTarget
+from app.services.shared_cache import SharedSnapshotCache
+from app.services.warm_start import SnapshotPersister
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    persister = SnapshotPersister(config.SNAPSHOT_FILE_PATH)
+    shared = None
+    if config.SHARED_CACHE_ENABLED and persister.enabled and SharedSnapshotCache.supported:
+        shared = SharedSnapshotCache(config.SNAPSHOT_FILE_PATH)
+    if shared is not None:
+        # Start from what the host's leader worker last published; only the leader writes the file
+        shared.attach()
+        await asyncio.to_thread(shared.sync)
+        targets = shared.targets()
+    else:
+        # Serve the last saved snapshots from the start; the refresher revalidates them right away
+        if persister.enabled:
+            await persister.load()
+            persister.start()
+        targets = [
+            RefreshTarget("/tracking", tracking_cache, refresh_tracking_snapshot),
+            RefreshTarget("/carriers", carrier_cache, refresh_carriers)
+        ]
+
+    # Keep the upstream snapshots warm so requests never wait on a refresh in steady state
+    refresher = BackgroundRefresher(targets)
+    if config.BACKGROUND_REFRESH_ENABLED:
+        refresher.start()
+
+    yield
+
+    await refresher.stop()
+    if shared is not None:
+        shared.detach()
+    elif persister.enabled:
+        await persister.stop()
+    client.close()
+    await async_client.close()
+
 
 app = FastAPI(
     title="Best Egg 2025 Package Tracker API",
@@ -9,8 +59,16 @@ app = FastAPI(
     contact={
         "name": "Dylan Leahy",
         "email": "leahy.dc@gmail.com"
-    }
+    },
+    lifespan=lifespan
 )
 
 app.include_router(carriers.router)
-app.include_router(packages.router)
\ No newline at end of file
+app.include_router(packages.router)
+app.include_router(health.router)
+app.include_router(metrics.router)
+
+if config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+if config.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
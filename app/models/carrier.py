@@ -1,4 +1,5 @@
-from pydantic import BaseModel, Field
+from typing import List
+from pydantic import BaseModel, Field, TypeAdapter
 
 
 class Carrier(BaseModel):
@@ -14,4 +15,8 @@ class Carrier(BaseModel):
         ...,
         description="Full name of the carrier.",
         example="United Parcel Service"
-    )
\ No newline at end of file
+    )
+
+
+# Compiled list-level adapter: validates or serializes a whole batch of carriers in one call
+CarrierListAdapter = TypeAdapter(List[Carrier])
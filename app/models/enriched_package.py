@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field
+from typing import List, Optional
+from pydantic import BaseModel, Field, TypeAdapter
+from app import config
 from app.models.package import Package
 
 
@@ -45,3 +47,41 @@ class EnrichedPackage(BaseModel):
         ...,
         description="Metadata about the city where the package is currently located."
     )
+
+
+class EnrichmentRequest(BaseModel):
+    """
+    Request body for enriching many packages in one call.
+    """
+    tracking_ids: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=config.ENRICH_BATCH_MAX_IDS,
+        description="Tracking IDs to enrich. Duplicates are answered once.",
+        example=["PKG123456", "PKG789101"]
+    )
+
+
+class EnrichmentResult(BaseModel):
+    """
+    Outcome of enriching one tracking ID in a batch: either the enriched package or an error.
+    """
+    tracking_id: str = Field(
+        ...,
+        description="Tracking ID this result belongs to.",
+        example="PKG123456"
+    )
+    enriched: Optional[EnrichedPackage] = Field(
+        None,
+        description="The enriched package, or null when it could not be resolved."
+    )
+    error: Optional[str] = Field(
+        None,
+        description="Why the package could not be enriched, or null on success.",
+        example="Package not found"
+    )
+
+
+# Compiled list-level adapters: validate or serialize a whole batch in one call
+CityMetadataListAdapter = TypeAdapter(List[CityMetadata])
+EnrichmentResultListAdapter = TypeAdapter(List[EnrichmentResult])
@@ -0,0 +1,50 @@
+from enum import Enum
+from typing import List
+from pydantic import BaseModel, Field
+
+
+class CircuitState(str, Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class UpstreamEndpointHealth(BaseModel):
+    """
+    Circuit breaker state for one upstream endpoint.
+    """
+    endpoint: str = Field(
+        ...,
+        description="Upstream endpoint, with path parameters shown as `*`.",
+        example="/tracking/*"
+    )
+    state: CircuitState = Field(
+        ...,
+        description="Breaker state: calls pass when closed, fail fast when open, and one probe is let through when half-open.",
+        example="closed"
+    )
+    consecutive_failures: int = Field(
+        ...,
+        description="Failed calls in a row since the last success.",
+        example=0
+    )
+    retry_after: float = Field(
+        ...,
+        description="Seconds until an open circuit lets a probe call through.",
+        example=0.0
+    )
+
+
+class HealthStatus(BaseModel):
+    """
+    Service health: degraded while any upstream circuit is not closed.
+    """
+    status: str = Field(
+        ...,
+        description="'ok', or 'degraded' while any upstream circuit is open or half-open.",
+        example="ok"
+    )
+    upstream: List[UpstreamEndpointHealth] = Field(
+        ...,
+        description="Circuit breaker state per upstream endpoint called so far."
+    )
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
 from datetime import datetime
 from enum import Enum
+from typing import List
 
 
 class SortBy(str, Enum):
@@ -48,3 +49,31 @@ class Package(BaseModel):
         description="Current city where the package is located.",
         example="Philadelphia"
     )
+
+
+class PackageChanges(BaseModel):
+    """
+    Pydantic model for one poll of the package change feed.
+    """
+    packages: List[Package] = Field(
+        ...,
+        description="Packages added or updated since the given point, oldest last_updated first."
+    )
+    removed: List[str] = Field(
+        ...,
+        description="Tracking IDs of packages no longer in the upstream feed.",
+        example=["PKG123456"]
+    )
+    token: str = Field(
+        ...,
+        description="Sync token to pass as `since` on the next poll."
+    )
+    reset: bool = Field(
+        ...,
+        description="True when the changes could not be computed incrementally and `packages` is the full list; "
+                    "replace the local copy instead of applying a delta."
+    )
+
+
+# Compiled list-level adapter: validates or serializes a whole batch of packages in one call
+PackageListAdapter = TypeAdapter(List[Package])
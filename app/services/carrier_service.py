@@ -1,13 +1,133 @@
-from typing import List
-from app.models.carrier import Carrier
-from app.services.http_client import MockApiClient
+import hashlib
+from typing import List, Optional, Tuple
+from app import config
+from app.models.carrier import Carrier, CarrierListAdapter
+from app.services.http_client import CacheValidators, NotModifiedError, client, async_client
+from app.services.profiling import phase
+from app.services.resilience import CircuitOpenError
+from app.services.snapshot_cache import Snapshot, SnapshotCache
 
-client = MockApiClient()
+# Process-wide snapshot of the /carriers payload; carriers change rarely, so it may be served well past its TTL
+carrier_cache: SnapshotCache[List[Carrier]] = SnapshotCache(
+    ttl_seconds=config.CARRIERS_CACHE_TTL_SECONDS,
+    max_stale_seconds=config.CARRIERS_MAX_STALE_SECONDS,
+    serve_stale_on=(CircuitOpenError,),
+    content_key=lambda carriers: hashlib.blake2b(CarrierListAdapter.dump_json(carriers), digest_size=16).hexdigest()
+)
+
+# Upstream ETag / Last-Modified of the cached /carriers snapshot, for conditional refreshes
+_last_carrier_validators = CacheValidators()
+
+
+def _parse_carriers(response: dict) -> List[Carrier]:
+    """
+    Build Carrier objects from a /carriers payload.
+    """
+    carriers = response.get("carriers")
+
+    if carriers is None:
+        raise ValueError("Missing 'carriers' field in response from mock API")
+
+    with phase("validation"):
+        return CarrierListAdapter.validate_python(carriers)
+
+
+def _previous_carriers() -> Optional[List[Carrier]]:
+    snapshot = carrier_cache.snapshot
+    return snapshot.value if snapshot is not None else None
+
+
+def _carrier_validators(previous: Optional[List[Carrier]]) -> CacheValidators:
+    """
+    Validators for the next /carriers request: a conditional one only when there is a list to reuse
+    on a 304, so a cache invalidated meanwhile gets a full fetch instead of a 304 with nothing to keep.
+    """
+    return _last_carrier_validators.copy() if previous is not None else CacheValidators()
+
+
+def _commit_carrier_validators(validators: CacheValidators):
+    global _last_carrier_validators
+    _last_carrier_validators = validators
+
+
+def _load_carriers() -> List[Carrier]:
+    previous = _previous_carriers()
+    validators = _carrier_validators(previous)
+    try:
+        carriers = _parse_carriers(client.get("/carriers", validators=validators))
+    except NotModifiedError:
+        return previous
+    _commit_carrier_validators(validators)
+    return carriers
+
+
+async def _load_carriers_async() -> List[Carrier]:
+    previous = _previous_carriers()
+    validators = _carrier_validators(previous)
+    try:
+        carriers = _parse_carriers(await async_client.get("/carriers", validators=validators))
+    except NotModifiedError:
+        return previous
+    _commit_carrier_validators(validators)
+    return carriers
+
+
+async def refresh_carriers():
+    """
+    Fetch a new /carriers snapshot now, joining any refresh already in flight.
+    """
+    await carrier_cache.refresh(_load_carriers_async)
+
+
+def invalidate_carrier_cache():
+    """
+    Discard the cached /carriers snapshot so the next request fetches fresh data.
+    """
+    carrier_cache.invalidate()
+    _commit_carrier_validators(CacheValidators())
+
+
+def export_carrier_state() -> Optional[Tuple[List[Carrier], CacheValidators]]:
+    """
+    The cached /carriers list and its upstream validators, for persisting; None before the first load.
+    """
+    snapshot = carrier_cache.snapshot
+    return (snapshot.value, _last_carrier_validators.copy()) if snapshot is not None else None
+
+
+def seed_carriers(carriers: List[Carrier], validators: CacheValidators) -> bool:
+    """
+    Serve a restored /carriers list until the first refresh, which revalidates it with `validators`.
+    Does nothing if a list is already loaded.
+    """
+    if not carrier_cache.seed(carriers):
+        return False
+    _commit_carrier_validators(validators)
+    return True
+
+
+def adopt_carriers(carriers: List[Carrier], validators: CacheValidators, age: float):
+    """
+    Make a /carriers list another worker loaded the current one; an unchanged list keeps its version.
+    """
+    current = carrier_cache.snapshot
+    if current is not None and current.value == carriers:
+        carriers = current.value
+    carrier_cache.put(carriers, age)
+    _commit_carrier_validators(validators)
+
+
+async def get_carriers_snapshot_async() -> Snapshot[List[Carrier]]:
+    """
+    The /carriers snapshot requests are currently served from, with its version, loading it if needed.
+    Pass its value as `carriers` to `get_all_carriers_async` so the ETag and body come from the same copy.
+    """
+    return await carrier_cache.aget_snapshot(_load_carriers_async)
 
 
 def get_all_carriers() -> List[Carrier]:
     """
-    Fetch a list of all carriers from the mock API.
+    Fetch a list of all carriers from the cached /carriers snapshot.
 
     Returns:
         List[Carrier]: A list of Carrier objects parsed from the API response.
@@ -15,10 +135,15 @@ def get_all_carriers() -> List[Carrier]:
     Raises:
         ValueError: If the API response is malformed or missing expected data.
     """
-    response = client.get("/carriers")
-    carriers = response.get("carriers")
+    return list(carrier_cache.get(_load_carriers))
 
-    if carriers is None:
-        raise ValueError("Missing 'carriers' field in response from mock API")
 
-    return [Carrier(id=item["id"], name=item["name"]) for item in carriers]
+async def get_all_carriers_async(carriers: Optional[List[Carrier]] = None) -> List[Carrier]:
+    """
+    Async version of `get_all_carriers`, using the asyncio-native client.
+    Copies `carriers` (a snapshot's value) instead of reading the cache when given.
+
+    Raises:
+        ValueError: If the API response is malformed or missing expected data.
+    """
+    return list(carriers if carriers is not None else await carrier_cache.aget(_load_carriers_async))
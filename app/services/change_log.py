@@ -0,0 +1,171 @@
+import base64
+import binascii
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Iterable, Optional, Set, Tuple
+
+# Identifies this process's log: a token's sequence number is only meaningful to the log that issued it
+_LOG_ID = uuid.uuid4().hex[:12]
+
+
+class InvalidSyncTokenError(ValueError):
+    """
+    Raised when a sync token cannot be decoded.
+    """
+
+
+def encode_sync_token(sequence: int, key: Optional[str] = None) -> str:
+    """
+    Opaque token for a consumer that has seen every change up to `sequence`.
+    `key` identifies that snapshot's upstream version, so other processes can find it in their own log.
+    """
+    payload = {"l": _LOG_ID, "q": sequence}
+    if key is not None:
+        payload["k"] = key
+    raw = json.dumps(payload, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: str) -> Tuple[Optional[int], Optional[str]]:
+    """
+    Return the sequence stored in `token` (None when it was issued by another process) and its snapshot key.
+
+    Raises:
+        InvalidSyncTokenError: If the token is malformed.
+    """
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        log_id, sequence, key = payload["l"], payload["q"], payload.get("k")
+    except (binascii.Error, ValueError, KeyError, TypeError, AttributeError):
+        raise InvalidSyncTokenError("Invalid sync token")
+
+    if not isinstance(sequence, int) or not (key is None or isinstance(key, str)):
+        raise InvalidSyncTokenError("Invalid sync token")
+    return (sequence if log_id == _LOG_ID else None), key
+
+
+class _Entry:
+    __slots__ = ("sequence", "at", "tracking_ids", "key")
+
+    def __init__(self, sequence: int, at: float, tracking_ids: frozenset, key: Optional[str]):
+        self.sequence = sequence
+        self.at = at
+        self.tracking_ids = tracking_ids
+        self.key = key
+
+
+class ChangeLog:
+    """
+    Bounded history of which tracking IDs changed between successive /tracking snapshots.
+
+    Each published snapshot that differs from the one before gets the next sequence number and
+    an entry listing the IDs that were added, changed or removed. A consumer holding sequence N
+    needs only the IDs in entries after N; whether each one was updated or removed is read off
+    the current snapshot. A snapshot that could not be diffed (the first one, or one loaded
+    after the cache was invalidated) resets the log, and past `max_entries` the oldest entry is
+    dropped: sequences and times from before either point are no longer covered.
+
+    Sequence numbers are local to the process. Each snapshot can also be recorded with a key for
+    its upstream version (e.g. the /tracking ETag), which every worker that loaded the same payload
+    shares, so a token issued by another worker or before a restart can still be resolved here.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "deque[_Entry]" = deque()
+        self._sequence = 0
+        self._floor = 0  # Oldest sequence the log can still answer from
+        self._floor_at = float("inf")  # Wall time of that sequence; nothing is covered before the first reset
+        self._floor_key: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    def record(self, tracking_ids: Iterable[str], key: Optional[str] = None) -> int:
+        """
+        Append the IDs touched by a new snapshot and return its sequence number.
+        """
+        with self._lock:
+            self._sequence += 1
+            self._entries.append(_Entry(self._sequence, time.time(), frozenset(tracking_ids), key))
+            if len(self._entries) > self.max_entries:
+                dropped = self._entries.popleft()
+                self._floor, self._floor_at, self._floor_key = dropped.sequence, dropped.at, dropped.key
+            return self._sequence
+
+    def reset(self, key: Optional[str] = None) -> int:
+        """
+        Start over from a snapshot that has nothing to be diffed against, and return its sequence number.
+        """
+        with self._lock:
+            self._sequence += 1
+            self._entries.clear()
+            self._floor, self._floor_at, self._floor_key = self._sequence, time.time(), key
+            return self._sequence
+
+    def key_of(self, sequence: int) -> Optional[str]:
+        """
+        The key the snapshot with `sequence` was recorded with, if any and if the log still covers it.
+        """
+        with self._lock:
+            if sequence == self._floor:
+                return self._floor_key
+            for entry in reversed(self._entries):
+                if entry.sequence == sequence:
+                    return entry.key
+            return None
+
+    def sequence_of(self, key: str) -> Optional[int]:
+        """
+        The sequence of the newest covered snapshot recorded with `key`, or None.
+        """
+        with self._lock:
+            for entry in reversed(self._entries):
+                if entry.key == key:
+                    return entry.sequence
+            return self._floor if key == self._floor_key else None
+
+    def changed_since(self, sequence: int, until: int) -> Optional[Set[str]]:
+        """
+        IDs touched after `sequence` up to and including `until`, or None if the log no longer reaches back to `sequence`.
+        """
+        with self._lock:
+            if sequence < self._floor or sequence > until:
+                return None
+            touched: Set[str] = set()
+            for entry in reversed(self._entries):  # Newest first, so stop at the first entry already seen
+                if entry.sequence <= sequence:
+                    break
+                if entry.sequence <= until:
+                    touched |= entry.tracking_ids
+            return touched
+
+    def changed_after(self, timestamp: float, until: int) -> Optional[Set[str]]:
+        """
+        IDs touched by snapshots published after `timestamp` (Unix time) up to sequence `until`,
+        or None if the log does not reach back that far.
+        """
+        with self._lock:
+            if timestamp < self._floor_at:
+                return None
+            touched: Set[str] = set()
+            for entry in reversed(self._entries):
+                if entry.at <= timestamp:
+                    break
+                if entry.sequence <= until:
+                    touched |= entry.tracking_ids
+            return touched
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._sequence = 0
+            self._floor = 0
+            self._floor_at = float("inf")
+            self._floor_key = None
@@ -0,0 +1,128 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from app.models.enriched_package import CityMetadata
+
+# Marker for "no usable entry", distinct from a cached negative (None) result
+_MISSING = object()
+
+
+class CityMetadataCache:
+    """
+    Bounded LRU cache of city metadata keyed by normalized city name.
+
+    City metadata is effectively static, so entries live for a long TTL. Cities the upstream
+    does not know (404) are cached as negative entries (None) with their own, shorter TTL so
+    repeated lookups for them do not reach the upstream either.
+    """
+
+    def __init__(self, maxsize: int, ttl_seconds: float, negative_ttl_seconds: float):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.version = 0  # Bumped on every put and removal, so persisters can tell the entries changed
+        self._entries: "OrderedDict[str, Tuple[Optional[CityMetadata], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(city: str) -> str:
+        """
+        Cache key for a city name: lowercased with whitespace collapsed.
+        """
+        return " ".join(city.split()).lower()
+
+    def get(self, city: str, load: Callable[[str], Optional[CityMetadata]]) -> Optional[CityMetadata]:
+        """
+        Return metadata for `city`, calling `load(normalized_city)` on a miss.
+        `load` returns None when the upstream has no metadata for the city.
+        """
+        key = self.normalize(city)
+        cached = self._lookup(key)
+        if cached is not _MISSING:
+            return cached
+
+        value = load(key)
+        self.put(key, value)
+        return value
+
+    async def aget(self, city: str, load: Callable[[str], Awaitable[Optional[CityMetadata]]]) -> Optional[CityMetadata]:
+        """
+        Async version of `get`.
+        """
+        key = self.normalize(city)
+        cached = self._lookup(key)
+        if cached is not _MISSING:
+            return cached
+
+        value = await load(key)
+        self.put(key, value)
+        return value
+
+    def put(self, city: str, value: Optional[CityMetadata], ttl_seconds: Optional[float] = None):
+        """
+        Cache `value` for `city`. `ttl_seconds` overrides the default TTL, e.g. for an entry restored with the time it had left.
+        """
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds if value is not None else self.negative_ttl_seconds
+        key = self.normalize(city)
+        with self._lock:
+            self.version += 1
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)  # Evict the least recently used city
+
+    def contains(self, city: str) -> bool:
+        """
+        True when `city` has an unexpired entry, positive or negative. Does not count as a hit or miss.
+        """
+        with self._lock:
+            entry = self._entries.get(self.normalize(city))
+            return entry is not None and entry[1] > time.monotonic()
+
+    def peek(self, city: str) -> Optional[CityMetadata]:
+        """
+        Cached metadata for `city`, or None when it is unknown or not cached. Does not count as a hit or miss.
+        """
+        with self._lock:
+            entry = self._entries.get(self.normalize(city))
+            return entry[0] if entry is not None and entry[1] > time.monotonic() else None
+
+    def entries(self) -> List[Tuple[str, CityMetadata, float]]:
+        """
+        Unexpired positive entries with the seconds each has left, least recently used first,
+        so they can be persisted and `put` back in order without outliving their TTL.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [
+                (key, value, expires - now)
+                for key, (value, expires) in self._entries.items()
+                if value is not None and expires > now
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.version += 1
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+    def _lookup(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[key]  # Expired
+                self.version += 1
+            self.misses += 1
+            return _MISSING
@@ -0,0 +1,115 @@
+import math
+from array import array
+from typing import Dict, List, Tuple
+
+# Mean Earth radius used for haversine distances
+EARTH_RADIUS_KM = 6371.0088
+_KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+class InvalidLocationError(ValueError):
+    """
+    Raised when a query point or radius is out of range.
+    """
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance in kilometres between two points given in degrees.
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = math.sin((phi2 - phi1) / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class _Place:
+    """
+    One city in the index: its coordinates (with the trigonometry haversine needs precomputed) and its package rows.
+    """
+
+    __slots__ = ("lat", "lon", "phi", "cos_phi", "rows")
+
+    def __init__(self, lat: float, lon: float, rows: array):
+        self.lat = lat
+        self.lon = lon
+        self.phi = math.radians(lat)
+        self.cos_phi = math.cos(self.phi)
+        self.rows = rows
+
+
+class GeoIndex:
+    """
+    Grid index over the cities packages are in, built once per tracking snapshot.
+
+    Packages are indexed by city rather than one by one: a fleet has far fewer distinct cities
+    than packages, and every package in a city shares its coordinates. Cities are bucketed into
+    cells of `cell_degrees` latitude by longitude. A query visits only the cells overlapping the
+    circle's bounding box (wrapping across the antimeridian, and every longitude near the poles),
+    computes the haversine distance to each city in them, and returns the rows of the cities inside.
+    """
+
+    def __init__(self, city_rows: Dict[str, array], coordinates: Dict[str, Tuple[float, float]], cell_degrees: float):
+        self.cell_degrees = cell_degrees
+        self._columns = max(1, round(360 / cell_degrees))
+        self._cells: Dict[Tuple[int, int], List[_Place]] = {}
+        self.cities = 0
+        self.missing: List[str] = []  # Cities with packages but no known coordinates
+
+        for city, rows in city_rows.items():
+            point = coordinates.get(city)
+            if point is None:
+                self.missing.append(city)
+                continue
+            place = _Place(point[0], point[1], rows)
+            self._cells.setdefault(self._cell(place.lat, place.lon), []).append(place)
+            self.cities += 1
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees) % self._columns
+
+    def _candidate_cells(self, lat: float, lon: float, radius_km: float):
+        lat_span = radius_km / _KM_PER_DEGREE
+        low, high = max(-90.0, lat - lat_span), min(90.0, lat + lat_span)
+        lat_cells = range(math.floor(low / self.cell_degrees), math.floor(high / self.cell_degrees) + 1)
+
+        # Longitude degrees shrink with latitude; size the box for the latitude nearest a pole
+        cos_lat = math.cos(math.radians(max(abs(low), abs(high))))
+        lon_span = lat_span / cos_lat if cos_lat > 1e-9 else 180.0
+        if lon_span >= 180:
+            lon_cells = range(self._columns)
+        else:
+            first = math.floor((lon - lon_span) / self.cell_degrees)
+            last = math.floor((lon + lon_span) / self.cell_degrees)
+            lon_cells = sorted({column % self._columns for column in range(first, last + 1)})
+
+        for lat_cell in lat_cells:
+            for lon_cell in lon_cells:
+                yield lat_cell, lon_cell
+
+    def query(self, lat: float, lon: float, radius_km: float) -> List[Tuple[float, array]]:
+        """
+        (distance in km, package rows) for every indexed city within `radius_km` of the point, nearest first.
+
+        Raises:
+            InvalidLocationError: If the point is not a valid latitude/longitude or the radius is negative.
+        """
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180) or not radius_km >= 0:
+            raise InvalidLocationError("lat must be within [-90, 90], lon within [-180, 180] and radius_km non-negative")
+
+        phi = math.radians(lat)
+        cos_phi = math.cos(phi)
+        # Compare haversine terms instead of distances, so only the matches pay for asin and sqrt
+        limit = math.sin(min(radius_km / EARTH_RADIUS_KM, math.pi) / 2) ** 2
+        sin, radians = math.sin, math.radians
+
+        matches = []
+        for cell in self._candidate_cells(lat, lon, radius_km):
+            for place in self._cells.get(cell, ()):
+                a = sin((place.phi - phi) / 2) ** 2 + cos_phi * place.cos_phi * sin(radians(place.lon - lon) / 2) ** 2
+                if a <= limit:
+                    matches.append((2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a))), place.rows))
+        matches.sort(key=lambda match: match[0])
+        return matches
+
+    def __len__(self) -> int:
+        return self.cities
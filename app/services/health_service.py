@@ -0,0 +1,19 @@
+from app.models.health import CircuitState, HealthStatus, UpstreamEndpointHealth
+from app.services.http_client import upstream_endpoints
+
+
+def get_health() -> HealthStatus:
+    """
+    Report the circuit breaker state of every upstream endpoint the clients have called.
+    """
+    upstream = [
+        UpstreamEndpointHealth(
+            endpoint=endpoint.name,
+            state=CircuitState(endpoint.breaker.state),
+            consecutive_failures=endpoint.breaker.consecutive_failures,
+            retry_after=round(endpoint.breaker.retry_after(), 3)
+        )
+        for endpoint in upstream_endpoints.all()
+    ]
+    degraded = any(endpoint.state != CircuitState.closed for endpoint in upstream)
+    return HealthStatus(status="degraded" if degraded else "ok", upstream=upstream)
@@ -1,12 +1,374 @@
+import asyncio
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Awaitable, Callable, Dict, Iterator, Mapping, Optional, TypeVar
+
+import httpx
 import requests
+from requests.adapters import HTTPAdapter
+
+from app import config
+from app.services.json_stream import JsonArrayStreamParser, iter_array_items
+from app.services.metrics import UpstreamCall
+from app.services.resilience import RetryPolicy, UpstreamEndpoint, UpstreamEndpoints, is_retryable
+
+T = TypeVar("T")
+
+
+def is_not_found(error: Exception) -> bool:
+    """
+    True when an exception raised by either client is an upstream 404 response.
+    """
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None) == 404
+
+
+class NotModifiedError(Exception):
+    """
+    The upstream answered 304 Not Modified to a conditional GET: the caller's parsed copy is still current.
+    """
+
+
+class CacheValidators:
+    """
+    ETag and Last-Modified from the upstream's last full response for one resource,
+    sent back as If-None-Match / If-Modified-Since on the next request.
+    """
+
+    def __init__(self, etag: Optional[str] = None, last_modified: Optional[str] = None):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def request_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def update(self, headers: Mapping[str, str]):
+        self.etag = headers.get("ETag")
+        self.last_modified = headers.get("Last-Modified")
+
+    def copy(self) -> "CacheValidators":
+        return CacheValidators(self.etag, self.last_modified)
+
+
+def _conditional(validators: Optional[CacheValidators]) -> dict:
+    """
+    Extra request arguments for a conditional GET (none for a plain one).
+    """
+    return {"headers": validators.request_headers()} if validators is not None else {}
+
+
+def _check_modified(response, path: str, validators: Optional[CacheValidators]):
+    """
+    Raise `NotModifiedError` on a 304, otherwise record the new validators from a successful response.
+    """
+    if validators is None:
+        return
+    if response.status_code == 304:
+        raise NotModifiedError(f"{path} not modified")
+    response.raise_for_status()
+    validators.update(response.headers)
+
+
+def default_retry_policy() -> RetryPolicy:
+    return RetryPolicy(config.HTTP_RETRY_MAX_ATTEMPTS, config.HTTP_RETRY_BASE_DELAY, config.HTTP_RETRY_MAX_DELAY)
+
+
+def _hedge_delay(endpoint: UpstreamEndpoint) -> float:
+    return endpoint.hedge_delay(config.HTTP_HEDGE_PERCENTILE, config.HTTP_HEDGE_MIN_DELAY, config.HTTP_HEDGE_MAX_DELAY)
+
+
+# Breaker state and latency windows per upstream endpoint, shared by both clients
+upstream_endpoints = UpstreamEndpoints(
+    failure_threshold=config.CIRCUIT_FAILURE_THRESHOLD,
+    reset_timeout=config.CIRCUIT_RESET_TIMEOUT_SECONDS,
+    latency_window=config.HTTP_LATENCY_WINDOW
+)
+
 
 # HTTP Client to interact with a mock API and fetch data from the mock server
+#
+# The client owns one long-lived requests.Session so connections to the upstream are
+# pooled and kept alive between calls instead of opening a new TCP connection per request.
+#
+# Every GET goes through the endpoint's circuit breaker and is retried on connection errors,
+# timeouts, 429 and 5xx with jittered exponential backoff. With hedging enabled, a GET that
+# outlives the endpoint's recent p95 latency gets a duplicate request and the first success wins.
 class MockApiClient:
-    def __init__(self, base_url: str = "http://localhost:8080"):
+    def __init__(
+            self,
+            base_url: str = config.MOCK_API_BASE_URL,
+            pool_connections: int = config.HTTP_POOL_CONNECTIONS,
+            pool_maxsize: int = config.HTTP_POOL_MAXSIZE,
+            connect_timeout: float = config.HTTP_CONNECT_TIMEOUT,
+            read_timeout: float = config.HTTP_READ_TIMEOUT,
+            retry: Optional[RetryPolicy] = None,
+            endpoints: UpstreamEndpoints = upstream_endpoints,
+            hedge: bool = config.HTTP_HEDGE_ENABLED
+    ):
         self.base_url = base_url
+        self.timeout = (connect_timeout, read_timeout)
+        self.retry = retry or default_retry_policy()
+        self.endpoints = endpoints
+        self.hedge = hedge
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        # Hedged duplicates run on worker threads; a losing request finishes in the background
+        self._hedge_pool = ThreadPoolExecutor(max_workers=pool_maxsize, thread_name_prefix="upstream-hedge") if hedge else None
 
-    def get(self, path: str):
+    def get(self, path: str, validators: Optional[CacheValidators] = None):
+        """
+        GET `path` and return the parsed JSON body.
+
+        With `validators`, the request is conditional: a 304 raises `NotModifiedError`,
+        and a full response updates `validators` in place.
+
+        Raises:
+            CircuitOpenError: If the endpoint's circuit is open; no request is made.
+            NotModifiedError: If `validators` were given and the upstream copy has not changed.
+            requests.RequestException: If the request still fails after retries.
+        """
         url = f"{self.base_url}{path}"
-        response = requests.get(url)
-        response.raise_for_status()
-        return response.json()
\ No newline at end of file
+        endpoint = self.endpoints.get(path)
+
+        def fetch():
+            started = time.monotonic()
+            with UpstreamCall(endpoint.name) as call:
+                response = self.session.get(url, timeout=self.timeout, **_conditional(validators))
+                call.status, call.size = response.status_code, len(response.content)
+            _check_modified(response, path, validators)
+            response.raise_for_status()
+            data = response.json()
+            endpoint.latency.record(time.monotonic() - started)
+            return data
+
+        return self._call(endpoint, fetch)
+
+    def stream_items(self, path: str, key: str, validators: Optional[CacheValidators] = None) -> Iterator[dict]:
+        """
+        Yield the items of the `key` array in the JSON object at `path` as their bytes arrive,
+        without buffering the whole body or building the full dict tree first.
+        `validators` make the request conditional, as in `get`.
+
+        Failures are retried only until the first item has been yielded; after that the
+        caller already holds part of the body, so the error is raised instead.
+        """
+        url = f"{self.base_url}{path}"
+        endpoint = self.endpoints.get(path)
+        endpoint.breaker.before_call()
+        delays = self.retry.delays()
+
+        while True:
+            yielded = False
+            try:
+                with UpstreamCall(endpoint.name) as call, \
+                        self.session.get(url, timeout=self.timeout, stream=True, **_conditional(validators)) as response:
+                    call.status = response.status_code
+                    _check_modified(response, path, validators)
+                    response.raise_for_status()
+                    chunks = call.count(response.iter_content(chunk_size=config.HTTP_STREAM_CHUNK_SIZE))
+                    for item in iter_array_items(chunks, key):
+                        yielded = True
+                        yield item
+            except Exception as e:
+                delay = next(delays, None) if is_retryable(e) and not yielded else None
+                if delay is None:
+                    endpoint.breaker.record(e)
+                    raise
+                time.sleep(delay)
+            else:
+                endpoint.breaker.record_success()
+                return
+
+    def _call(self, endpoint: UpstreamEndpoint, fetch: Callable[[], T]) -> T:
+        endpoint.breaker.before_call()
+        delays = self.retry.delays()
+
+        while True:
+            try:
+                result = self._hedged(endpoint, fetch) if self._hedge_pool is not None else fetch()
+            except Exception as e:
+                delay = next(delays, None) if is_retryable(e) else None
+                if delay is None:
+                    endpoint.breaker.record(e)
+                    raise
+                time.sleep(delay)
+            else:
+                endpoint.breaker.record_success()
+                return result
+
+    def _hedged(self, endpoint: UpstreamEndpoint, fetch: Callable[[], T]) -> T:
+        first = self._hedge_pool.submit(fetch)
+        done, _ = wait([first], timeout=_hedge_delay(endpoint))
+        if done:
+            return first.result()
+
+        pending = {first, self._hedge_pool.submit(fetch)}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def close(self):
+        """
+        Release every pooled connection held by the session.
+        """
+        self.session.close()
+        if self._hedge_pool is not None:
+            self._hedge_pool.shutdown(wait=False)
+
+
+# Asyncio-native variant of MockApiClient for the async request path
+#
+# Backed by one httpx.AsyncClient, so awaiting an upstream call never ties up a worker thread.
+# The underlying client is created lazily on first use and rebuilt if it is used from a
+# different event loop, since pooled connections belong to the loop that opened them.
+# Retries, hedging and circuit breaking behave as in MockApiClient; a losing hedged request is cancelled.
+class AsyncMockApiClient:
+    def __init__(
+            self,
+            base_url: str = config.MOCK_API_BASE_URL,
+            pool_maxsize: int = config.HTTP_POOL_MAXSIZE,
+            connect_timeout: float = config.HTTP_CONNECT_TIMEOUT,
+            read_timeout: float = config.HTTP_READ_TIMEOUT,
+            retry: Optional[RetryPolicy] = None,
+            endpoints: UpstreamEndpoints = upstream_endpoints,
+            hedge: bool = config.HTTP_HEDGE_ENABLED
+    ):
+        self.base_url = base_url
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=pool_maxsize, max_keepalive_connections=pool_maxsize)
+        self.retry = retry or default_retry_policy()
+        self.endpoints = endpoints
+        self.hedge = hedge
+        self._session: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def session(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._loop is not loop:
+            self._session = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+            self._loop = loop
+        return self._session
+
+    async def get(self, path: str, validators: Optional[CacheValidators] = None):
+        """
+        Async version of `MockApiClient.get`.
+        """
+        url = f"{self.base_url}{path}"
+        endpoint = self.endpoints.get(path)
+
+        async def fetch():
+            started = time.monotonic()
+            with UpstreamCall(endpoint.name) as call:
+                response = await self.session.get(url, **_conditional(validators))
+                call.status, call.size = response.status_code, len(response.content)
+            _check_modified(response, path, validators)
+            response.raise_for_status()
+            data = response.json()
+            endpoint.latency.record(time.monotonic() - started)
+            return data
+
+        return await self._call(endpoint, fetch)
+
+    async def stream_items(
+            self,
+            path: str,
+            key: str,
+            validators: Optional[CacheValidators] = None
+    ) -> AsyncIterator[dict]:
+        """
+        Async version of `MockApiClient.stream_items`.
+        """
+        url = f"{self.base_url}{path}"
+        endpoint = self.endpoints.get(path)
+        endpoint.breaker.before_call()
+        delays = self.retry.delays()
+
+        while True:
+            yielded = False
+            try:
+                parser = JsonArrayStreamParser(key)
+                with UpstreamCall(endpoint.name) as call:
+                    async with self.session.stream("GET", url, **_conditional(validators)) as response:
+                        call.status = response.status_code
+                        _check_modified(response, path, validators)
+                        response.raise_for_status()
+                        async for chunk in call.acount(response.aiter_bytes(config.HTTP_STREAM_CHUNK_SIZE)):
+                            for item in parser.feed(chunk):
+                                yielded = True
+                                yield item
+                parser.close()
+            except Exception as e:
+                delay = next(delays, None) if is_retryable(e) and not yielded else None
+                if delay is None:
+                    endpoint.breaker.record(e)
+                    raise
+                await asyncio.sleep(delay)
+            else:
+                endpoint.breaker.record_success()
+                return
+
+    async def _call(self, endpoint: UpstreamEndpoint, fetch: Callable[[], Awaitable[T]]) -> T:
+        endpoint.breaker.before_call()
+        delays = self.retry.delays()
+
+        while True:
+            try:
+                result = await (self._hedged(endpoint, fetch) if self.hedge else fetch())
+            except Exception as e:
+                delay = next(delays, None) if is_retryable(e) else None
+                if delay is None:
+                    endpoint.breaker.record(e)
+                    raise
+                await asyncio.sleep(delay)
+            else:
+                endpoint.breaker.record_success()
+                return result
+
+    async def _hedged(self, endpoint: UpstreamEndpoint, fetch: Callable[[], Awaitable[T]]) -> T:
+        pending = {asyncio.ensure_future(fetch())}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=_hedge_delay(endpoint))
+            if done:
+                return done.pop().result()
+
+            pending.add(asyncio.ensure_future(fetch()))
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def close(self):
+        """
+        Release every pooled connection held by the session.
+        """
+        if self._session is not None:
+            await self._session.aclose()
+            self._session = None
+            self._loop = None
+
+
+# Shared clients used by every service module, so they all draw from the same connection pools
+client = MockApiClient()
+async_client = AsyncMockApiClient()
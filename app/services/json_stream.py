@@ -0,0 +1,140 @@
+import codecs
+import json
+import re
+from typing import Iterable, Iterator, List
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+# Parser states
+_EXPECT_OBJECT = 0    # before the top-level "{"
+_EXPECT_KEY = 1       # before a top-level key (or the closing "}")
+_SKIP_VALUE = 2       # before the value of a key we are not streaming
+_EXPECT_ARRAY = 3     # before the "[" of the streamed array
+_EXPECT_ITEM = 4      # before an item of the streamed array (or the closing "]")
+_DONE = 5             # the streamed array (or, if the key is absent, the object) has ended
+
+
+class JsonArrayStreamParser:
+    """
+    Incremental parser that yields the items of one array inside a top-level JSON object,
+    e.g. the objects in `{"packages": [...]}`, as soon as each item's bytes have arrived.
+
+    Feed it chunks of bytes in order with `feed`, which returns the items completed by that
+    chunk, then call `close` to check the array actually ended. Only the unparsed tail of the
+    input is buffered, so memory stays proportional to one item rather than the whole body.
+    If the key is absent, no items are produced, matching `data.get(key, [])`.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._pos = 0
+        self._state = _EXPECT_OBJECT
+
+    def feed(self, chunk: bytes) -> List[dict]:
+        if self._state == _DONE:
+            return []
+        self._buffer = self._buffer[self._pos:] + self._utf8.decode(chunk)
+        self._pos = 0
+        return self._parse()
+
+    def close(self):
+        """
+        Signal the end of input.
+
+        Raises:
+            ValueError: If the input ended before the top-level object (or streamed array) was complete.
+        """
+        self._utf8.decode(b"", final=True)
+        if self._state != _DONE:
+            raise ValueError(f"Truncated or malformed JSON while streaming '{self.key}'")
+
+    def _skip_whitespace(self) -> bool:
+        """
+        Advance past whitespace; False when the buffer is exhausted.
+        """
+        self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+        return self._pos < len(self._buffer)
+
+    def _decode_value(self):
+        """
+        Decode one complete JSON value at the current position, or raise `_Incomplete`.
+        """
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, self._pos)
+        except json.JSONDecodeError:
+            raise _Incomplete
+        # A number at the very end of the buffer may continue in the next chunk
+        if end == len(self._buffer) and not isinstance(value, (dict, list, str)):
+            raise _Incomplete
+        self._pos = end
+        return value
+
+    def _parse(self) -> List[dict]:
+        items = []
+        try:
+            while self._state != _DONE and self._skip_whitespace():
+                char = self._buffer[self._pos]
+
+                if self._state == _EXPECT_OBJECT:
+                    self._expect(char, "{")
+                    self._state = _EXPECT_KEY
+
+                elif self._state == _EXPECT_KEY:
+                    if char == ",":
+                        self._pos += 1
+                        continue
+                    if char == "}":
+                        self._pos += 1
+                        self._state = _DONE
+                        continue
+                    start = self._pos
+                    key = self._decode_value()
+                    if not self._skip_whitespace():
+                        self._pos = start
+                        raise _Incomplete
+                    self._expect(self._buffer[self._pos], ":")
+                    self._state = _EXPECT_ARRAY if key == self.key else _SKIP_VALUE
+
+                elif self._state == _SKIP_VALUE:
+                    self._decode_value()
+                    self._state = _EXPECT_KEY
+
+                elif self._state == _EXPECT_ARRAY:
+                    self._expect(char, "[")
+                    self._state = _EXPECT_ITEM
+
+                elif self._state == _EXPECT_ITEM:
+                    if char == ",":
+                        self._pos += 1
+                    elif char == "]":
+                        self._pos += 1
+                        self._state = _DONE
+                    else:
+                        items.append(self._decode_value())
+        except _Incomplete:
+            pass
+        return items
+
+    def _expect(self, char: str, expected: str):
+        if char != expected:
+            raise ValueError(f"Unexpected '{char}' while streaming '{self.key}', expected '{expected}'")
+        self._pos += 1
+
+
+class _Incomplete(Exception):
+    """
+    The buffer ends partway through a value; parsing resumes when the next chunk arrives.
+    """
+
+
+def iter_array_items(chunks: Iterable[bytes], key: str) -> Iterator[dict]:
+    """
+    Yield the items of the `key` array from a JSON object delivered as byte chunks.
+    """
+    parser = JsonArrayStreamParser(key)
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    parser.close()
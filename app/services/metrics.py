@@ -0,0 +1,299 @@
+import threading
+import time
+from bisect import bisect_left
+from typing import AsyncIterable, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+from app.services import profiling
+
+# Latency buckets in seconds, from a warm cache hit to a slow upstream call
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Payload size buckets in bytes, from one package to a full multi-megabyte /tracking feed
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# One exported sample: metric name suffix, label pairs and value
+Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+
+class _CounterValue:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+
+class _GaugeValue(_CounterValue):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # The last slot is the +Inf bucket
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+
+class Metric:
+    """
+    A named metric family with fixed label names; `labels(...)` returns the child holding one series.
+
+    Children are created once per label combination and then looked up with a single dict get, so
+    recording on the hot path costs a lookup and one uncontended lock. Label values must come from
+    a small, bounded set (route templates and endpoint names, never raw paths or IDs).
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def _series(self) -> Iterator[Tuple[Tuple[Tuple[str, str], ...], object]]:
+        for values, child in list(self._children.items()):
+            yield tuple(zip(self.labelnames, map(str, values))), child
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self._series():
+            yield "", labels, child.value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterValue()
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeValue()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, child in self._series():
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", labels + (("le", _format_value(bound)),), cumulative
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative
+
+
+class MetricFamily:
+    """
+    A metric computed at scrape time by a collector, e.g. from a cache's own hit and miss counters.
+    """
+
+    def __init__(self, name: str, kind: str, documentation: str, samples: Iterable[Tuple[Dict[str, str], float]]):
+        self.name = name
+        self.kind = kind
+        self.documentation = documentation
+        self._samples = samples
+
+    def samples(self) -> Iterator[Sample]:
+        for labels, value in self._samples:
+            yield "", tuple((key, str(label)) for key, label in labels.items()), value
+
+
+class MetricsRegistry:
+    """
+    Holds the process's metrics and renders them in the Prometheus text exposition format.
+    """
+
+    def __init__(self):
+        self._metrics: List[Metric] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        """
+        Register a function called on every scrape that returns metric families computed on the spot.
+        """
+        self._collectors.append(collector)
+
+    def clear(self):
+        """
+        Drop every recorded series (collectors stay registered).
+        """
+        for metric in self._metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        families = list(self._metrics)
+        for collector in self._collectors:
+            families.extend(collector())
+
+        lines = []
+        for family in families:
+            lines.append(f"# HELP {family.name} {_escape(family.documentation, help_text=True)}")
+            lines.append(f"# TYPE {family.name} {family.kind}")
+            for suffix, labels, value in family.samples():
+                if labels:
+                    rendered = ",".join(f'{key}="{_escape(label)}"' for key, label in labels)
+                    lines.append(f"{family.name}{suffix}{{{rendered}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{family.name}{suffix} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(text: str, help_text: bool = False) -> str:
+    text = text.replace("\\", "\\\\").replace("\n", "\\n")
+    return text if help_text else text.replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == int(value):
+        return str(int(value))
+    return repr(float(value))
+
+
+# Process-wide registry served on GET /metrics
+registry = MetricsRegistry()
+
+http_requests = registry.counter(
+    "http_requests_total", "Requests handled, by route template, method and status code.", ("route", "method", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Time to handle a request, by route template and method.", ("route", "method")
+)
+http_response_size = registry.histogram(
+    "http_response_size_bytes", "Response body size, by route template.", ("route",), SIZE_BUCKETS
+)
+http_in_flight = registry.gauge("http_requests_in_flight", "Requests currently being handled.")
+
+upstream_requests = registry.counter(
+    "upstream_requests_total",
+    "Upstream HTTP requests, by endpoint and status code (\"error\" when no response arrived).",
+    ("endpoint", "status")
+)
+upstream_duration = registry.histogram(
+    "upstream_request_duration_seconds", "Upstream request time including the body transfer, by endpoint.", ("endpoint",)
+)
+upstream_response_size = registry.histogram(
+    "upstream_response_size_bytes", "Upstream response body size, by endpoint.", ("endpoint",), SIZE_BUCKETS
+)
+upstream_in_flight = registry.gauge("upstream_requests_in_flight", "Upstream requests currently open, by endpoint.", ("endpoint",))
+
+
+class UpstreamCall:
+    """
+    Records one upstream request (attempt) on exit: latency, status, body size and in-flight count.
+
+        with UpstreamCall(endpoint.name) as call:
+            response = session.get(url)
+            call.status, call.size = response.status_code, len(response.content)
+
+    The status stays "error" when the block raises before a response was recorded. For a profiled
+    request the time is also added to its "upstream" phase, minus any time the caller spent working
+    on streamed chunks (see `count`), so that phase only covers waiting on the upstream.
+    """
+
+    __slots__ = ("endpoint", "status", "size", "_started", "_consumer_seconds")
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.status = "error"
+        self.size = 0
+        self._consumer_seconds = 0.0
+
+    def __enter__(self) -> "UpstreamCall":
+        upstream_in_flight.labels(self.endpoint).inc()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = time.perf_counter() - self._started
+        upstream_duration.labels(self.endpoint).observe(elapsed)
+        upstream_in_flight.labels(self.endpoint).dec()
+        upstream_requests.labels(self.endpoint, self.status).inc()
+        if self.size:
+            upstream_response_size.labels(self.endpoint).observe(self.size)
+        profiling.record("upstream", elapsed - self._consumer_seconds)
+
+    def count(self, chunks: Iterable[bytes]) -> Iterator[bytes]:
+        """
+        Pass streamed body chunks through, adding their length to the recorded size.
+        """
+        for chunk in chunks:
+            self.size += len(chunk)
+            paused = time.perf_counter()
+            yield chunk
+            self._consumer_seconds += time.perf_counter() - paused
+
+    async def acount(self, chunks: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+        """
+        Async version of `count`.
+        """
+        async for chunk in chunks:
+            self.size += len(chunk)
+            paused = time.perf_counter()
+            yield chunk
+            self._consumer_seconds += time.perf_counter() - paused
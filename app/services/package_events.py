@@ -0,0 +1,190 @@
+import asyncio
+import json
+import threading
+from typing import Dict, FrozenSet, List, Optional, Set
+from app import config
+from app.models.package import Package, PackageStatus
+
+
+class PackageEvent:
+    """
+    One change pushed to subscribers: a package added or updated, a package removed, or a request to resync.
+    """
+
+    UPDATE = "update"
+    REMOVED = "removed"
+    RESYNC = "resync"
+
+    __slots__ = ("kind", "tracking_id", "package", "sequence", "_encoded")
+
+    def __init__(self, kind: str, tracking_id: Optional[str], package: Optional[Package], sequence: int):
+        self.kind = kind
+        self.tracking_id = tracking_id
+        self.package = package
+        self.sequence = sequence
+        self._encoded: Optional[bytes] = None
+
+    def encode(self) -> bytes:
+        """
+        The event as a Server-Sent Events message; the snapshot sequence is its `id`.
+        Encoded once, however many subscribers the event is sent to.
+        """
+        if self._encoded is None:
+            if self.kind == self.UPDATE:
+                data = self.package.model_dump_json()
+            elif self.kind == self.REMOVED:
+                data = json.dumps({"tracking_id": self.tracking_id})
+            else:
+                data = "{}"
+            self._encoded = f"id: {self.sequence}\nevent: {self.kind}\ndata: {data}\n\n".encode()
+        return self._encoded
+
+
+class Subscription:
+    """
+    One connected client: what it watches and a bounded queue of events waiting to be sent to it.
+
+    Empty filters match everything; within a subscription, a package must match every non-empty filter.
+    When the client reads slower than events arrive and its queue fills up, the queued events are
+    dropped and replaced by a single resync event, so a slow client costs at most `max_queue` events.
+    """
+
+    def __init__(
+            self,
+            tracking_ids: FrozenSet[str] = frozenset(),
+            statuses: FrozenSet[PackageStatus] = frozenset(),
+            carriers: FrozenSet[str] = frozenset(),
+            max_queue: int = config.SSE_QUEUE_MAX_EVENTS
+    ):
+        self.tracking_ids = tracking_ids
+        self.statuses = statuses
+        self.carriers = carriers
+        self.queue: "asyncio.Queue[PackageEvent]" = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._loop = asyncio.get_running_loop()
+
+    def matches(self, package: Optional[Package]) -> bool:
+        return package is not None \
+            and (not self.tracking_ids or package.tracking_id in self.tracking_ids) \
+            and (not self.statuses or package.status in self.statuses) \
+            and (not self.carriers or package.carrier in self.carriers)
+
+    async def get(self) -> PackageEvent:
+        return await self.queue.get()
+
+    def deliver(self, events: List[PackageEvent]):
+        """
+        Queue events from any thread; they are added on the subscriber's own event loop.
+        """
+        try:
+            self._loop.call_soon_threadsafe(self._offer, events)
+        except RuntimeError:
+            pass  # The subscriber's loop has closed; it is about to be unsubscribed
+
+    def _offer(self, events: List[PackageEvent]):
+        for event in events:
+            try:
+                self.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.dropped += self.queue.qsize()
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                self.queue.put_nowait(PackageEvent(PackageEvent.RESYNC, None, None, events[-1].sequence))
+                return
+
+
+class PackageEventBroker:
+    """
+    Fans the changes in each new /tracking snapshot out to subscribers.
+
+    Subscribers watching specific tracking IDs are indexed by ID, so an update is routed to them
+    with a dict lookup; only subscribers filtering by status or carrier alone are checked against
+    every changed package. A package is sent to a subscriber when either its old or its new version
+    matches, so a subscriber to "In Transit" also hears about a package leaving that status.
+    """
+
+    def __init__(self, max_subscribers: int = config.SSE_MAX_SUBSCRIBERS):
+        self.max_subscribers = max_subscribers
+        self._by_id: Dict[str, Set[Subscription]] = {}
+        self._unindexed: Set[Subscription] = set()
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def subscribe(self, subscription: Subscription) -> bool:
+        """
+        Register a subscription; False when the broker is full.
+        """
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return False
+            if subscription.tracking_ids:
+                for tracking_id in subscription.tracking_ids:
+                    self._by_id.setdefault(tracking_id, set()).add(subscription)
+            else:
+                self._unindexed.add(subscription)
+            self._count += 1
+            return True
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            if subscription.tracking_ids:
+                removed = False
+                for tracking_id in subscription.tracking_ids:
+                    subscribers = self._by_id.get(tracking_id)
+                    if subscribers is not None and subscription in subscribers:
+                        subscribers.discard(subscription)
+                        removed = True
+                        if not subscribers:
+                            del self._by_id[tracking_id]
+            else:
+                removed = subscription in self._unindexed
+                self._unindexed.discard(subscription)
+            if removed:
+                self._count -= 1
+
+    def publish(self, snapshot, previous, tracking_ids: Set[str]):
+        """
+        Send subscribers the changes to `tracking_ids` between the `previous` and new `snapshot`.
+        Without a previous snapshot nothing can be diffed, so every subscriber is told to resync.
+        """
+        with self._lock:
+            if not self._count:
+                return
+            if previous is None:
+                everyone = self._unindexed.union(*self._by_id.values())
+            else:
+                unindexed = list(self._unindexed)
+                by_id = {tracking_id: list(self._by_id[tracking_id]) for tracking_id in tracking_ids if tracking_id in self._by_id}
+
+        if previous is None:
+            resync = [PackageEvent(PackageEvent.RESYNC, None, None, snapshot.sequence)]
+            for subscription in everyone:
+                subscription.deliver(resync)
+            return
+
+        outbox: Dict[Subscription, List[PackageEvent]] = {}
+        for tracking_id in tracking_ids:
+            candidates = by_id.get(tracking_id, [])
+            if unindexed:
+                candidates = candidates + unindexed
+            if not candidates:
+                continue
+
+            before, after = previous.get(tracking_id), snapshot.get(tracking_id)
+            if after is not None:
+                event = PackageEvent(PackageEvent.UPDATE, tracking_id, after, snapshot.sequence)
+            else:
+                event = PackageEvent(PackageEvent.REMOVED, tracking_id, None, snapshot.sequence)
+            for subscription in candidates:
+                if subscription.matches(after) or subscription.matches(before):
+                    outbox.setdefault(subscription, []).append(event)
+
+        for subscription, events in outbox.items():
+            subscription.deliver(events)
+
+
+# Process-wide broker behind GET /packages/stream
+package_events = PackageEventBroker()
@@ -1,10 +1,304 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
 from fastapi import HTTPException  # Use FastAPI's HTTPException, not http.client's
-from typing import List, Optional
-from app.models.package import Package, PackageStatus, SortBy
-from app.models.enriched_package import EnrichedPackage, CityMetadata
-from app.services.http_client import MockApiClient
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import quote
+from app.models.package import Package, PackageChanges, PackageStatus, SortBy
+from app.models.enriched_package import EnrichedPackage, CityMetadata, EnrichmentResult
+from app import config
+from app.services.http_client import CacheValidators, NotModifiedError, client, async_client, is_not_found
+from app.services.change_log import ChangeLog, decode_sync_token, encode_sync_token
+from app.services.resilience import CircuitOpenError
+from app.services.city_cache import CityMetadataCache
+from app.services.geo_index import GeoIndex
+from app.services.package_events import package_events
+from app.services.package_store import PackageStore, epoch_micros
+from app.services.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from app.services.profiling import phase
+from app.services.snapshot_cache import Snapshot, SnapshotCache
+from app.services.tracking_snapshot import TrackingSnapshot, validate_batch
 
-client = MockApiClient()
+logger = logging.getLogger(__name__)
+
+# Process-wide snapshot of the parsed /tracking payload, shared by every request.
+# Expired snapshots are served while a refresh runs (up to TRACKING_MAX_STALE_SECONDS),
+# and for as long as the /tracking circuit is open.
+tracking_cache: SnapshotCache[TrackingSnapshot] = SnapshotCache(
+    ttl_seconds=config.TRACKING_CACHE_TTL_SECONDS,
+    max_stale_seconds=config.TRACKING_MAX_STALE_SECONDS,
+    serve_stale_on=(CircuitOpenError,),
+    content_key=lambda snapshot: snapshot.digest  # Computed when the snapshot is built, off the event loop
+)
+
+# Upstream ETag / Last-Modified of the cached /tracking snapshot, for conditional refreshes
+_last_tracking_validators = CacheValidators()
+
+# Which packages each new /tracking snapshot added, changed or removed, for the change feed
+change_log = ChangeLog(max_entries=config.CHANGE_LOG_MAX_ENTRIES)
+
+# Bounded LRU of /locations/{city} responses; city metadata is effectively static
+city_cache = CityMetadataCache(
+    maxsize=config.CITY_CACHE_MAXSIZE,
+    ttl_seconds=config.CITY_CACHE_TTL_SECONDS,
+    negative_ttl_seconds=config.CITY_CACHE_NEGATIVE_TTL_SECONDS
+)
+
+
+def _previous_snapshot() -> Optional[TrackingSnapshot]:
+    snapshot = tracking_cache.snapshot
+    return snapshot.value if snapshot is not None else None
+
+
+def _tracking_validators(previous: Optional[TrackingSnapshot]) -> CacheValidators:
+    """
+    Validators for the next /tracking request: a conditional one only when there is a snapshot to keep.
+    Loaders work on a copy and commit it only once the new snapshot is built.
+    """
+    return _last_tracking_validators.copy() if previous is not None else CacheValidators()
+
+
+def _commit_tracking_validators(validators: CacheValidators):
+    global _last_tracking_validators
+    _last_tracking_validators = validators
+
+
+def _snapshot_key(validators: CacheValidators) -> Optional[str]:
+    """
+    Key for a snapshot in the change log: the upstream ETag it was served with, which every worker
+    that loaded the same payload shares, so sync tokens stay valid across workers and restarts.
+    """
+    return validators.etag
+
+
+def _publish(snapshot: TrackingSnapshot, previous: Optional[TrackingSnapshot], validators: CacheValidators) -> TrackingSnapshot:
+    """
+    Record what a freshly built snapshot changed in the change log, stamp it with its sequence,
+    and push the changes to stream subscribers. Returns the snapshot to cache: `previous` when
+    nothing changed, so an identical payload keeps the current snapshot and its version.
+    """
+    if previous is None:
+        snapshot.sequence = change_log.reset(_snapshot_key(validators))
+        package_events.publish(snapshot, None, set())
+        return snapshot
+    touched = snapshot.changed_ids | snapshot.removed_ids
+    if not touched:
+        return previous
+    snapshot.sequence = change_log.record(touched, _snapshot_key(validators))
+    package_events.publish(snapshot, previous, touched)
+    return snapshot
+
+
+def _load_snapshot() -> TrackingSnapshot:
+    # Stream-parse /tracking so each package is validated as its bytes arrive.
+    # On a 304 the current snapshot is reused as-is, keeping its version.
+    previous = _previous_snapshot()
+    validators = _tracking_validators(previous)
+    try:
+        snapshot = TrackingSnapshot.from_items(
+            client.stream_items("/tracking", "packages", validators=validators),
+            previous=previous
+        )
+    except NotModifiedError:
+        return previous
+    _commit_tracking_validators(validators)
+    return _publish(snapshot, previous, validators)
+
+
+async def _abatched(items: AsyncIterator[dict], size: int) -> AsyncIterator[List[dict]]:
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _load_snapshot_async() -> TrackingSnapshot:
+    # Batches are validated on worker threads while the rest of the body downloads, and the
+    # snapshot (store copy, diff and orderings) is built on one too; only publishing runs on the loop.
+    previous = _previous_snapshot()
+    validators = _tracking_validators(previous)
+    items = async_client.stream_items("/tracking", "packages", validators=validators)
+    packages: List[Package] = []
+    try:
+        async for batch in _abatched(items, config.VALIDATION_BATCH_SIZE):
+            packages.extend(await asyncio.to_thread(validate_batch, batch))
+    except NotModifiedError:
+        return previous
+    snapshot = await asyncio.to_thread(TrackingSnapshot, packages, previous)
+    _commit_tracking_validators(validators)
+    return _publish(snapshot, previous, validators)
+
+
+def _warm_snapshot() -> Optional[TrackingSnapshot]:
+    """
+    The cached snapshot if it may still be served, otherwise None. Never calls the upstream.
+    """
+    snapshot = tracking_cache.snapshot
+    return snapshot.value if tracking_cache.is_usable(snapshot) else None
+
+
+def _stale_lookup(tracking_id: str, error: CircuitOpenError) -> Optional[Package]:
+    """
+    Answer from the expired snapshot while the per-ID endpoint's circuit is open, if there is one.
+    """
+    snapshot = tracking_cache.snapshot
+    if snapshot is None:
+        raise error
+    return snapshot.value.get(tracking_id)
+
+
+def _load_city(city: str) -> Optional[CityMetadata]:
+    try:
+        return CityMetadata(**client.get(f"/locations/{quote(city, safe='')}"))
+    except Exception as e:
+        if is_not_found(e):
+            return None
+        raise
+
+
+async def _load_city_async(city: str) -> Optional[CityMetadata]:
+    try:
+        return CityMetadata(**await async_client.get(f"/locations/{quote(city, safe='')}"))
+    except Exception as e:
+        if is_not_found(e):
+            return None
+        raise
+
+
+def _require_city(city: str, metadata: Optional[CityMetadata]) -> CityMetadata:
+    if metadata is None:
+        raise LookupError(f"No location metadata for city '{city}'")
+    return metadata
+
+
+async def refresh_tracking_snapshot():
+    """
+    Fetch a new /tracking snapshot now, joining any refresh already in flight.
+    """
+    await tracking_cache.refresh(_load_snapshot_async)
+
+
+def invalidate_tracking_cache():
+    """
+    Discard the cached /tracking snapshot so the next request fetches fresh data.
+    """
+    tracking_cache.invalidate()
+    _commit_tracking_validators(CacheValidators())
+
+
+def export_tracking_state() -> Optional[Tuple[TrackingSnapshot, CacheValidators]]:
+    """
+    The cached /tracking snapshot and its upstream validators, for persisting; None before the first load.
+    """
+    snapshot = tracking_cache.snapshot
+    return (snapshot.value, _last_tracking_validators.copy()) if snapshot is not None else None
+
+
+def seed_tracking_snapshot(snapshot: TrackingSnapshot, validators: CacheValidators) -> bool:
+    """
+    Serve a restored /tracking snapshot until the first refresh, which revalidates it with `validators`.
+    Does nothing if a snapshot is already loaded.
+    """
+    if not tracking_cache.seed(snapshot):
+        return False
+    snapshot.sequence = change_log.reset(_snapshot_key(validators))
+    _commit_tracking_validators(validators)
+    return True
+
+
+def adopt_tracking_store(store: PackageStore, validators: CacheValidators, age: float):
+    """
+    Make packages another worker loaded (read from the shared snapshot file) the current snapshot.
+    They are diffed against the current snapshot, so the change feed and stream subscribers see
+    what changed, and an unchanged payload keeps the current snapshot and its version.
+    """
+    previous = _previous_snapshot()
+    snapshot = _publish(TrackingSnapshot.from_store(store, previous), previous, validators)
+    tracking_cache.put(snapshot, age)
+    _commit_tracking_validators(validators)
+
+
+def _select(
+        snapshot: TrackingSnapshot,
+        status: Optional[PackageStatus] = None,
+        sort_by: Optional[SortBy] = None
+) -> List[Package]:
+    """
+    Read the snapshot's precomputed index for this status filter and sort order.
+    """
+    return snapshot.select(PackageStatus(status) if status else None, SortBy(sort_by) if sort_by else None)
+
+
+def _iter_select(
+        snapshot: TrackingSnapshot,
+        status: Optional[PackageStatus] = None,
+        sort_by: Optional[SortBy] = None
+) -> Iterator[Package]:
+    return snapshot.iter_select(PackageStatus(status) if status else None, SortBy(sort_by) if sort_by else None)
+
+
+def _lookup_package(tracking_id: str) -> Optional[Package]:
+    """
+    Find one package via the warm snapshot's index, falling back to the per-ID upstream endpoint.
+    """
+    snapshot = _warm_snapshot()
+    if snapshot is not None:
+        return snapshot.get(tracking_id)
+
+    try:
+        data = client.get(f"/tracking/{quote(tracking_id, safe='')}")
+        with phase("validation"):
+            return Package(**data)
+    except CircuitOpenError as e:
+        return _stale_lookup(tracking_id, e)
+    except Exception as e:
+        if is_not_found(e):
+            return None
+        raise
+
+
+async def _lookup_package_async(tracking_id: str) -> Optional[Package]:
+    snapshot = _warm_snapshot()
+    if snapshot is not None:
+        return snapshot.get(tracking_id)
+
+    try:
+        data = await async_client.get(f"/tracking/{quote(tracking_id, safe='')}")
+        with phase("validation"):
+            return Package(**data)
+    except CircuitOpenError as e:
+        return _stale_lookup(tracking_id, e)
+    except Exception as e:
+        if is_not_found(e):
+            return None
+        raise
+
+
+async def get_tracking_snapshot_async() -> Snapshot[TrackingSnapshot]:
+    """
+    The /tracking snapshot requests are currently served from, with its version, loading it if needed.
+    The version changes only when the package data does, so it can back HTTP validators. Pass the
+    snapshot's value as `snapshot` to the functions below so a response's ETag and body come from
+    the same copy; without it they read whatever is cached at the time.
+    """
+    return await tracking_cache.aget_snapshot(_load_snapshot_async)
+
+
+async def _current_snapshot_async(snapshot: Optional[TrackingSnapshot]) -> TrackingSnapshot:
+    return snapshot if snapshot is not None else await tracking_cache.aget(_load_snapshot_async)
+
+
+def get_warm_tracking_key() -> Optional[str]:
+    """
+    Content key of the snapshot per-ID lookups are answered from, or None while they go to the upstream.
+    Never calls the upstream.
+    """
+    snapshot = tracking_cache.snapshot
+    return snapshot.key if tracking_cache.is_usable(snapshot) else None
 
 
 def get_all_packages(
@@ -12,55 +306,345 @@ def get_all_packages(
         sort_by: Optional[SortBy] = None
 ) -> List[Package]:
     """
-    Fetch all packages from the mock API,
+    Fetch all packages from the cached /tracking snapshot,
     optionally filtered by status and sorted by eta or last_updated.
     """
-    data = client.get("/tracking")
-    packages = [Package(**item) for item in data.get("packages", [])]
+    return _select(tracking_cache.get(_load_snapshot), status, sort_by)
 
-    # Filter by status (case-insensitive)
-    if status:
-        packages = [pkg for pkg in packages if pkg.status.lower() == status.value.lower()]
 
-    # Sort packages
-    if sort_by == SortBy.eta:
-        packages.sort(key=lambda x: x.eta)  # Earliest ETA first
-    elif sort_by == SortBy.last_updated:
-        packages.sort(key=lambda x: x.last_updated, reverse=True)  # Most recent first
+async def get_all_packages_async(
+        status: Optional[PackageStatus] = None,
+        sort_by: Optional[SortBy] = None,
+        snapshot: Optional[TrackingSnapshot] = None
+) -> List[Package]:
+    """
+    Async version of `get_all_packages`, using the asyncio-native client.
+    Packages are materialized on a worker thread, so a large result never blocks the event loop.
+    """
+    return await asyncio.to_thread(_select, await _current_snapshot_async(snapshot), status, sort_by)
 
-    return packages
+
+async def iter_packages_async(
+        status: Optional[PackageStatus] = None,
+        sort_by: Optional[SortBy] = None,
+        snapshot: Optional[TrackingSnapshot] = None
+) -> Iterator[Package]:
+    """
+    Like `get_all_packages_async`, but returns a lazy iterator over the snapshot index
+    so a streaming response never holds a copy of the full result.
+    """
+    return _iter_select(await _current_snapshot_async(snapshot), status, sort_by)
+
+
+def _page(
+        snapshot: TrackingSnapshot,
+        status: Optional[PackageStatus],
+        sort_by: Optional[SortBy],
+        limit: int,
+        cursor: Optional[str]
+) -> Tuple[List[Package], Optional[str]]:
+    status = PackageStatus(status) if status else None
+    sort_by = SortBy(sort_by) if sort_by else None
+    status_value = status.value if status else None
+    sort_value = sort_by.value if sort_by else None
+
+    after = decode_cursor(cursor, status_value, sort_value) if cursor else None
+    try:
+        packages, next_key = snapshot.page(status, sort_by, limit, after)
+    except TypeError:
+        # The cursor decoded but its key cannot be compared with this ordering's keys
+        raise InvalidCursorError("Invalid cursor")
+
+    next_cursor = encode_cursor(status_value, sort_value, next_key) if next_key is not None else None
+    return packages, next_cursor
+
+
+async def get_packages_page_async(
+        status: Optional[PackageStatus] = None,
+        sort_by: Optional[SortBy] = None,
+        limit: int = config.PAGE_DEFAULT_LIMIT,
+        cursor: Optional[str] = None,
+        snapshot: Optional[TrackingSnapshot] = None
+) -> Tuple[List[Package], Optional[str]]:
+    """
+    Fetch one page of packages using keyset pagination.
+
+    Without a sort, pages are ordered by tracking ID. The cursor records the sort key of the
+    last package returned rather than an offset, so paging stays consistent across snapshot refreshes.
+
+    Returns:
+        Tuple[List[Package], Optional[str]]: The page, and the cursor for the next page (None on the last page).
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or was issued for a different status or sort.
+    """
+    return await asyncio.to_thread(_page, await _current_snapshot_async(snapshot), status, sort_by, limit, cursor)
 
 
 def get_package_by_tracking_id(tracking_id: str) -> Optional[Package]:
     """
     Retrieve a package by tracking ID.
+    Served from the snapshot index when it is warm, otherwise from /tracking/{id}.
+    """
+    return _lookup_package(tracking_id)
+
+
+async def get_package_by_tracking_id_async(tracking_id: str) -> Optional[Package]:
+    """
+    Async version of `get_package_by_tracking_id`.
+    """
+    return await _lookup_package_async(tracking_id)
+
+
+def _parse_since(since: str) -> Optional[datetime]:
+    """
+    The timestamp in `since`, or None when it is not one (and so should be a sync token).
     """
-    data = client.get("/tracking")
-    for item in data.get("packages", []):
-        if item["tracking_id"] == tracking_id:
-            return Package(**item)
-    return None
+    try:
+        timestamp = datetime.fromisoformat(since)
+    except ValueError:
+        return None
+    return timestamp if timestamp.tzinfo is not None else timestamp.replace(tzinfo=timezone.utc)
+
+
+def _sorted_changes(packages: List[Package]) -> List[Package]:
+    return sorted(packages, key=lambda pkg: (pkg.last_updated, pkg.tracking_id))
+
+
+def _changes(snapshot: TrackingSnapshot, since: Optional[str]) -> PackageChanges:
+    token = encode_sync_token(snapshot.sequence, change_log.key_of(snapshot.sequence))
+    timestamp = _parse_since(since) if since else None
+
+    if timestamp is not None:
+        touched = change_log.changed_after(timestamp.timestamp(), snapshot.sequence)
+    elif since:
+        sequence, key = decode_sync_token(since)
+        if sequence is None and key is not None:
+            # Issued by another worker or before a restart: find the same upstream snapshot in this log
+            sequence = change_log.sequence_of(key)
+        touched = change_log.changed_since(sequence, snapshot.sequence) if sequence is not None else None
+    else:
+        touched = None
+
+    if touched is None:
+        # No `since`, or one this process can no longer diff from (so removals could be missed): start the consumer over
+        return PackageChanges(packages=list(snapshot.iter_select(None, None)), removed=[], token=token, reset=True)
+
+    if timestamp is not None:
+        # Packages the upstream marked as updated after `since`, plus any this service saw change since then
+        packages = {pkg.tracking_id: pkg for pkg in snapshot.updated_after(epoch_micros(timestamp))}
+        removed = []
+        for tracking_id in touched - packages.keys():
+            pkg = snapshot.get(tracking_id)
+            if pkg is None:
+                removed.append(tracking_id)
+            else:
+                packages[tracking_id] = pkg
+        return PackageChanges(packages=_sorted_changes(list(packages.values())), removed=sorted(removed), token=token, reset=False)
+
+    packages, removed = [], []
+    for tracking_id in touched:
+        pkg = snapshot.get(tracking_id)
+        if pkg is None:
+            removed.append(tracking_id)
+        else:
+            packages.append(pkg)
+    return PackageChanges(packages=_sorted_changes(packages), removed=sorted(removed), token=token, reset=False)
+
+
+async def get_changes_async(since: Optional[str] = None, snapshot: Optional[TrackingSnapshot] = None) -> PackageChanges:
+    """
+    Packages added, updated or removed since `since`, plus a token for the next poll.
+
+    `since` is either an ISO-8601 timestamp or a sync token from a previous poll:
+    - A timestamp returns packages whose last_updated is after it, read from the last_updated
+      index, plus packages this service saw change or disappear between snapshots since then.
+    - A token returns exactly the packages that changed in the snapshots published after it,
+      from the change log, so the cost follows the number of changes rather than the fleet size.
+
+    A token issued by another worker, or before a restart, is resolved through the upstream ETag
+    of the snapshot it was issued for. Without `since`, or when the change log no longer reaches
+    back to it, every package is returned with `reset` set. The delta is built on a worker thread.
+
+    Raises:
+        InvalidSyncTokenError: If `since` is neither a timestamp nor a valid token.
+    """
+    return await asyncio.to_thread(_changes, await _current_snapshot_async(snapshot), since)
 
 
 def get_enriched_package(tracking_id: str) -> Optional[EnrichedPackage]:
     """
     Retrieve a package by tracking ID and enrich it with city metadata.
+    City metadata comes from the LRU cache, so a warm lookup makes no upstream calls.
     """
     try:
-        data = client.get("/tracking")
-
-        package_entry = next((p for p in data.get("packages", []) if p["tracking_id"] == tracking_id), None)
-        if not package_entry:
+        package = _lookup_package(tracking_id)
+        if not package:
             return None
 
-        package = Package(**package_entry)
-        current_city = package.current_city.lower()
+        city_metadata = _require_city(package.current_city, city_cache.get(package.current_city, _load_city))
+
+        return EnrichedPackage(package=package, city_metadata=city_metadata)
+
+    except Exception:
+        logger.error("Enriching package %s failed", tracking_id, exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal Server Error")
 
-        city_data = client.get(f"/locations/{current_city}")
-        city_metadata = CityMetadata(**city_data)
+
+async def get_enriched_package_async(tracking_id: str) -> Optional[EnrichedPackage]:
+    """
+    Async version of `get_enriched_package`.
+    """
+    try:
+        package = await _lookup_package_async(tracking_id)
+        if not package:
+            return None
+
+        city_metadata = _require_city(
+            package.current_city,
+            await city_cache.aget(package.current_city, _load_city_async)
+        )
 
         return EnrichedPackage(package=package, city_metadata=city_metadata)
 
-    except Exception as e:
-        print(f"ERROR in get_enriched_package: {e}")
+    except Exception:
+        logger.error("Enriching package %s failed", tracking_id, exc_info=True)
         raise HTTPException(status_code=500, detail="Internal Server Error")
+
+
+async def _resolve_cities(cities: Set[str], caller: str) -> Dict[str, object]:
+    """
+    Metadata for each normalized city name, None when unknown, or the exception that loading it raised.
+    At most `ENRICH_CITY_CONCURRENCY` /locations requests are in flight.
+    """
+    semaphore = asyncio.Semaphore(config.ENRICH_CITY_CONCURRENCY)
+
+    async def resolve(city: str):
+        async with semaphore:
+            try:
+                return await city_cache.aget(city, _load_city_async)
+            except Exception as e:
+                logger.error("%s: loading city '%s' failed", caller, city, exc_info=True)
+                return e
+
+    resolved = await asyncio.gather(*(resolve(city) for city in cities))
+    return dict(zip(cities, resolved))
+
+
+async def prefetch_cities_async(snapshot: Optional[TrackingSnapshot] = None) -> int:
+    """
+    Load metadata for every city in `snapshot` (by default the cached /tracking snapshot) that is
+    not cached yet, and return how many were requested. Never loads the snapshot itself.
+    """
+    snapshot = snapshot if snapshot is not None else _previous_snapshot()
+    if snapshot is None:
+        return 0
+    cities = {city_cache.normalize(city) for city in snapshot.store.cities.values if not city_cache.contains(city)}
+    await _resolve_cities(cities, "prefetch_cities_async")
+    return len(cities)
+
+
+def _build_geo_index(snapshot: TrackingSnapshot) -> GeoIndex:
+    city_rows = snapshot.city_rows()
+    coordinates = {}
+    for city in city_rows:
+        metadata = city_cache.peek(city)
+        if metadata is not None:
+            coordinates[city] = (metadata.lat, metadata.lon)
+    return GeoIndex(city_rows, coordinates, config.GEO_GRID_CELL_DEGREES)
+
+
+async def _load_geo_index_async(snapshot: TrackingSnapshot, prefetch: bool) -> GeoIndex:
+    if prefetch:
+        await prefetch_cities_async(snapshot)
+    return await asyncio.to_thread(_build_geo_index, snapshot)
+
+
+async def _geo_index_async(snapshot: TrackingSnapshot) -> GeoIndex:
+    """
+    The geo index for `snapshot`, built on first use and kept on the snapshot. Cities with no cached
+    coordinates are requested once per snapshot, and the index is rebuilt if coordinates for a missing
+    city arrive later. Concurrent callers await the same build.
+    """
+    build = snapshot.geo_index_build
+    if build is not None and not build.done() and build.get_loop() is not asyncio.get_running_loop():
+        build = None  # Left pending by an event loop that has since closed; it will never finish
+    if build is None or (build.done() and (build.cancelled() or build.exception() is not None)):
+        build = asyncio.ensure_future(_load_geo_index_async(snapshot, prefetch=True))
+    elif build.done() and any(city_cache.peek(city) is not None for city in build.result().missing):
+        build = asyncio.ensure_future(_load_geo_index_async(snapshot, prefetch=False))
+    snapshot.geo_index_build = build
+
+    # Shield the shared build so one cancelled request does not cancel it for everyone else
+    return await asyncio.shield(build)
+
+
+def _near(
+        snapshot: TrackingSnapshot,
+        index: GeoIndex,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        status: Optional[PackageStatus],
+        sort_by: Optional[SortBy]
+) -> List[Package]:
+    matches = index.query(lat, lon, radius_km)
+    rows = (row for _, city_rows in matches for row in city_rows)
+    return snapshot.select_rows(rows, PackageStatus(status) if status else None, SortBy(sort_by) if sort_by else None)
+
+
+async def get_packages_near_async(
+        lat: float,
+        lon: float,
+        radius_km: float,
+        status: Optional[PackageStatus] = None,
+        sort_by: Optional[SortBy] = None
+) -> List[Package]:
+    """
+    Packages whose current city is within `radius_km` of (`lat`, `lon`), optionally filtered by status.
+
+    Packages are joined to their city's coordinates from the city metadata cache, through a grid index
+    built once per snapshot. Without a sort, the nearest cities come first (packages within a city in
+    upstream order); packages in cities with no known coordinates are never returned.
+
+    Raises:
+        InvalidLocationError: If the point or radius is out of range.
+    """
+    snapshot = await tracking_cache.aget(_load_snapshot_async)
+    index = await _geo_index_async(snapshot)
+    return await asyncio.to_thread(_near, snapshot, index, lat, lon, radius_km, status, sort_by)
+
+
+async def get_enriched_packages_async(tracking_ids: List[str]) -> List[EnrichmentResult]:
+    """
+    Enrich many packages at once.
+
+    All packages are resolved from one tracking snapshot, and each distinct city is requested
+    from /locations at most once, with at most `ENRICH_CITY_CONCURRENCY` requests in flight.
+    Unknown IDs and per-city failures are reported on the affected results instead of failing the batch.
+    """
+    snapshot = await tracking_cache.aget(_load_snapshot_async)
+    tracking_ids = list(dict.fromkeys(tracking_ids))  # De-duplicate, keeping request order
+    packages = {tracking_id: snapshot.get(tracking_id) for tracking_id in tracking_ids}
+
+    cities = {city_cache.normalize(pkg.current_city) for pkg in packages.values() if pkg is not None}
+    metadata = await _resolve_cities(cities, "get_enriched_packages_async")
+
+    results = []
+    for tracking_id, package in packages.items():
+        if package is None:
+            results.append(EnrichmentResult(tracking_id=tracking_id, error="Package not found"))
+            continue
+
+        city_metadata = metadata[city_cache.normalize(package.current_city)]
+        if city_metadata is None:
+            results.append(EnrichmentResult(tracking_id=tracking_id, error="City metadata not found"))
+        elif isinstance(city_metadata, Exception):
+            results.append(EnrichmentResult(tracking_id=tracking_id, error="Upstream error fetching city metadata"))
+        else:
+            results.append(EnrichmentResult(
+                tracking_id=tracking_id,
+                enriched=EnrichedPackage(package=package, city_metadata=city_metadata)
+            ))
+
+    return results
@@ -0,0 +1,189 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Tuple
+from app.models.package import Package, PackageStatus
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+_MINUTE = timedelta(minutes=1)
+
+# Offset column value for a naive timestamp; real offsets are within ±24h, i.e. ±1440 minutes
+NAIVE = -32768
+
+# One package as stored:
+# (tracking_id, carrier code, status code, city code, eta, last_updated, eta offset, last_updated offset)
+Row = Tuple[str, int, int, int, int, int, int, int]
+
+
+def epoch_micros(value: datetime) -> int:
+    """
+    Integer microseconds since the Unix epoch. Naive datetimes are treated as UTC.
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // _MICROSECOND
+
+
+def from_epoch_micros(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def utc_offset_minutes(value: datetime) -> int:
+    """
+    The UTC offset of `value` in whole minutes, or `NAIVE` when it has none.
+    """
+    offset = value.utcoffset()
+    return NAIVE if offset is None else offset // _MINUTE
+
+
+def to_datetime(micros: int, offset_minutes: int) -> datetime:
+    """
+    Rebuild a timestamp stored as epoch microseconds plus its UTC offset, as the upstream sent it:
+    in its original offset, or naive.
+    """
+    value = from_epoch_micros(micros)
+    if offset_minutes == NAIVE:
+        return value.replace(tzinfo=None)
+    if offset_minutes == 0:
+        return value
+    return value.astimezone(timezone(timedelta(minutes=offset_minutes)))
+
+
+class StringTable:
+    """
+    Interns repeated strings (carrier, status, city) as small integer codes.
+    """
+
+    def __init__(self, values: Optional[List[str]] = None):
+        self.values: List[str] = list(values or [])
+        self._codes: Dict[str, int] = {value: code for code, value in enumerate(self.values)}
+
+    def code(self, value: str) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self._codes[value] = code
+            self.values.append(value)
+        return code
+
+    def copy(self) -> "StringTable":
+        return StringTable(self.values)
+
+
+class PackageStore:
+    """
+    Columnar storage for the packages in one tracking snapshot.
+
+    Timestamps are held as int64 epoch microseconds (UTC), so they sort and compare directly,
+    plus an int16 column with the UTC offset in minutes the upstream sent (`NAIVE` for none),
+    so they are returned exactly as received. Carrier, status and city are interned codes,
+    so a row costs a few dozen bytes instead of a full Pydantic model with its own strings
+    and datetime objects. Rows are addressed by integer row number;
+    `Package` models are only materialized for rows actually returned to a caller.
+    """
+
+    def __init__(self):
+        self.tracking_ids: List[str] = []
+        self.carriers = StringTable()
+        self.statuses = StringTable([status.value for status in PackageStatus])
+        self.cities = StringTable()
+        self.carrier_codes = array("H")
+        self.status_codes = array("B")
+        self.city_codes = array("I")
+        self.eta = array("q")
+        self.last_updated = array("q")
+        self.eta_offsets = array("h")
+        self.last_updated_offsets = array("h")
+
+    def copy(self) -> "PackageStore":
+        """
+        An independent copy whose rows can be overwritten without affecting this store.
+        """
+        store = PackageStore.__new__(PackageStore)
+        store.tracking_ids = list(self.tracking_ids)
+        store.carriers = self.carriers.copy()
+        store.statuses = self.statuses.copy()
+        store.cities = self.cities.copy()
+        store.carrier_codes = array("H", self.carrier_codes)
+        store.status_codes = array("B", self.status_codes)
+        store.city_codes = array("I", self.city_codes)
+        store.eta = array("q", self.eta)
+        store.last_updated = array("q", self.last_updated)
+        store.eta_offsets = array("h", self.eta_offsets)
+        store.last_updated_offsets = array("h", self.last_updated_offsets)
+        return store
+
+    def encode(self, pkg: Package) -> Row:
+        """
+        Column values for a validated package, interning its strings.
+        """
+        return (
+            pkg.tracking_id,
+            self.carriers.code(pkg.carrier),
+            self.statuses.code(pkg.status.value),
+            self.cities.code(pkg.current_city),
+            epoch_micros(pkg.eta),
+            epoch_micros(pkg.last_updated),
+            utc_offset_minutes(pkg.eta),
+            utc_offset_minutes(pkg.last_updated)
+        )
+
+    def row(self, index: int) -> Row:
+        return (
+            self.tracking_ids[index],
+            self.carrier_codes[index],
+            self.status_codes[index],
+            self.city_codes[index],
+            self.eta[index],
+            self.last_updated[index],
+            self.eta_offsets[index],
+            self.last_updated_offsets[index]
+        )
+
+    def append(self, row: Row) -> int:
+        """
+        Add a row and return its row number.
+        """
+        tracking_id, carrier, status, city, eta, last_updated, eta_offset, last_updated_offset = row
+        self.tracking_ids.append(tracking_id)
+        self.carrier_codes.append(carrier)
+        self.status_codes.append(status)
+        self.city_codes.append(city)
+        self.eta.append(eta)
+        self.last_updated.append(last_updated)
+        self.eta_offsets.append(eta_offset)
+        self.last_updated_offsets.append(last_updated_offset)
+        return len(self.tracking_ids) - 1
+
+    def overwrite(self, index: int, row: Row):
+        tracking_id, carrier, status, city, eta, last_updated, eta_offset, last_updated_offset = row
+        self.tracking_ids[index] = tracking_id
+        self.carrier_codes[index] = carrier
+        self.status_codes[index] = status
+        self.city_codes[index] = city
+        self.eta[index] = eta
+        self.last_updated[index] = last_updated
+        self.eta_offsets[index] = eta_offset
+        self.last_updated_offsets[index] = last_updated_offset
+
+    def status_code(self, status: PackageStatus) -> int:
+        return self.statuses.code(status.value)
+
+    def city(self, index: int) -> str:
+        return self.cities.values[self.city_codes[index]]
+
+    def package(self, index: int) -> Package:
+        """
+        Materialize one row as a `Package`. Rows were validated on the way in, so this skips validation.
+        """
+        return Package.model_construct(
+            tracking_id=self.tracking_ids[index],
+            carrier=self.carriers.values[self.carrier_codes[index]],
+            status=PackageStatus(self.statuses.values[self.status_codes[index]]),
+            eta=to_datetime(self.eta[index], self.eta_offsets[index]),
+            last_updated=to_datetime(self.last_updated[index], self.last_updated_offsets[index]),
+            current_city=self.cities.values[self.city_codes[index]]
+        )
+
+    def __len__(self) -> int:
+        return len(self.tracking_ids)
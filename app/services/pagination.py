@@ -0,0 +1,39 @@
+import base64
+import binascii
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class InvalidCursorError(ValueError):
+    """
+    Raised when a pagination cursor cannot be decoded or does not match the query it is used with.
+    """
+
+
+def encode_cursor(status: Optional[str], sort_by: Optional[str], key: Tuple[Any, ...]) -> str:
+    """
+    Build an opaque keyset cursor pointing just after `key` in the (status, sort_by) ordering.
+    """
+    raw = json.dumps({"st": status, "s": sort_by, "k": list(key)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, status: Optional[str], sort_by: Optional[str]) -> Tuple[Any, ...]:
+    """
+    Return the sort key stored in `cursor`.
+
+    Raises:
+        InvalidCursorError: If the cursor is malformed or was issued for a different filter or sort.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key: List[Any] = payload["k"]
+        issued_for = (payload["st"], payload["s"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor")
+
+    if issued_for != (status, sort_by) or not isinstance(key, list):
+        raise InvalidCursorError("Cursor does not match the requested status and sort")
+
+    return tuple(key)
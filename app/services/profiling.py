@@ -0,0 +1,102 @@
+import threading
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class RequestProfile:
+    """
+    Wall time spent per phase (upstream I/O, validation, serialization) while handling one request.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self._token = None
+        self._lock = threading.Lock()  # Sync code run in the threadpool records from worker threads
+
+    def add(self, phase: str, seconds: float):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+            self.calls[phase] = self.calls.get(phase, 0) + 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        """
+        The phases as a Server-Timing header value, in milliseconds.
+        """
+        with self._lock:
+            phases = dict(self.phases)
+        entries = [f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in phases.items()]
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+
+# The profile of the request being handled, if it is being profiled. Context variables follow
+# the request into awaited coroutines, tasks it starts, and threads started through asyncio.to_thread
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+
+
+def start_profile() -> RequestProfile:
+    """
+    Profile the rest of the current request; pair with `stop_profile`.
+    """
+    profile = RequestProfile()
+    profile._token = _current.set(profile)
+    return profile
+
+
+def stop_profile(profile: RequestProfile):
+    _current.reset(profile._token)
+
+
+def record(phase: str, seconds: float):
+    """
+    Add time to `phase` of the current request's profile; does nothing when the request is not profiled.
+    """
+    profile = _current.get()
+    if profile is not None:
+        profile.add(phase, seconds)
+
+
+class _Phase:
+    __slots__ = ("profile", "name", "started")
+
+    def __init__(self, profile: RequestProfile, name: str):
+        self.profile = profile
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.profile.add(self.name, time.perf_counter() - self.started)
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_PHASE = _NoPhase()
+
+
+def phase(name: str):
+    """
+    Time the enclosed block as `name` in the current request's profile.
+
+        with phase("validation"):
+            packages = PackageListAdapter.validate_python(batch)
+
+    Outside a profiled request this costs one context variable read and returns a shared no-op.
+    """
+    profile = _current.get()
+    return _NO_PHASE if profile is None else _Phase(profile, name)
@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional
+from app import config
+from app.services.snapshot_cache import SnapshotCache
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshTarget:
+    """
+    One cache kept warm by the refresher, and the coroutine function that refreshes it.
+    """
+
+    def __init__(self, name: str, cache: SnapshotCache, refresh: Callable[[], Awaitable]):
+        self.name = name
+        self.cache = cache
+        self.refresh = refresh
+
+
+class BackgroundRefresher:
+    """
+    Asyncio task that refreshes snapshot caches ahead of expiry, so requests are served
+    from a fresh snapshot instead of paying for the upstream round trip themselves.
+
+    Every `interval_seconds`, each target whose snapshot is missing or older than
+    `ahead_fraction` of its TTL is refreshed, all targets concurrently. Refreshes go through
+    the cache's single-flight path, so a request that expires a snapshot at the same moment
+    joins the same upstream call. A failed refresh keeps the last good snapshot and is retried
+    with exponential backoff, capped at the target's TTL.
+    """
+
+    def __init__(
+            self,
+            targets: List[RefreshTarget],
+            interval_seconds: float = config.REFRESH_CHECK_INTERVAL_SECONDS,
+            ahead_fraction: float = config.REFRESH_AHEAD_FRACTION
+    ):
+        self.targets = targets
+        self.interval_seconds = interval_seconds
+        self.ahead_fraction = ahead_fraction
+        self._failures: Dict[str, int] = {}
+        self._retry_at: Dict[str, float] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def is_due(self, target: RefreshTarget) -> bool:
+        if time.monotonic() < self._retry_at.get(target.name, 0):
+            return False
+        snapshot = target.cache.snapshot
+        return snapshot is None or snapshot.age() >= target.cache.ttl_seconds * self.ahead_fraction
+
+    async def refresh_due(self):
+        """
+        Refresh every due target once.
+        """
+        due = [target for target in self.targets if self.is_due(target)]
+        await asyncio.gather(*(self._refresh(target) for target in due))
+
+    async def _refresh(self, target: RefreshTarget):
+        try:
+            await target.refresh()
+        except Exception:
+            failures = self._failures.get(target.name, 0) + 1
+            self._failures[target.name] = failures
+            backoff = min(self.interval_seconds * 2 ** failures, target.cache.ttl_seconds)
+            self._retry_at[target.name] = time.monotonic() + backoff
+            logger.error(
+                "Background refresh of %s failed (attempt %d, next in %.1fs)", target.name, failures, backoff, exc_info=True
+            )
+        else:
+            self._failures.pop(target.name, None)
+            self._retry_at.pop(target.name, None)
+
+    async def run(self):
+        while True:
+            await self.refresh_due()
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        """
+        Start refreshing on the running event loop; the first round runs immediately to warm the caches.
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
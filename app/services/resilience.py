@@ -0,0 +1,228 @@
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional
+
+import httpx
+import requests
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of calling an upstream endpoint whose circuit breaker is open.
+    """
+
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"Circuit open for upstream endpoint '{endpoint}', retry in {retry_after:.1f}s")
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    True for failures worth retrying an idempotent GET for: connection errors, timeouts,
+    broken bodies, 429 and 5xx responses. Other 4xx responses are answers, not failures.
+    """
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)):
+        return True
+    if isinstance(error, httpx.TransportError):
+        return True
+    response = getattr(error, "response", None)
+    status_code = getattr(response, "status_code", None)
+    return isinstance(status_code, int) and (status_code == 429 or status_code >= 500)
+
+
+def endpoint_name(path: str) -> str:
+    """
+    Group request paths by endpoint, e.g. "/tracking/PKG1" and "/tracking/PKG2" are both "/tracking/*".
+    """
+    parts = path.split("?", 1)[0].strip("/").split("/", 1)
+    return "/" + parts[0] + ("/*" if len(parts) > 1 else "")
+
+
+class RetryPolicy:
+    """
+    Capped exponential backoff with full jitter: the delay before retry `n` is drawn uniformly
+    from [0, min(max_delay, base_delay * 2**n)], so clients that failed together do not retry together.
+    """
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delays(self) -> Iterator[float]:
+        """
+        One delay per retry after the first attempt.
+        """
+        for attempt in range(self.max_attempts - 1):
+            yield random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class LatencyWindow:
+    """
+    Latencies of the most recent successful calls to one endpoint, used to pick the hedge delay.
+    """
+
+    def __init__(self, size: int, min_samples: int = 20):
+        self._samples = deque(maxlen=size)
+        self._min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """
+        The `q` quantile (0-1) of the window, or None until enough calls were observed.
+        """
+        with self._lock:
+            if len(self._samples) < self._min_samples:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class CircuitBreaker:
+    """
+    Per-endpoint circuit breaker.
+
+    Closed: calls go through. After `failure_threshold` consecutive failed calls the circuit
+    opens and calls fail fast with `CircuitOpenError` for `reset_timeout` seconds. It then goes
+    half-open and lets a single probe call through: success closes the circuit, failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, endpoint: str, failure_threshold: int, reset_timeout: float):
+        self.endpoint = endpoint
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_started_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def retry_after(self) -> float:
+        """
+        Seconds until an open circuit lets a probe through (0 when not open).
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def before_call(self):
+        """
+        Raises:
+            CircuitOpenError: If the circuit is open, or half-open with a probe already in flight.
+        """
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return
+            now = time.monotonic()
+            # A probe abandoned without reporting back (e.g. a stream closed early) expires after reset_timeout
+            probe_active = self._probe_started_at is not None and now - self._probe_started_at < self.reset_timeout
+            if state == self.HALF_OPEN and not probe_active:
+                self._probe_started_at = now
+                return
+            retry_after = max(0.0, self.reset_timeout - (now - self._opened_at))
+        raise CircuitOpenError(self.endpoint, retry_after)
+
+    def record_success(self):
+        with self._lock:
+            self.consecutive_failures = 0
+            self._opened_at = None
+            self._probe_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.consecutive_failures += 1
+            if self._probe_started_at is not None or self.consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._probe_started_at = None
+
+    def record(self, error: Optional[Exception]):
+        """
+        Record the outcome of a call. Only retryable errors count as failures;
+        anything else (e.g. a 404) means the endpoint answered.
+        """
+        if error is not None and is_retryable(error):
+            self.record_failure()
+        else:
+            self.record_success()
+
+
+class UpstreamEndpoint:
+    """
+    Circuit breaker and latency window for one upstream endpoint.
+    """
+
+    def __init__(self, name: str, breaker: CircuitBreaker, latency: LatencyWindow):
+        self.name = name
+        self.breaker = breaker
+        self.latency = latency
+
+    def hedge_delay(self, percentile: float, min_delay: float, max_delay: float) -> float:
+        """
+        How long to wait for a call before sending a hedged duplicate: the endpoint's recent
+        `percentile` latency clamped to [min_delay, max_delay], or max_delay before enough calls were seen.
+        """
+        observed = self.latency.percentile(percentile)
+        if observed is None:
+            return max_delay
+        return min(max(observed, min_delay), max_delay)
+
+
+class UpstreamEndpoints:
+    """
+    Registry of `UpstreamEndpoint`s, created on first use. Shared by the sync and async
+    clients so both see the same breaker state for the same upstream.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, latency_window: int):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.latency_window = latency_window
+        self._endpoints: Dict[str, UpstreamEndpoint] = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: str) -> UpstreamEndpoint:
+        name = endpoint_name(path)
+        endpoint = self._endpoints.get(name)
+        if endpoint is None:
+            with self._lock:
+                endpoint = self._endpoints.get(name)
+                if endpoint is None:
+                    endpoint = UpstreamEndpoint(
+                        name,
+                        CircuitBreaker(name, self.failure_threshold, self.reset_timeout),
+                        LatencyWindow(self.latency_window)
+                    )
+                    self._endpoints[name] = endpoint
+        return endpoint
+
+    def all(self) -> List[UpstreamEndpoint]:
+        with self._lock:
+            return sorted(self._endpoints.values(), key=lambda endpoint: endpoint.name)
+
+    def clear(self):
+        with self._lock:
+            self._endpoints.clear()
@@ -0,0 +1,93 @@
+import gzip
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class CachedResponse:
+    """
+    Final encoded bytes of one response, plus a gzip-compressed copy when compression pays off.
+    """
+
+    def __init__(self, body: bytes, media_type: str, headers: Dict[str, str], gzipped: Optional[bytes] = None):
+        self.body = body
+        self.media_type = media_type
+        self.headers = headers
+        self.gzipped = gzipped
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzipped or b"")
+
+
+class ResponseCache:
+    """
+    Bounded LRU of encoded response bodies, keyed by a string that already identifies the
+    snapshot content, route, normalized query and media type (the response's ETag).
+
+    The budget is counted in body bytes (plain plus gzip copy). Least recently used entries are
+    evicted until the total fits; a single response larger than the whole budget is not cached.
+    Entries for superseded snapshots are never looked up again and simply age out.
+    """
+
+    def __init__(self, max_bytes: int, gzip_min_bytes: int, gzip_level: int = 5, compress: bool = True):
+        self.max_bytes = max_bytes
+        self.gzip_min_bytes = gzip_min_bytes
+        self.gzip_level = gzip_level
+        self.compress = compress
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, body: bytes, media_type: str, headers: Dict[str, str]) -> CachedResponse:
+        """
+        Store a response (compressing it outside the lock) and return the entry, cached or not.
+        """
+        gzipped = None
+        if self.compress and len(body) >= self.gzip_min_bytes:
+            gzipped = gzip.compress(body, compresslevel=self.gzip_level)
+            if len(gzipped) >= len(body):
+                gzipped = None
+        entry = CachedResponse(body, media_type, headers, gzipped)
+        if entry.size > self.max_bytes:
+            return entry
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = entry
+            self._bytes += entry.size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)  # Evict the least recently used response
+                self._bytes -= evicted.size
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes
+            }
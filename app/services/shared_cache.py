@@ -0,0 +1,164 @@
+import asyncio
+import logging
+import os
+import time
+from typing import IO, List, Optional, Tuple
+from app import config
+from app.services.carrier_service import adopt_carriers, carrier_cache, refresh_carriers
+from app.services.package_service import adopt_tracking_store, city_cache, prefetch_cities_async, refresh_tracking_snapshot, tracking_cache
+from app.services.refresher import RefreshTarget
+from app.services.warm_start import cache_versions, read_saved_state, save_warm_start
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where workers cannot share the file
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class SharedSnapshotCache:
+    """
+    Host-local cache shared by every worker process through one snapshot file.
+
+    Whichever worker holds an exclusive `flock` on `<path>.lock` is the leader: its refreshes
+    call the upstream, load metadata for any new city in the /tracking snapshot, and then
+    publish all three caches to the file. Every other worker is a follower: its refreshes
+    only check whether the file was replaced and, if so, install its contents. Upstream
+    traffic therefore scales with hosts rather than workers. The lock is released when the
+    leader exits, and the next follower to refresh takes over.
+
+    A leader refresh that changed nothing (e.g. the upstream answered 304) does not rewrite
+    the file; it only bumps its mtime, which records when the contents were last revalidated.
+
+    While attached, requests never refresh a loaded snapshot themselves, so only the leader
+    calls the upstream. Followers still do when a request finds nothing cached at all, e.g.
+    before the leader's first publish. Requires `fcntl`, so it is not `supported` on Windows.
+    """
+
+    supported = fcntl is not None
+
+    def __init__(self, path: str = config.SNAPSHOT_FILE_PATH, max_age_seconds: float = config.SNAPSHOT_FILE_MAX_AGE_SECONDS):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.max_age_seconds = max_age_seconds
+        self._lock_file: Optional[IO] = None
+        self._seen: Optional[Tuple[int, int, int]] = None  # (inode, mtime, size) of the file last installed
+        self._published: Optional[Tuple] = None  # `cache_versions` when this worker last wrote the file
+
+    def attach(self):
+        """
+        Route every refresh of a loaded /tracking or /carriers snapshot through the refresher, and so the leader.
+        """
+        tracking_cache.refresh_on_read = False
+        carrier_cache.refresh_on_read = False
+
+    def detach(self):
+        """
+        Give up the leader lock and let requests refresh the caches themselves again.
+        """
+        self.resign()
+        tracking_cache.refresh_on_read = True
+        carrier_cache.refresh_on_read = True
+
+    @property
+    def is_leader(self) -> bool:
+        return self._lock_file is not None
+
+    def try_lead(self) -> bool:
+        """
+        Become the leader unless another process already is. Never blocks.
+        """
+        if self._lock_file is not None:
+            return True
+        directory = os.path.dirname(self.lock_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(self.lock_path, "a+b")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def resign(self):
+        if self._lock_file is not None:
+            self._lock_file.close()  # Closing the descriptor releases the flock
+            self._lock_file = None
+            self._published = None
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def publish(self) -> bool:
+        """
+        Write the caches to the shared file, or only mark it revalidated when nothing changed since
+        this worker last wrote it; True when it was written. Files are replaced atomically, so
+        followers never read a partial one.
+        """
+        versions = cache_versions()
+        if versions == self._published and self._seen is not None and self._stat() == self._seen:
+            os.utime(self.path)
+            self._seen = self._stat()
+            return False
+        published = save_warm_start(self.path)
+        self._seen = self._stat()
+        self._published = versions if published else None
+        return published
+
+    def sync(self) -> bool:
+        """
+        Install the shared file's contents if it changed since the last sync and is not older than
+        `max_age_seconds`; True when they were installed.
+        """
+        seen = self._stat()
+        if seen is None or seen == self._seen:
+            return False
+        age = max(0.0, time.time() - seen[1] / 1e9)  # Since the leader last wrote or revalidated it
+        if age > self.max_age_seconds:
+            logger.warning("Ignoring snapshot file %s: last revalidated %.0fs ago", self.path, age)
+            self._seen = seen
+            return False
+        state = read_saved_state(self.path)
+        if state is None:
+            return False
+
+        if state.store is not None:
+            adopt_tracking_store(state.store, state.tracking_validators, age)
+        if state.carriers is not None:
+            adopt_carriers(state.carriers, state.carrier_validators, age)
+        for key, metadata, ttl in state.live_cities():
+            if not city_cache.contains(key):
+                city_cache.put(key, metadata, ttl)
+        self._seen = seen
+        return True
+
+    async def refresh_tracking(self):
+        if self.try_lead():
+            await refresh_tracking_snapshot()
+            await prefetch_cities_async()
+            await asyncio.to_thread(self.publish)
+        else:
+            await asyncio.to_thread(self.sync)
+
+    async def refresh_carriers(self):
+        if self.try_lead():
+            await refresh_carriers()
+            await asyncio.to_thread(self.publish)
+        else:
+            await asyncio.to_thread(self.sync)
+
+    def targets(self) -> List[RefreshTarget]:
+        """
+        Background refresher targets that go through the shared file.
+        """
+        return [
+            RefreshTarget("/tracking", tracking_cache, self.refresh_tracking),
+            RefreshTarget("/carriers", carrier_cache, self.refresh_carriers)
+        ]
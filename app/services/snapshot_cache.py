@@ -0,0 +1,276 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Generic, Optional, Tuple, Type, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class Snapshot(Generic[T]):
+    """
+    One immutable, parsed copy of an upstream payload.
+
+    `version` is local to the process; `key`, when the cache computes one, identifies the content
+    itself, so every process holding the same payload has the same key.
+    """
+
+    def __init__(self, value: T, version: int, fetched_at: float, key: Optional[str] = None):
+        self.value = value
+        self.version = version
+        self.fetched_at = fetched_at
+        self.key = key
+
+    def age(self) -> float:
+        """
+        Seconds since this snapshot was fetched.
+        """
+        return time.monotonic() - self.fetched_at
+
+
+class SnapshotCache(Generic[T]):
+    """
+    Process-wide cache holding the latest snapshot of one upstream payload.
+
+    A snapshot is served until it is older than `ttl_seconds`. When it expires, concurrent
+    callers join a single in-flight refresh instead of each calling the upstream:
+    sync callers serialize on a refresh lock and re-check freshness once they hold it, and
+    async callers await one shared task. The two paths have separate single-flight primitives,
+    and the lock guarding the snapshot itself is only held to swap it, never across a load,
+    so a sync refresh can never block the event loop. The loader is passed per call so the
+    cache never holds a reference to a particular client.
+
+    With `max_stale_seconds`, an expired snapshot younger than `ttl_seconds + max_stale_seconds`
+    is served immediately while the refresh runs in the background (stale-while-revalidate),
+    and a failed background refresh leaves the last good snapshot in place. Only a caller that
+    finds no snapshot, or one past that limit, waits for the upstream.
+
+    `invalidate` drops the snapshot and discards whatever a refresh already in flight loads:
+    the callers waiting on that refresh get its value, but it is never stored.
+
+    If a refresh fails with one of the `serve_stale_on` exception types (e.g. the upstream's
+    circuit breaker is open), the expired snapshot is served instead, however old, when there is one.
+
+    With `content_key`, each new value is given a key derived from its content (e.g. for ETags
+    shared by every process); it is computed once per version, when the value is stored.
+
+    With `refresh_on_read` off, a caller that finds a snapshot loaded is served it however old
+    and never starts a refresh; only `refresh` and `put` replace it (e.g. when one process
+    refreshes for several that share its snapshots). A caller that finds nothing loaded still loads.
+    """
+
+    def __init__(
+            self,
+            ttl_seconds: float,
+            max_stale_seconds: float = 0,
+            serve_stale_on: Tuple[Type[BaseException], ...] = (),
+            refresh_on_read: bool = True,
+            content_key: Optional[Callable[[T], str]] = None
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max_stale_seconds
+        self.serve_stale_on = serve_stale_on
+        self.refresh_on_read = refresh_on_read
+        self.content_key = content_key
+        self._snapshot: Optional[Snapshot[T]] = None
+        self._version = 0
+        self._lock = threading.Lock()  # Guards swaps of the snapshot and version only
+        self._refresh_lock = threading.Lock()  # Single-flight for sync refreshes; held across a load
+        self._inflight: Optional[asyncio.Future] = None
+        self._reported: Optional[asyncio.Future] = None  # Refresh whose failure its caller logs (the refresher)
+        self._generation = 0  # Bumped by `invalidate`; loads started before then are not stored
+        # Reads served fresh, served stale, and made to wait for the upstream; counted without the lock, so approximate
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @property
+    def snapshot(self) -> Optional[Snapshot[T]]:
+        """
+        The current snapshot, fresh or not, or None if nothing has been loaded yet.
+        """
+        return self._snapshot
+
+    def is_fresh(self, snapshot: Optional[Snapshot[T]]) -> bool:
+        return snapshot is not None and snapshot.age() < self.ttl_seconds
+
+    def is_usable(self, snapshot: Optional[Snapshot[T]]) -> bool:
+        """
+        True when the snapshot may still be served, fresh or within the staleness limit.
+        """
+        return snapshot is not None and snapshot.age() < self.ttl_seconds + self.max_stale_seconds
+
+    def get(self, load: Callable[[], T]) -> T:
+        """
+        Return the cached value, calling `load` at most once per expiry across threads.
+        """
+        snapshot = self._snapshot
+        if self.is_fresh(snapshot):
+            self.hits += 1
+            return snapshot.value
+
+        if self.is_usable(snapshot) or (snapshot is not None and not self.refresh_on_read):
+            # Serve stale; refresh on a background thread unless one is already running or reads never refresh
+            self.stale_hits += 1
+            if self.refresh_on_read and self._refresh_lock.acquire(blocking=False):
+                threading.Thread(target=self._refresh_in_background, args=(load,), daemon=True).start()
+            return snapshot.value
+
+        self.misses += 1
+        with self._refresh_lock:
+            # Another thread may have refreshed while we waited for the lock
+            snapshot = self._snapshot
+            if self.is_fresh(snapshot):
+                return snapshot.value
+            generation = self._generation
+            try:
+                return self._swap(load(), generation).value
+            except self.serve_stale_on:
+                if snapshot is None:
+                    raise
+                return snapshot.value
+
+    async def aget(self, load: Callable[[], Awaitable[T]]) -> T:
+        """
+        Async version of `get`; every caller that finds the snapshot expired awaits the same refresh.
+        """
+        return (await self.aget_snapshot(load)).value
+
+    async def aget_snapshot(self, load: Callable[[], Awaitable[T]]) -> Snapshot[T]:
+        """
+        Like `aget`, but returns the whole snapshot, so a caller can read its version and value
+        from the same copy even if a refresh or `invalidate` lands in between.
+        """
+        snapshot = self._snapshot
+        if self.is_fresh(snapshot):
+            self.hits += 1
+            return snapshot
+        if snapshot is not None and not self.refresh_on_read:
+            self.stale_hits += 1
+            return snapshot
+
+        inflight = self._start_refresh(load)
+        if self.is_usable(snapshot):
+            self.stale_hits += 1
+            return snapshot
+
+        self.misses += 1
+
+        # Shield the shared refresh so one cancelled caller does not cancel it for everyone else
+        try:
+            return await asyncio.shield(inflight)
+        except self.serve_stale_on:
+            if snapshot is None:
+                raise
+            return snapshot
+
+    async def refresh(self, load: Callable[[], Awaitable[T]]) -> Snapshot[T]:
+        """
+        Refresh now, joining the in-flight refresh if there is one, and return the new snapshot.
+        Used by the background refresher; failures propagate and leave the current snapshot in place,
+        and are left to the caller to log.
+        """
+        inflight = self._start_refresh(load)
+        self._reported = inflight
+        return await asyncio.shield(inflight)
+
+    def seed(self, value: T) -> bool:
+        """
+        Install a value restored from elsewhere (e.g. a snapshot file) when nothing is loaded yet.
+        It is aged as just expired, so it is served stale while the first refresh revalidates it.
+        Returns False, leaving the cache alone, when a snapshot is already loaded.
+        """
+        with self._lock:
+            if self._snapshot is not None:
+                return False
+            self._version += 1
+            self._snapshot = Snapshot(value, self._version, time.monotonic() - self.ttl_seconds, self._key(value))
+            return True
+
+    def put(self, value: T, age: float = 0.0) -> Snapshot[T]:
+        """
+        Store a value loaded outside this cache (e.g. by another process), as fetched `age` seconds ago.
+        Putting the current value back keeps its version.
+        """
+        with self._lock:
+            snapshot = self._store(value)
+            snapshot.fetched_at -= age
+            return snapshot
+
+    def invalidate(self):
+        """
+        Drop the current snapshot so the next caller fetches from the upstream.
+        """
+        with self._lock:
+            self._snapshot = None
+            self._inflight = None
+            self._generation += 1
+
+    def stats(self) -> Dict[str, float]:
+        snapshot = self._snapshot
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "version": self._version,
+            "age_seconds": snapshot.age() if snapshot is not None else 0.0
+        }
+
+    def _start_refresh(self, load: Callable[[], Awaitable[T]]) -> asyncio.Future:
+        inflight = self._inflight
+        # A refresh left pending by an event loop that has since closed will never finish
+        if inflight is None or inflight.done() or inflight.get_loop() is not asyncio.get_running_loop():
+            inflight = asyncio.ensure_future(self._refresh_async(load, self._generation))
+            inflight.add_done_callback(self._report_failure)
+            self._inflight = inflight
+        return inflight
+
+    def _report_failure(self, future: asyncio.Future):
+        """
+        Log a failed refresh unless the refresher awaits it and logs it itself. Also marks the error
+        as retrieved when every caller was served stale and nobody awaits it.
+        """
+        if future.cancelled() or future.exception() is None:
+            return
+        if future is self._reported:
+            self._reported = None
+            return
+        logger.error("Snapshot refresh failed", exc_info=future.exception())
+
+    async def _refresh_async(self, load: Callable[[], Awaitable[T]], generation: int) -> Snapshot[T]:
+        return self._swap(await load(), generation)
+
+    def _refresh_in_background(self, load: Callable[[], T]):
+        """
+        Runs on its own thread with `_refresh_lock` already held by the caller that started it.
+        """
+        generation = self._generation
+        try:
+            self._swap(load(), generation)
+        except Exception:
+            logger.error("Background snapshot refresh failed", exc_info=True)
+        finally:
+            self._refresh_lock.release()
+
+    def _swap(self, value: T, generation: int) -> Snapshot[T]:
+        with self._lock:
+            if generation != self._generation:
+                # Loaded before an `invalidate`: hand it to the callers that waited, but do not store it
+                return Snapshot(value, self._version, time.monotonic(), self._key(value))
+            return self._store(value)
+
+    def _key(self, value: T) -> Optional[str]:
+        return self.content_key(value) if self.content_key is not None else None
+
+    def _store(self, value: T) -> Snapshot[T]:
+        # A loader that returns the current value unchanged (e.g. on an upstream 304) keeps its version
+        current = self._snapshot
+        if current is None or value is not current.value:
+            self._version += 1
+            key = self._key(value)
+        else:
+            key = current.key
+        self._snapshot = Snapshot(value, self._version, time.monotonic(), key)
+        return self._snapshot
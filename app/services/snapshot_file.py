@@ -0,0 +1,168 @@
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from itertools import accumulate
+from typing import Any, Dict, Optional
+from app.services.package_store import PackageStore, StringTable
+
+# File layout: magic, u32 header length, JSON header, padding to 8 bytes, then the raw column bytes.
+# Column offsets in the header are relative to the start of the column section.
+MAGIC = b"PKGSNAP\x02"
+_HEADER_LENGTH = struct.Struct("<I")
+_ALIGN = 8
+
+# Typed columns of a PackageStore, written as their machine representation
+_COLUMNS = ("carrier_codes", "status_codes", "city_codes", "eta", "last_updated", "eta_offsets", "last_updated_offsets")
+
+
+class SnapshotFileError(ValueError):
+    """
+    Raised when a snapshot file is truncated, corrupt, or was written in an incompatible format.
+    """
+
+
+class SnapshotFile:
+    """
+    Contents of a snapshot file: the /tracking package store (None if none was saved),
+    the JSON metadata saved alongside it, and the wall time it was written.
+    """
+
+    def __init__(self, store: Optional[PackageStore], meta: Dict[str, Any], saved_at: float):
+        self.store = store
+        self.meta = meta
+        self.saved_at = saved_at
+
+    def age(self) -> float:
+        return time.time() - self.saved_at
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // _ALIGN) * _ALIGN
+
+
+def _store_columns(store: PackageStore) -> Dict[str, array]:
+    """
+    Every column of `store` as a typed array. Tracking IDs are one UTF-8 blob plus byte offsets into it.
+    """
+    encoded = [tracking_id.encode() for tracking_id in store.tracking_ids]
+    columns = {name: getattr(store, name) for name in _COLUMNS}
+    columns["id_offsets"] = array("Q", accumulate(map(len, encoded), initial=0))
+    columns["id_blob"] = array("B", b"".join(encoded))
+    return columns
+
+
+def write_snapshot_file(path: str, store: Optional[PackageStore], meta: Dict[str, Any]):
+    """
+    Write `store` and `meta` to `path` atomically: readers see either the old file or the new one.
+    """
+    columns = _store_columns(store) if store is not None else {}
+    layout = {}
+    offset = 0
+    for name, column in columns.items():
+        nbytes = len(column) * column.itemsize
+        layout[name] = [offset, nbytes, column.typecode]
+        offset = _aligned(offset + nbytes)
+
+    header = {
+        "byteorder": sys.byteorder,
+        "saved_at": time.time(),
+        "meta": meta,
+        "columns": layout
+    }
+    if store is not None:
+        header["tables"] = {
+            "carriers": store.carriers.values,
+            "statuses": store.statuses.values,
+            "cities": store.cities.values
+        }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode()
+    prefix = MAGIC + _HEADER_LENGTH.pack(len(header_bytes)) + header_bytes
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(prefix)
+            f.write(b"\0" * (_aligned(len(prefix)) - len(prefix)))
+            for name, column in columns.items():
+                column.tofile(f)
+                f.write(b"\0" * (_aligned(f.tell()) - f.tell()))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+
+def read_snapshot_file(path: str) -> SnapshotFile:
+    """
+    Map `path` into memory and rebuild its package store; each column is copied once, straight from the mapping.
+
+    Raises:
+        OSError: If the file cannot be opened.
+        SnapshotFileError: If the file is not a valid snapshot file.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < len(MAGIC) + _HEADER_LENGTH.size:
+            raise SnapshotFileError(f"Snapshot file {path} is truncated")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                return _parse(view, path)
+            except SnapshotFileError:
+                raise
+            except (KeyError, TypeError, ValueError, struct.error) as e:
+                raise SnapshotFileError(f"Snapshot file {path} is corrupt: {e}")
+            finally:
+                view.release()
+
+
+def _parse(view: memoryview, path: str) -> SnapshotFile:
+    if view[:len(MAGIC)] != MAGIC:
+        raise SnapshotFileError(f"{path} is not a snapshot file")
+    start = len(MAGIC) + _HEADER_LENGTH.size
+    (header_length,) = _HEADER_LENGTH.unpack_from(view, len(MAGIC))
+    try:
+        header = json.loads(bytes(view[start:start + header_length]))
+    except ValueError:
+        raise SnapshotFileError(f"Snapshot file {path} has a corrupt header")
+    if header.get("byteorder") != sys.byteorder:
+        raise SnapshotFileError(f"Snapshot file {path} was written with a different byte order")
+
+    data_start = _aligned(start + header_length)
+    columns: Dict[str, array] = {}
+    for name, (offset, nbytes, typecode) in header["columns"].items():
+        begin = data_start + offset
+        if begin + nbytes > len(view):
+            raise SnapshotFileError(f"Snapshot file {path} is truncated")
+        column = array(typecode)
+        column.frombytes(view[begin:begin + nbytes])
+        columns[name] = column
+
+    store = _build_store(header, columns) if "tables" in header else None
+    return SnapshotFile(store, header["meta"], header["saved_at"])
+
+
+def _build_store(header: Dict[str, Any], columns: Dict[str, array]) -> PackageStore:
+    store = PackageStore()
+    tables = header["tables"]
+    store.carriers = StringTable(tables["carriers"])
+    store.statuses = StringTable(tables["statuses"])
+    store.cities = StringTable(tables["cities"])
+    for name in _COLUMNS:
+        setattr(store, name, columns[name])
+
+    blob = columns["id_blob"].tobytes()
+    offsets = columns["id_offsets"]
+    store.tracking_ids = [blob[offsets[i]:offsets[i + 1]].decode() for i in range(len(offsets) - 1)]
+    if any(len(store.tracking_ids) != len(columns[name]) for name in _COLUMNS):
+        raise SnapshotFileError("Snapshot file columns have different lengths")
+    return store
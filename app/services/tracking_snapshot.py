@@ -0,0 +1,351 @@
+import asyncio
+import hashlib
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from app import config
+from app.models.package import Package, PackageListAdapter, PackageStatus, SortBy
+from app.services.package_store import PackageStore
+from app.services.profiling import phase
+
+# Sort key type for an ordering; always ends with the tracking ID so keys are unique
+SortKey = Tuple[Any, ...]
+
+# Every status filter an index is kept for; None means "all statuses"
+_STATUSES: Tuple[Optional[PackageStatus], ...] = (None, *PackageStatus)
+_SORTS: Tuple[Optional[SortBy], ...] = (None, *SortBy)
+
+
+def batched(items: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    """
+    Group records into lists of at most `size`.
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def validate_batch(batch: List[dict]) -> List[Package]:
+    """
+    Validate a batch of package records with the compiled list adapter.
+
+    Raises:
+        pydantic.ValidationError: If any record is invalid; the caller discards the whole snapshot.
+    """
+    with phase("validation"):
+        return PackageListAdapter.validate_python(batch)
+
+
+def _key_function(store: PackageStore, sort_by: Optional[SortBy]) -> Callable[[int], SortKey]:
+    """
+    Keyset sort key for a row: eta ascending, last_updated descending, otherwise tracking ID.
+    Ties are broken by tracking ID so every key in an ordering is unique.
+    """
+    ids = store.tracking_ids
+    if sort_by == SortBy.eta:
+        eta = store.eta
+        return lambda row: (eta[row], ids[row])
+    if sort_by == SortBy.last_updated:
+        last_updated = store.last_updated
+        return lambda row: (-last_updated[row], ids[row])
+    return lambda row: (ids[row],)
+
+
+class TrackingSnapshot:
+    """
+    Parsed /tracking payload plus the indexes built once per snapshot.
+
+    Packages live in a columnar `PackageStore`; every index is an array of row numbers.
+    Besides the tracking ID index, each snapshot precomputes a bucket per status (in upstream
+    order) and a sorted ordering for every (status, sort) pair, so every filter and sort
+    combination is an index read. Sorting and filtering run over the columns with C-level
+    key functions rather than per-package Python lambdas.
+
+    A snapshot built from a previous one reuses its row numbers: unchanged packages keep
+    their rows, changed ones are overwritten in a copy of the store and new ones appended.
+    When only a few packages changed, the previous orderings are copied and patched instead
+    of re-sorted. Rows of removed packages are compacted away once they outnumber live rows.
+    """
+
+    def __init__(self, packages: Iterable[Package], previous: Optional["TrackingSnapshot"] = None):
+        store = previous.store.copy() if previous is not None else PackageStore()
+        previous_rows = previous._row_of if previous is not None else {}
+        row_of: Dict[str, int] = {}
+        order = array("I")  # Live rows in upstream order
+        changed: Set[str] = set()
+
+        for pkg in packages:
+            values = store.encode(pkg)
+            tracking_id = values[0]
+
+            index = row_of.get(tracking_id)
+            if index is not None:
+                # Duplicate tracking ID in the payload: the last record wins
+                store.overwrite(index, values)
+                changed.add(tracking_id)
+                continue
+
+            index = previous_rows.get(tracking_id)
+            if index is None:
+                index = store.append(values)
+                changed.add(tracking_id)
+            elif store.row(index) != values:
+                store.overwrite(index, values)
+                changed.add(tracking_id)
+
+            row_of[tracking_id] = index
+            order.append(index)
+
+        self.store = store
+        self._row_of = row_of
+        self._order = order
+
+        # IDs that are new or changed, and IDs that disappeared, relative to `previous`
+        self.changed_ids: Set[str] = changed if previous is not None else set()
+        self.removed_ids: Set[str] = set(previous_rows.keys() - row_of.keys())
+
+        dead_rows = len(store) - len(order)
+        touched = len(self.changed_ids) + len(self.removed_ids)
+        if dead_rows > max(len(order), config.TRACKING_COMPACT_MIN_DEAD_ROWS):
+            self._compact()
+            self._orderings = self._build_orderings()
+        elif previous is not None and touched <= config.TRACKING_INCREMENTAL_MAX_CHANGES:
+            self._orderings = self._patch_orderings(previous)
+        else:
+            self._orderings = self._build_orderings()
+
+        self._buckets = self._build_buckets()
+
+        # Same packages as `previous` (nothing changed or removed): same content, same digest
+        unchanged = previous is not None and not self.changed_ids and not self.removed_ids
+        self.digest = previous.digest if unchanged else self._content_digest()
+
+        # Position in the package service's change log, assigned when the snapshot is published
+        self.sequence = 0
+        # Build of the geo index behind GET /packages/near, started by the package service on first use
+        self.geo_index_build: Optional[asyncio.Future] = None
+
+    @classmethod
+    def from_payload(cls, data: dict, previous: Optional["TrackingSnapshot"] = None) -> "TrackingSnapshot":
+        """
+        Build a snapshot from a raw /tracking response, reusing `previous` indexes where possible.
+        """
+        return cls.from_items(data.get("packages", []), previous)
+
+    @classmethod
+    def from_items(cls, items: Iterable[dict], previous: Optional["TrackingSnapshot"] = None) -> "TrackingSnapshot":
+        """
+        Build a snapshot from package records, consuming them in batches so a streamed
+        /tracking body is validated while it is still downloading. One invalid record
+        rejects the whole snapshot.
+        """
+        packages = (pkg for batch in batched(items, config.VALIDATION_BATCH_SIZE) for pkg in validate_batch(batch))
+        return cls(packages, previous)
+
+    @classmethod
+    def from_store(cls, store: PackageStore, previous: Optional["TrackingSnapshot"] = None) -> "TrackingSnapshot":
+        """
+        Build a snapshot over a validated store whose rows are all live, in upstream order,
+        such as one read back from a snapshot file. No package is re-validated. Without
+        `previous` the store is used as-is; with it, rows are diffed into a copy of its store.
+        """
+        if previous is not None:
+            return cls(map(store.package, range(len(store))), previous)
+        snapshot = cls.__new__(cls)
+        snapshot.store = store
+        snapshot._order = array("I", range(len(store)))
+        snapshot._row_of = {tracking_id: index for index, tracking_id in enumerate(store.tracking_ids)}
+        snapshot.changed_ids = set()
+        snapshot.removed_ids = set()
+        snapshot._orderings = snapshot._build_orderings()
+        snapshot._buckets = snapshot._build_buckets()
+        snapshot.digest = snapshot._content_digest()
+        snapshot.sequence = 0
+        snapshot.geo_index_build = None
+        return snapshot
+
+    def live_store(self) -> PackageStore:
+        """
+        A store holding only this snapshot's live rows, in upstream order.
+        """
+        if len(self.store) == len(self._order):
+            return self.store
+        old = self.store
+        store = PackageStore()
+        store.carriers = old.carriers.copy()
+        store.statuses = old.statuses.copy()
+        store.cities = old.cities.copy()
+        for index in self._order:
+            store.append(old.row(index))
+        return store
+
+    def get(self, tracking_id: str) -> Optional[Package]:
+        index = self._row_of.get(tracking_id)
+        return self.store.package(index) if index is not None else None
+
+    def select(self, status: Optional[PackageStatus], sort_by: Optional[SortBy]) -> List[Package]:
+        """
+        Packages matching `status`, in `sort_by` order, or in upstream order when no sort is given.
+        Returns a new list, so callers may modify it.
+        """
+        return list(self.iter_select(status, sort_by))
+
+    def iter_select(self, status: Optional[PackageStatus], sort_by: Optional[SortBy]) -> Iterator[Package]:
+        """
+        Like `select`, but materializes packages lazily while iterating the index.
+        Safe to consume lazily because a snapshot's indexes are never modified once built.
+        """
+        return map(self.store.package, self._index(status, sort_by))
+
+    def page(
+            self,
+            status: Optional[PackageStatus],
+            sort_by: Optional[SortBy],
+            limit: int,
+            after: Optional[SortKey] = None
+    ) -> Tuple[List[Package], Optional[SortKey]]:
+        """
+        Return up to `limit` packages that sort strictly after `after`, plus the key of the
+        last package returned when more remain (None on the last page).
+        """
+        rows = self._orderings[status, sort_by]
+        key = _key_function(self.store, sort_by)
+        start = bisect_right(rows, after, key=key) if after is not None else 0
+        end = min(start + limit, len(rows))
+        next_key = key(rows[end - 1]) if end < len(rows) else None
+        return [self.store.package(row) for row in rows[start:end]], next_key
+
+    def updated_after(self, timestamp: int) -> List[Package]:
+        """
+        Packages whose last_updated is after `timestamp` (epoch microseconds), oldest first.
+        Reads only the matching head of the newest-first last_updated ordering.
+        """
+        rows = self._orderings[None, SortBy.last_updated]
+        last_updated = self.store.last_updated
+        end = bisect_left(rows, -timestamp, key=lambda row: -last_updated[row])
+        return [self.store.package(row) for row in reversed(rows[:end])]
+
+    def city_rows(self) -> Dict[str, array]:
+        """
+        Live rows grouped by current city, each group in upstream order.
+        """
+        groups: Dict[int, array] = {}
+        city_codes = self.store.city_codes
+        for row in self._order:
+            code = city_codes[row]
+            group = groups.get(code)
+            if group is None:
+                groups[code] = group = array("I")
+            group.append(row)
+        cities = self.store.cities.values
+        return {cities[code]: rows for code, rows in groups.items()}
+
+    def select_rows(self, rows: Iterable[int], status: Optional[PackageStatus], sort_by: Optional[SortBy]) -> List[Package]:
+        """
+        Packages at `rows` matching `status`, in `sort_by` order, or in the given order when no sort is given.
+        """
+        rows = self._status_filter(array("I", rows), status)
+        if sort_by is not None:
+            rows = sorted(rows, key=_key_function(self.store, sort_by))
+        return [self.store.package(row) for row in rows]
+
+    def _index(self, status: Optional[PackageStatus], sort_by: Optional[SortBy]) -> array:
+        if sort_by is None:
+            return self._buckets[status]
+        return self._orderings[status, sort_by]
+
+    def _status_filter(self, rows: array, status: Optional[PackageStatus]) -> array:
+        """
+        The rows with `status`, keeping their order.
+        """
+        if status is None:
+            return rows
+        code = self.store.status_code(status)
+        return array("I", compress(rows, map(code.__eq__, map(self.store.status_codes.__getitem__, rows))))
+
+    def _build_buckets(self) -> Dict[Optional[PackageStatus], array]:
+        return {status: self._status_filter(self._order, status) for status in _STATUSES}
+
+    def _build_orderings(self) -> Dict[Tuple[Optional[PackageStatus], Optional[SortBy]], array]:
+        store = self.store
+        # Sort by tracking ID first; the stable sorts by eta and last_updated then keep IDs as the tie-break
+        by_id = sorted(self._order, key=store.tracking_ids.__getitem__)
+        sorted_rows = {
+            None: by_id,
+            SortBy.eta: sorted(by_id, key=store.eta.__getitem__),
+            SortBy.last_updated: sorted(by_id, key=store.last_updated.__getitem__, reverse=True)
+        }
+        return {
+            (status, sort_by): self._status_filter(array("I", rows), status)
+            for sort_by, rows in sorted_rows.items()
+            for status in _STATUSES
+        }
+
+    def _patch_orderings(
+            self,
+            previous: "TrackingSnapshot"
+    ) -> Dict[Tuple[Optional[PackageStatus], Optional[SortBy]], array]:
+        orderings = {key: array("I", rows) for key, rows in previous._orderings.items()}
+        statuses = list(PackageStatus)
+
+        for sort_by in _SORTS:
+            # Remove old positions using the previous store's values, then insert new ones
+            old_key = _key_function(previous.store, sort_by)
+            for tracking_id in self.changed_ids | self.removed_ids:
+                index = previous._row_of.get(tracking_id)
+                if index is not None:
+                    status = statuses[previous.store.status_codes[index]]
+                    for rows in (orderings[None, sort_by], orderings[status, sort_by]):
+                        position = bisect_left(rows, old_key(index), key=old_key)
+                        if position < len(rows) and rows[position] == index:
+                            del rows[position]
+
+            new_key = _key_function(self.store, sort_by)
+            for tracking_id in self.changed_ids:
+                index = self._row_of[tracking_id]
+                status = statuses[self.store.status_codes[index]]
+                for rows in (orderings[None, sort_by], orderings[status, sort_by]):
+                    rows.insert(bisect_left(rows, new_key(index), key=new_key), index)
+
+        return orderings
+
+    def _content_digest(self) -> str:
+        """
+        Hash of the live packages' values in upstream order. It depends only on the content, not on
+        row numbers or string codes, so every worker that loaded the same packages gets the same digest.
+        """
+        store, order = self.store, self._order
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update("\0".join(map(store.tracking_ids.__getitem__, order)).encode())
+        for table, codes in (
+                (store.carriers, store.carrier_codes),
+                (store.statuses, store.status_codes),
+                (store.cities, store.city_codes)
+        ):
+            digest.update(b"\1")
+            digest.update("\0".join(map(table.values.__getitem__, map(codes.__getitem__, order))).encode())
+        for column, typecode in (
+                (store.eta, "q"),
+                (store.last_updated, "q"),
+                (store.eta_offsets, "h"),
+                (store.last_updated_offsets, "h")
+        ):
+            digest.update(array(typecode, map(column.__getitem__, order)).tobytes())
+        return digest.hexdigest()
+
+    def _compact(self):
+        """
+        Rebuild the store with only live rows, in upstream order.
+        """
+        self.store = store = self.live_store()
+        self._order = array("I", range(len(store)))
+        self._row_of = {tracking_id: index for index, tracking_id in enumerate(store.tracking_ids)}
+
+    def __len__(self) -> int:
+        return len(self._order)
@@ -0,0 +1,202 @@
+import asyncio
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from app import config
+from app.models.carrier import Carrier, CarrierListAdapter
+from app.models.enriched_package import CityMetadata, CityMetadataListAdapter
+from app.services.carrier_service import carrier_cache, export_carrier_state, seed_carriers
+from app.services.http_client import CacheValidators
+from app.services.package_service import city_cache, export_tracking_state, seed_tracking_snapshot, tracking_cache
+from app.services.package_store import PackageStore
+from app.services.snapshot_file import SnapshotFile, SnapshotFileError, read_snapshot_file, write_snapshot_file
+from app.services.tracking_snapshot import TrackingSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _dump_validators(validators: CacheValidators) -> Dict[str, Optional[str]]:
+    return {"etag": validators.etag, "last_modified": validators.last_modified}
+
+
+def _load_validators(data: Dict[str, Optional[str]]) -> CacheValidators:
+    return CacheValidators(data.get("etag"), data.get("last_modified"))
+
+
+def save_warm_start(path: str = config.SNAPSHOT_FILE_PATH) -> bool:
+    """
+    Write the cached /tracking snapshot, /carriers list and city metadata to `path`, stamped with
+    the upstream they came from. Returns False without writing when there is nothing cached yet.
+    """
+    tracking = export_tracking_state()
+    carriers = export_carrier_state()
+    cities = city_cache.entries()
+    if tracking is None and carriers is None and not cities:
+        return False
+
+    meta: Dict[str, Any] = {
+        "upstream": config.MOCK_API_BASE_URL,
+        "cities": {
+            "keys": [key for key, _, _ in cities],
+            "items": CityMetadataListAdapter.dump_python([metadata for _, metadata, _ in cities]),
+            "expires_in": [ttl for _, _, ttl in cities]
+        }
+    }
+    if tracking is not None:
+        meta["tracking"] = {"validators": _dump_validators(tracking[1])}
+    if carriers is not None:
+        meta["carriers"] = {
+            "items": CarrierListAdapter.dump_python(carriers[0]),
+            "validators": _dump_validators(carriers[1])
+        }
+
+    write_snapshot_file(path, tracking[0].live_store() if tracking is not None else None, meta)
+    return True
+
+
+def cache_versions() -> Tuple:
+    """
+    Versions of the cached /tracking and /carriers snapshots and of the city cache.
+    While they are unchanged, a file saved earlier still holds what is cached.
+    """
+    tracking, carriers = tracking_cache.snapshot, carrier_cache.snapshot
+    return (
+        tracking.version if tracking is not None else None,
+        carriers.version if carriers is not None else None,
+        city_cache.version
+    )
+
+
+class SavedState:
+    """
+    Cache contents read back from a snapshot file, validated and ready to install.
+    """
+
+    def __init__(self, contents: SnapshotFile):
+        meta = contents.meta
+        self.age = contents.age()
+        self.store: Optional[PackageStore] = contents.store
+        self.tracking_validators = _load_validators(meta["tracking"]["validators"]) if "tracking" in meta else CacheValidators()
+        self.carriers: Optional[List[Carrier]] = None
+        self.carrier_validators = CacheValidators()
+        if "carriers" in meta:
+            self.carriers = CarrierListAdapter.validate_python(meta["carriers"]["items"])
+            self.carrier_validators = _load_validators(meta["carriers"]["validators"])
+        self.upstream: Optional[str] = meta.get("upstream")
+        cities = meta.get("cities", {"keys": [], "items": [], "expires_in": []})
+        self.cities: List[Tuple[str, CityMetadata, float]] = list(zip(
+            cities["keys"],
+            CityMetadataListAdapter.validate_python(cities["items"]),
+            (float(ttl) for ttl in cities["expires_in"])
+        ))
+
+    def live_cities(self) -> Iterator[Tuple[str, CityMetadata, float]]:
+        """
+        Saved city entries that have not expired since the file was written, with the seconds each has left.
+        """
+        for key, metadata, expires_in in self.cities:
+            if expires_in > self.age:
+                yield key, metadata, expires_in - self.age
+
+
+def read_saved_state(path: str) -> Optional[SavedState]:
+    """
+    The caches saved at `path`, or None (with a warning) when the file is missing, unusable,
+    or was saved from another upstream (e.g. a load test's fake one, or another deployment's).
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        state = SavedState(read_snapshot_file(path))
+    except (OSError, SnapshotFileError, ValidationError, KeyError, TypeError, ValueError) as e:
+        logger.warning("Ignoring snapshot file %s: %s", path, e)
+        return None
+    if state.upstream != config.MOCK_API_BASE_URL:
+        logger.warning("Ignoring snapshot file %s: saved from upstream %s, not %s", path, state.upstream, config.MOCK_API_BASE_URL)
+        return None
+    return state
+
+
+def load_warm_start(
+        path: str = config.SNAPSHOT_FILE_PATH,
+        max_age_seconds: float = config.SNAPSHOT_FILE_MAX_AGE_SECONDS
+) -> bool:
+    """
+    Seed the caches from the snapshot file at `path`, unless it is missing, unreadable or older than `max_age_seconds`.
+    Seeded snapshots are served as stale, so the first background refresh revalidates them with a conditional GET.
+    """
+    state = read_saved_state(path)
+    if state is None:
+        return False
+    if state.age > max_age_seconds:
+        logger.warning("Ignoring snapshot file %s: saved %.0fs ago", path, state.age)
+        return False
+
+    if state.store is not None:
+        seed_tracking_snapshot(TrackingSnapshot.from_store(state.store), state.tracking_validators)
+    if state.carriers is not None:
+        seed_carriers(state.carriers, state.carrier_validators)
+    for key, metadata, ttl in state.live_cities():
+        city_cache.put(key, metadata, ttl)
+    return True
+
+
+class SnapshotPersister:
+    """
+    Keeps a snapshot file of the upstream caches for the next process to start warm from.
+
+    `load` seeds the caches from the file before the app serves traffic. Once started, the
+    persister rewrites the file every `interval_seconds` when a snapshot version or the number
+    of cached cities changed, and `stop` writes it one last time. Files are written on a worker
+    thread and replaced atomically.
+    """
+
+    def __init__(self, path: str = config.SNAPSHOT_FILE_PATH, interval_seconds: float = config.SNAPSHOT_FILE_SAVE_INTERVAL_SECONDS):
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self._saved: Optional[Tuple] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    async def load(self) -> bool:
+        loaded = await asyncio.to_thread(load_warm_start, self.path)
+        self._saved = cache_versions()  # Nothing new to write until a refresh changes something
+        return loaded
+
+    async def save_if_changed(self) -> bool:
+        state = cache_versions()
+        if state == self._saved:
+            return False
+        try:
+            saved = await asyncio.to_thread(save_warm_start, self.path)
+        except OSError:
+            logger.error("Writing snapshot file %s failed", self.path, exc_info=True)
+            return False
+        self._saved = state
+        return saved
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            await self.save_if_changed()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+
+    async def stop(self):
+        """
+        Stop the periodic saves and write the file one last time.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.save_if_changed()
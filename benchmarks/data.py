@@ -0,0 +1,85 @@
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+# Status mix of a realistic tracking feed: most packages are moving, a large tail is delivered
+STATUS_WEIGHTS = {
+    "In Transit": 0.55,
+    "Delivered": 0.35,
+    "Out for Delivery": 0.10
+}
+
+CARRIER_WEIGHTS = {
+    "UPS": 0.35,
+    "FedEx": 0.30,
+    "USPS": 0.25,
+    "DHL": 0.10
+}
+
+# City, state, timezone, lat, lon
+CITIES = [
+    ("Philadelphia", "PA", "EST", 39.9526, -75.1652),
+    ("New York", "NY", "EST", 40.7128, -74.0060),
+    ("Chicago", "IL", "CST", 41.8781, -87.6298),
+    ("San Francisco", "CA", "PST", 37.7749, -122.4194),
+    ("Los Angeles", "CA", "PST", 34.0522, -118.2437),
+    ("Houston", "TX", "CST", 29.7604, -95.3698),
+    ("Phoenix", "AZ", "MST", 33.4484, -112.0740),
+    ("Seattle", "WA", "PST", 47.6062, -122.3321),
+    ("Denver", "CO", "MST", 39.7392, -104.9903),
+    ("Boston", "MA", "EST", 42.3601, -71.0589),
+    ("Atlanta", "GA", "EST", 33.7490, -84.3880),
+    ("Miami", "FL", "EST", 25.7617, -80.1918),
+    ("Dallas", "TX", "CST", 32.7767, -96.7970),
+    ("Minneapolis", "MN", "CST", 44.9778, -93.2650),
+    ("Portland", "OR", "PST", 45.5152, -122.6784),
+    ("Nashville", "TN", "CST", 36.1627, -86.7816)
+]
+
+# Large hubs see far more packages than small cities
+CITY_WEIGHTS = [1 / (rank + 1) for rank in range(len(CITIES))]
+
+_START = datetime(2025, 7, 1, tzinfo=timezone.utc)
+
+
+def _timestamp(value: datetime) -> str:
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def generate_packages(count: int, seed: int = 42) -> List[dict]:
+    """
+    `count` raw /tracking records with the status, carrier and city mix above.
+    The same seed always produces the same records, so runs are comparable.
+    """
+    rng = random.Random(seed)
+    statuses = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=count)
+    carriers = rng.choices(list(CARRIER_WEIGHTS), weights=list(CARRIER_WEIGHTS.values()), k=count)
+    cities = rng.choices([city[0] for city in CITIES], weights=CITY_WEIGHTS, k=count)
+
+    packages = []
+    for index in range(count):
+        last_updated = _START + timedelta(minutes=rng.randrange(60 * 24 * 30))
+        eta = last_updated + timedelta(hours=rng.randrange(1, 24 * 7))
+        packages.append({
+            "tracking_id": f"PKG{index:07d}",
+            "carrier": carriers[index],
+            "status": statuses[index],
+            "eta": _timestamp(eta),
+            "last_updated": _timestamp(last_updated),
+            "current_city": cities[index]
+        })
+    return packages
+
+
+def city_metadata() -> Dict[str, dict]:
+    """
+    /locations payloads keyed by the normalized city name the services request.
+    """
+    return {
+        name.lower(): {"city": name, "state": state, "timezone": tz, "lat": lat, "lon": lon}
+        for name, state, tz, lat, lon in CITIES
+    }
+
+
+def carriers() -> List[dict]:
+    return [{"id": carrier.upper(), "name": carrier} for carrier in CARRIER_WEIGHTS]
@@ -0,0 +1,135 @@
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from benchmarks.data import carriers, city_metadata
+
+
+class FakeUpstream:
+    """
+    Stand-in for the WireMock upstream, serving large synthetic payloads from a local HTTP server.
+
+    Serves /tracking, /tracking/{id}, /locations/{city} and /carriers with pre-encoded bodies
+    (so the fake itself stays cheap), honours If-None-Match on /tracking and /carriers, and can
+    inject latency (`latency_ms` plus uniform `jitter_ms`) and a rate of simulated 500s.
+    """
+
+    def __init__(
+            self,
+            packages: List[dict],
+            latency_ms: float = 0,
+            jitter_ms: float = 0,
+            error_rate: float = 0,
+            host: str = "127.0.0.1",
+            port: int = 0,
+            seed: Optional[int] = None
+    ):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+        self._bodies: Dict[str, Tuple[bytes, str]] = {
+            "/tracking": self._encode({"packages": packages}),
+            "/carriers": self._encode({"carriers": carriers()})
+        }
+        for pkg in packages:
+            self._bodies[f"/tracking/{pkg['tracking_id']}"] = self._encode(pkg)
+        for name, metadata in city_metadata().items():
+            self._bodies[f"/locations/{name}"] = self._encode(metadata)
+
+        upstream = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like a real upstream
+
+            def do_GET(self):
+                upstream._handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _encode(payload) -> Tuple[bytes, str]:
+        body = json.dumps(payload).encode()
+        return body, '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeUpstream":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-upstream", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeUpstream":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _delay(self) -> float:
+        with self._lock:
+            return max(0.0, self.latency_ms + self._rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def _fails(self) -> bool:
+        with self._lock:
+            return self._rng.random() < self.error_rate
+
+    def _handle(self, request: BaseHTTPRequestHandler):
+        with self._lock:
+            self.requests += 1
+
+        delay = self._delay()
+        if delay:
+            time.sleep(delay)
+
+        if self._fails():
+            with self._lock:
+                self.errors += 1
+            self._send(request, 500, b"Simulated service failure", "text/plain")
+            return
+
+        path = unquote(request.path.split("?", 1)[0]).rstrip("/")
+        if path.startswith("/locations/"):
+            path = "/locations/" + path[len("/locations/"):].lower()
+        found = self._bodies.get(path)
+        if found is None:
+            self._send(request, 404, b'{"error": "Not found"}')
+            return
+
+        body, etag = found
+        if request.headers.get("If-None-Match") == etag:
+            self._send(request, 304, b"", etag=etag)
+        else:
+            self._send(request, 200, body, etag=etag)
+
+    @staticmethod
+    def _send(request: BaseHTTPRequestHandler, status: int, body: bytes, content_type: str = "application/json", etag: str = None):
+        request.send_response(status)
+        if status != 304:
+            request.send_header("Content-Type", content_type)
+            request.send_header("Content-Length", str(len(body)))
+        if etag:
+            request.send_header("ETag", etag)
+        request.end_headers()
+        if body:
+            request.wfile.write(body)
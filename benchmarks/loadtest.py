@@ -0,0 +1,256 @@
+"""
+End-to-end load test: fake upstream -> this API -> concurrent clients.
+
+    python -m benchmarks.loadtest --packages 100000 --concurrency 64 --duration 30
+    python -m benchmarks.loadtest --latency-ms 40 --jitter-ms 30 --error-rate 0.02
+    python -m benchmarks.loadtest --workers 4        # real uvicorn processes (needs uvicorn)
+    python -m benchmarks.loadtest --target http://localhost:8000 --no-upstream
+
+By default the app runs in-process behind httpx's ASGI transport, with its lifespan (and so the
+background refresher) started, which measures the application itself. Use `--workers` to serve
+it with uvicorn worker processes when sizing a deployment; the fake upstream always runs in this
+process, so keep its latency settings in mind when reading absolute numbers.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from contextlib import AsyncExitStack, ExitStack
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.data import generate_packages
+from benchmarks.fake_upstream import FakeUpstream
+
+# Route templates and their share of traffic; {id} is replaced with a random known tracking ID
+DEFAULT_MIX: Dict[str, float] = {
+    "/packages": 0.15,
+    "/packages?status=Delivered&sort=eta": 0.20,
+    "/packages?sort=last_updated&limit=100": 0.20,
+    "/packages/{id}": 0.25,
+    "/packages/{id}/enriched": 0.15,
+    "/carriers": 0.05
+}
+
+
+class RouteStats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = defaultdict(int)
+        self.failures = 0  # transport errors and timeouts
+
+    def summary(self, elapsed: float) -> dict:
+        ordered = sorted(self.latencies)
+        errors = self.failures + sum(count for status, count in self.statuses.items() if status >= 500)
+        return {
+            "requests": len(ordered) + self.failures,
+            "errors": errors,
+            "throughput_rps": round(len(ordered) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": _percentile_ms(ordered, 0.50),
+            "p95_ms": _percentile_ms(ordered, 0.95),
+            "p99_ms": _percentile_ms(ordered, 0.99),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+            "statuses": dict(sorted(self.statuses.items()))
+        }
+
+
+def _percentile_ms(ordered: List[float], q: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of sorted latencies, in milliseconds.
+    """
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parse "route=weight,route=weight" into a traffic mix.
+    """
+    mix = {}
+    for part in text.split(","):
+        route, _, weight = part.rpartition("=")
+        mix[route] = float(weight)
+    return mix
+
+
+async def drive(
+        client: httpx.AsyncClient,
+        mix: Dict[str, float],
+        tracking_ids: List[str],
+        concurrency: int,
+        duration: float,
+        warmup: float,
+        seed: int = 1
+) -> Tuple[Dict[str, RouteStats], float]:
+    """
+    Run `concurrency` closed-loop clients for `duration` seconds after a `warmup` whose requests are not recorded.
+    """
+    stats: Dict[str, RouteStats] = defaultdict(RouteStats)
+    routes, weights = list(mix), list(mix.values())
+    start = time.perf_counter() + warmup
+    deadline = start + duration
+
+    async def user(number: int):
+        rng = random.Random(seed + number)
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                return
+            route = rng.choices(routes, weights=weights)[0]
+            url = route.replace("{id}", rng.choice(tracking_ids))
+            sent = time.perf_counter()
+            try:
+                response = await client.get(url)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = None
+            latency = time.perf_counter() - sent
+            if sent < start:
+                continue
+            route_stats = stats[route]
+            if status is None:
+                route_stats.failures += 1
+            else:
+                route_stats.latencies.append(latency)
+                route_stats.statuses[status] += 1
+
+    await asyncio.gather(*(user(number) for number in range(concurrency)))
+    return stats, duration
+
+
+def report(stats: Dict[str, RouteStats], elapsed: float) -> dict:
+    overall = RouteStats()
+    for route_stats in stats.values():
+        overall.latencies.extend(route_stats.latencies)
+        overall.failures += route_stats.failures
+        for status, count in route_stats.statuses.items():
+            overall.statuses[status] += count
+    routes = {route: stats[route].summary(elapsed) for route in sorted(stats)}
+    routes["ALL"] = overall.summary(elapsed)
+
+    print(f"\n{'route':42} {'reqs':>8} {'errors':>7} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, summary in routes.items():
+        print(
+            f"{route:42} {summary['requests']:>8} {summary['errors']:>7} {summary['throughput_rps']:>9} "
+            f"{summary['p50_ms'] or '-':>9} {summary['p95_ms'] or '-':>9} {summary['p99_ms'] or '-':>9}"
+        )
+    return routes
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _spawn_uvicorn(workers: int, upstream_url: str) -> Tuple[subprocess.Popen, str]:
+    """
+    Serve the app with `workers` uvicorn processes pointed at the fake upstream.
+    """
+    try:
+        import uvicorn  # noqa: F401
+    except ImportError:
+        raise SystemExit("--workers needs uvicorn installed (pip install uvicorn)")
+    port = _free_port()
+    env = {**os.environ, "MOCK_API_BASE_URL": upstream_url}
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            httpx.get(f"{url}/health", timeout=0.5)
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit("uvicorn did not start")
+
+
+async def run(args) -> dict:
+    mix = parse_mix(args.mix) if args.mix else DEFAULT_MIX
+    records = generate_packages(args.packages)
+    tracking_ids = [record["tracking_id"] for record in records]
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+
+    with ExitStack() as stack:
+        upstream = None
+        if not args.no_upstream:
+            upstream = stack.enter_context(FakeUpstream(
+                records,
+                latency_ms=args.latency_ms,
+                jitter_ms=args.jitter_ms,
+                error_rate=args.error_rate,
+                seed=args.seed
+            ))
+            print(f"Fake upstream at {upstream.base_url} serving {len(records):,} packages")
+
+        async with AsyncExitStack() as async_stack:
+            if args.target:
+                client = httpx.AsyncClient(base_url=args.target, limits=limits, timeout=args.timeout)
+            elif args.workers:
+                process, url = _spawn_uvicorn(args.workers, upstream.base_url)
+                stack.callback(process.terminate)
+                client = httpx.AsyncClient(base_url=url, limits=limits, timeout=args.timeout)
+            else:
+                # The app reads its upstream URL at import time
+                os.environ["MOCK_API_BASE_URL"] = upstream.base_url
+                from app.main import app
+                await async_stack.enter_async_context(app.router.lifespan_context(app))
+                client = httpx.AsyncClient(
+                    transport=httpx.ASGITransport(app=app),
+                    base_url="http://app",
+                    timeout=args.timeout
+                )
+            await async_stack.enter_async_context(client)
+
+            print(f"Driving {args.concurrency} concurrent clients for {args.duration}s (+{args.warmup}s warm-up)")
+            stats, elapsed = await drive(client, mix, tracking_ids, args.concurrency, args.duration, args.warmup, args.seed)
+
+        routes = report(stats, elapsed)
+        result = {"config": vars(args), "routes": routes}
+        if upstream is not None:
+            result["upstream"] = {"requests": upstream.requests, "errors": upstream.errors}
+            print(f"\nUpstream saw {upstream.requests:,} requests ({upstream.errors:,} injected errors)")
+        return result
+
+
+def main(argv: Optional[List[str]] = None) -> dict:
+    parser = argparse.ArgumentParser(description="End-to-end load test against a fake upstream.")
+    parser.add_argument("--packages", type=int, default=10_000, help="Packages served by the fake /tracking.")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent closed-loop clients.")
+    parser.add_argument("--duration", type=float, default=10, help="Measured seconds.")
+    parser.add_argument("--warmup", type=float, default=2, help="Unrecorded seconds before measuring.")
+    parser.add_argument("--latency-ms", type=float, default=5, help="Fake upstream latency per request.")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform +/- jitter on the upstream latency.")
+    parser.add_argument("--error-rate", type=float, default=0, help="Share of upstream requests answered with a 500.")
+    parser.add_argument("--mix", default="", help='Traffic mix as "route=weight,..."; {id} is a random tracking ID.')
+    parser.add_argument("--workers", type=int, default=0, help="Serve the app with this many uvicorn workers instead of in-process.")
+    parser.add_argument("--target", default="", help="Drive an already running API at this base URL instead.")
+    parser.add_argument("--no-upstream", action="store_true", help="Do not start the fake upstream (with --target).")
+    parser.add_argument("--timeout", type=float, default=30, help="Client timeout per request, in seconds.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the report to this file.")
+    args = parser.parse_args(argv)
+
+    if args.no_upstream and not args.target:
+        parser.error("--no-upstream needs --target")
+
+    result = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+    return result
+
+
+if __name__ == "__main__":
+    main()
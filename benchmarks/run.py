@@ -0,0 +1,266 @@
+"""
+Microbenchmarks for the service and model layer.
+
+    python -m benchmarks.run                                  # default sizes, print results
+    python -m benchmarks.run --sizes 1000,1000000 --cases service.
+    python -m benchmarks.run --save benchmarks/baseline.json  # record a baseline
+    python -m benchmarks.run --compare benchmarks/baseline.json --tolerance 0.25
+
+Upstream calls are answered in-process by `benchmarks.stub_client`, so results measure this
+service only. `--compare` exits non-zero when any case is slower than the baseline by more than
+the tolerance. Baselines are machine-specific: compare only against one recorded on the same host.
+"""
+import argparse
+import asyncio
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+from unittest.mock import patch
+
+from app.models.package import Package, PackageListAdapter, PackageStatus, SortBy
+from app.services import carrier_service, package_service
+from app.services.tracking_snapshot import TrackingSnapshot
+from benchmarks.data import generate_packages
+from benchmarks.stub_client import AsyncStubClient, StubClient
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_BASELINE = "benchmarks/baseline.json"
+
+# Lookups and enrichments per timed call, so per-ID cases stay measurable at every size
+OPS_PER_CALL = 1_000
+
+# A case prepares its state for one dataset and returns the function to time
+Case = Callable[[List[dict]], Callable[[], object]]
+CASES: Dict[str, Case] = {}
+
+
+def case(name: str):
+    def register(setup: Case) -> Case:
+        CASES[name] = setup
+        return setup
+    return register
+
+
+def _sample_ids(records: List[dict], seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    return [rng.choice(records)["tracking_id"] for _ in range(OPS_PER_CALL)]
+
+
+class _OnLoop:
+    """
+    Timed function for an async case: runs the coroutine function on one event loop created for
+    the whole case, so timings measure the call rather than event loop setup and teardown.
+    """
+
+    def __init__(self, coroutine_function: Callable[[], Awaitable[object]]):
+        self.coroutine_function = coroutine_function
+        self.loop = asyncio.new_event_loop()
+
+    def __call__(self) -> object:
+        return self.loop.run_until_complete(self.coroutine_function())
+
+    def close(self):
+        self.loop.run_until_complete(self.loop.shutdown_default_executor())
+        self.loop.close()
+
+
+def _warm_snapshot():
+    package_service.invalidate_tracking_cache()
+    package_service.get_all_packages()
+
+
+@case("model.construct")
+def construct_models(records):
+    return lambda: [Package(**record) for record in records]
+
+
+@case("model.validate_batch")
+def validate_batch(records):
+    return lambda: PackageListAdapter.validate_python(records)
+
+
+@case("model.serialize")
+def serialize_models(records):
+    packages = PackageListAdapter.validate_python(records)
+    return lambda: PackageListAdapter.dump_json(packages)
+
+
+@case("snapshot.build")
+def build_snapshot(records):
+    return lambda: TrackingSnapshot.from_items(iter(records))
+
+
+@case("snapshot.refresh_small_change")
+def refresh_snapshot(records):
+    previous = TrackingSnapshot.from_items(iter(records))
+    changed = list(records)
+    for index in range(0, len(changed), 1000):  # 0.1% of packages move on
+        changed[index] = {**changed[index], "status": "Delivered", "last_updated": "2025-08-01T00:00:00Z"}
+    return lambda: TrackingSnapshot.from_items(iter(changed), previous=previous)
+
+
+@case("service.filter_sort")
+def filter_and_sort(records):
+    _warm_snapshot()
+    return lambda: package_service.get_all_packages(status=PackageStatus.IN_TRANSIT, sort_by=SortBy.eta)
+
+
+@case("service.page")
+def first_page(records):
+    _warm_snapshot()
+    return _OnLoop(lambda: package_service.get_packages_page_async(status=PackageStatus.DELIVERED, sort_by=SortBy.last_updated, limit=100))
+
+
+@case("service.lookup")
+def lookup_by_id(records):
+    _warm_snapshot()
+    ids = _sample_ids(records)
+    return lambda: [package_service.get_package_by_tracking_id(tracking_id) for tracking_id in ids]
+
+
+@case("service.enrich")
+def enrich_one_by_one(records):
+    _warm_snapshot()
+    ids = _sample_ids(records)
+    return lambda: [package_service.get_enriched_package(tracking_id) for tracking_id in ids]
+
+
+@case("service.enrich_batch")
+def enrich_batch(records):
+    _warm_snapshot()
+    ids = _sample_ids(records)
+    return _OnLoop(lambda: package_service.get_enriched_packages_async(ids))
+
+
+def measure(fn: Callable[[], object], repeat: int, min_time: float) -> Dict[str, float]:
+    """
+    Best and median seconds per call over `repeat` rounds, each running enough calls to last `min_time`.
+    """
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        timings.append((time.perf_counter() - started) / loops)
+    return {"best": min(timings), "median": statistics.median(timings), "loops": loops}
+
+
+def run(sizes: List[int], selected: List[str], repeat: int, min_time: float) -> Dict[str, Dict[str, dict]]:
+    results: Dict[str, Dict[str, dict]] = {name: {} for name in selected}
+
+    with ExitStack() as stack:
+        for module in (package_service, carrier_service):
+            stack.enter_context(patch.object(module, "client", None))
+            stack.enter_context(patch.object(module, "async_client", None))
+        # Warm snapshots must not expire (or refresh in the background) mid-measurement
+        stack.enter_context(patch.object(package_service.tracking_cache, "ttl_seconds", float("inf")))
+
+        for size in sizes:
+            records = generate_packages(size)
+            for module in (package_service, carrier_service):
+                module.client = StubClient(records)
+                module.async_client = AsyncStubClient(records)
+            package_service.city_cache.clear()
+
+            for name in selected:
+                fn = CASES[name](records)
+                try:
+                    result = measure(fn, repeat, min_time)
+                finally:
+                    if isinstance(fn, _OnLoop):
+                        fn.close()
+                results[name][str(size)] = result
+                print(f"{name:32} {size:>9,}  best {_format(result['best']):>10}  median {_format(result['median']):>10}")
+
+        package_service.invalidate_tracking_cache()
+        package_service.city_cache.clear()
+
+    return results
+
+
+def compare(results: Dict[str, Dict[str, dict]], baseline: Dict[str, Dict[str, dict]], tolerance: float) -> List[str]:
+    """
+    Describe every case/size whose best time regressed past `tolerance` relative to the baseline.
+    """
+    regressions = []
+    print(f"\n{'case':32} {'size':>9}  {'baseline':>10}  {'current':>10}  change")
+    for name, sizes in results.items():
+        for size, result in sizes.items():
+            before = baseline.get(name, {}).get(size)
+            if before is None:
+                continue
+            ratio = result["best"] / before["best"]
+            flag = "  REGRESSION" if ratio > 1 + tolerance else ""
+            print(f"{name:32} {int(size):>9,}  {_format(before['best']):>10}  {_format(result['best']):>10}  {ratio - 1:+.1%}{flag}")
+            if flag:
+                regressions.append(f"{name} @ {size}: {ratio - 1:+.1%}")
+    return regressions
+
+
+def _format(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e3), ("us", 1e6)):
+        if seconds * scale >= 1:
+            return f"{seconds * scale:.2f}{unit}"
+    return f"{seconds * 1e9:.0f}ns"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Service and model layer microbenchmarks.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated package counts, e.g. 1000,10000,1000000.")
+    parser.add_argument("--cases", default="", help="Only run cases whose name starts with one of these (comma-separated).")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed rounds per case and size.")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per timed round.")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, help="Write results as a baseline file.")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, help="Compare results with a baseline file.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown before a case counts as a regression.")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size.replace("_", "")) for size in args.sizes.split(",") if size]
+    prefixes = [prefix for prefix in args.cases.split(",") if prefix]
+    selected = [name for name in CASES if not prefixes or any(name.startswith(prefix) for prefix in prefixes)]
+
+    results = run(sizes, selected, args.repeat, args.min_time)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform()
+                },
+                "results": results
+            }, f, indent=2)
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
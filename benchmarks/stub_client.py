@@ -0,0 +1,61 @@
+from typing import AsyncIterator, Dict, Iterator, List, Optional
+from unittest.mock import MagicMock
+from urllib.parse import unquote
+
+import requests
+
+from benchmarks.data import carriers, city_metadata
+
+
+def _not_found(path: str) -> requests.HTTPError:
+    return requests.HTTPError(f"404 Client Error for {path}", response=MagicMock(status_code=404))
+
+
+class StubClient:
+    """
+    In-process stand-in for `MockApiClient`, serving the upstream endpoints from memory so
+    benchmarks measure this service rather than the network or WireMock.
+    """
+
+    def __init__(self, packages: List[dict]):
+        self.packages = packages
+        self.by_id: Dict[str, dict] = {pkg["tracking_id"]: pkg for pkg in packages}
+        self.cities = city_metadata()
+        self.carriers = carriers()
+        self.calls = 0
+
+    def get(self, path: str, validators: Optional[object] = None):
+        self.calls += 1
+        resource, _, key = path.strip("/").partition("/")
+        key = unquote(key)
+        if resource == "carriers":
+            return {"carriers": self.carriers}
+        if resource == "tracking" and not key:
+            return {"packages": self.packages}
+        if resource == "tracking" and key in self.by_id:
+            return self.by_id[key]
+        if resource == "locations" and key in self.cities:
+            return self.cities[key]
+        raise _not_found(path)
+
+    def stream_items(self, path: str, key: str, validators: Optional[object] = None) -> Iterator[dict]:
+        return iter(self.get(path)[key])
+
+    def close(self):
+        pass
+
+
+class AsyncStubClient(StubClient):
+    """
+    Async counterpart of `StubClient`, standing in for `AsyncMockApiClient`.
+    """
+
+    async def get(self, path: str, validators: Optional[object] = None):
+        return StubClient.get(self, path)
+
+    async def stream_items(self, path: str, key: str, validators: Optional[object] = None) -> AsyncIterator[dict]:
+        for item in StubClient.get(self, path)[key]:
+            yield item
+
+    async def close(self):
+        pass
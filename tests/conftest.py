@@ -0,0 +1,24 @@
+import pytest
+from app.api.responses import response_cache
+from app.services.package_service import invalidate_tracking_cache, city_cache
+from app.services.carrier_service import invalidate_carrier_cache
+from app.services.http_client import upstream_endpoints
+from app.services.metrics import registry
+
+
+# Caches and circuit breakers are process-wide, so every test starts cold to keep mocked payloads isolated
+@pytest.fixture(autouse=True)
+def reset_caches():
+    invalidate_tracking_cache()
+    invalidate_carrier_cache()
+    city_cache.clear()
+    upstream_endpoints.clear()
+    response_cache.clear()
+    registry.clear()
+    yield
+    invalidate_tracking_cache()
+    invalidate_carrier_cache()
+    city_cache.clear()
+    upstream_endpoints.clear()
+    response_cache.clear()
+    registry.clear()
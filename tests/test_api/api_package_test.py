@@ -1,27 +1,45 @@
+import json
+import time
+import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock, MagicMock, ANY
 from app.main import app
+from app.models.carrier import Carrier
+from app.models.enriched_package import EnrichmentResult
+from app.models.package import Package, SortBy
+from app.services.http_client import NotModifiedError
+from app.services.snapshot_cache import Snapshot
 
 client = TestClient(app)
 
+
+# Routes read the snapshot's content key for their ETag; pin it so tests never reach the upstream
+@pytest.fixture(autouse=True)
+def snapshot_versions():
+    # Key "k1" with no value: the (mocked) service functions are then called with snapshot=None
+    with patch("app.api.packages.get_tracking_snapshot_async", AsyncMock(return_value=Snapshot(None, 1, 0, "k1"))) as tracking, \
+            patch("app.api.carriers.get_carriers_snapshot_async", AsyncMock(return_value=Snapshot(None, 1, 0, "k1"))) as carriers:
+        yield tracking, carriers
+
 # Test cases for the carriers router
 
 
 # Test case: list all carriers successfully
-@patch("app.api.carriers.get_all_carriers")
+@patch("app.api.carriers.get_all_carriers_async")
 def test_list_carriers_success(mock_get_all_carriers):
-    mock_get_all_carriers.return_value = [
+    carriers = [
         {"id": "UPS", "name": "United Parcel Service"},
         {"id": "FEDEX", "name": "FedEx"},
     ]
+    mock_get_all_carriers.return_value = [Carrier(**carrier) for carrier in carriers]
     response = client.get("/carriers")
     assert response.status_code == 200
-    assert response.json() == mock_get_all_carriers.return_value
+    assert response.json() == carriers
 
 
 # Test case: list carriers when no carriers are available
 # Would this empty response be considered a valid use case? -- I think yes, it is valid to return an empty list when no carriers are available
-@patch("app.api.carriers.get_all_carriers")
+@patch("app.api.carriers.get_all_carriers_async")
 def test_list_carriers_empty(mock_get_all_carriers):
     mock_get_all_carriers.return_value = []
     response = client.get("/carriers")
@@ -30,7 +48,7 @@ def test_list_carriers_empty(mock_get_all_carriers):
 
 
 # Test case: list carriers with 500 service exception
-@patch("app.api.carriers.get_all_carriers")
+@patch("app.api.carriers.get_all_carriers_async")
 def test_list_carriers_failure(mock_get_all_carriers):
     mock_get_all_carriers.side_effect = Exception("Mock failure")
     response = client.get("/carriers")
@@ -58,31 +76,82 @@ mock_packages = [
     }
 ]
 
+# The service layer returns validated models
+mock_package_models = [Package(**pkg) for pkg in mock_packages]
+
 
 # Test cases for the packages router
 
 
 # Test case: list all packages successfully
 def test_list_packages_success():
-    with patch("app.api.packages.get_all_packages", return_value=mock_packages) as mock_get:
+    with patch("app.api.packages.get_all_packages_async", return_value=mock_package_models) as mock_get:
         response = client.get("/packages")
         assert response.status_code == 200
         assert response.json() == mock_packages
-        mock_get.assert_called_once_with(status=None, sort_by=None)
+        mock_get.assert_called_once_with(status=None, sort_by=None, snapshot=None)
 
 
 # Test case: list packages successfully with filters
 def test_list_packages_with_filters():
-    with patch("app.api.packages.get_all_packages", return_value=mock_packages) as mock_get:
+    with patch("app.api.packages.get_all_packages_async", return_value=mock_package_models) as mock_get:
         response = client.get("/packages?status=In Transit&sort=eta")
         assert response.status_code == 200
         assert response.json() == mock_packages
-        mock_get.assert_called_once_with(status="In Transit", sort_by="eta")
+        mock_get.assert_called_once_with(status="In Transit", sort_by="eta", snapshot=None)
+
+
+# Test case: list packages with a limit returns one page and the next cursor
+def test_list_packages_paginated():
+    with patch("app.api.packages.get_packages_page_async", return_value=(mock_package_models[:1], "abc")) as mock_page:
+        response = client.get("/packages?limit=1&sort=eta")
+        assert response.status_code == 200
+        assert response.json() == mock_packages[:1]
+        assert response.headers["X-Next-Cursor"] == "abc"
+        # Relative, since the cached response may be replayed to a client that used another host
+        assert response.headers["Link"] == '</packages?limit=1&sort=eta&cursor=abc>; rel="next"'
+        mock_page.assert_called_once_with(status=None, sort_by="eta", limit=1, cursor=None, snapshot=None)
+
+
+# Test case: list packages with an invalid cursor returns 400
+def test_list_packages_invalid_cursor():
+    from app.services.pagination import InvalidCursorError
+    with patch("app.api.packages.get_packages_page_async", side_effect=InvalidCursorError("Invalid cursor")):
+        response = client.get("/packages?cursor=bogus")
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Invalid cursor"
+
+
+# Test case: list packages rejects a limit above the maximum
+def test_list_packages_limit_too_large():
+    response = client.get("/packages?limit=1000000")
+    assert response.status_code == 422
+
+
+# Test case: list packages streams NDJSON when the client asks for it in the Accept header
+def test_list_packages_ndjson_accept_header():
+    with patch("app.api.packages.iter_packages_async", return_value=iter(mock_package_models)) as mock_iter:
+        response = client.get("/packages?status=Delivered", headers={"Accept": "application/x-ndjson"})
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines == mock_packages
+        mock_iter.assert_called_once_with(status="Delivered", sort_by=None, snapshot=None)
+
+
+# Test case: list packages streams a page as NDJSON with the query flag and keeps the cursor headers
+def test_list_packages_ndjson_page():
+    with patch("app.api.packages.get_packages_page_async", return_value=(mock_package_models[:1], "abc")):
+        response = client.get("/packages?limit=1&stream=true")
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/x-ndjson"
+        assert response.headers["X-Next-Cursor"] == "abc"
+        assert len(response.text.splitlines()) == 1
 
 
 # Test case: list packages with 500 service exception
 def test_list_packages_service_exception():
-    with patch("app.api.packages.get_all_packages", side_effect=Exception("Mock failure")):
+    with patch("app.api.packages.get_all_packages_async", side_effect=Exception("Mock failure")):
         response = client.get("/packages")
         assert response.status_code == 500
         assert response.json()["detail"] == "Internal Server Error"
@@ -91,7 +160,7 @@ def test_list_packages_service_exception():
 # Test case: get a specific package successfully by tracking ID
 def test_get_package_success():
     package = mock_packages[0]
-    with patch("app.api.packages.get_package_by_tracking_id", return_value=package) as mock_get:
+    with patch("app.api.packages.get_package_by_tracking_id_async", return_value=mock_package_models[0]) as mock_get:
         response = client.get(f"/packages/{package['tracking_id']}")
         assert response.status_code == 200
         assert response.json() == package
@@ -100,7 +169,7 @@ def test_get_package_success():
 
 # Test case: 404 response when package not found
 def test_get_package_not_found():
-    with patch("app.api.packages.get_package_by_tracking_id", return_value=None):
+    with patch("app.api.packages.get_package_by_tracking_id_async", return_value=None):
         response = client.get("/packages/UNKNOWN123")
         assert response.status_code == 404
         assert response.json()["detail"] == "Package not found"
@@ -108,7 +177,434 @@ def test_get_package_not_found():
 
 # Test case: package by package_id with 500 service exception
 def test_get_package_service_exception():
-    with patch("app.api.packages.get_package_by_tracking_id", side_effect=Exception("Mock failure")):
+    with patch("app.api.packages.get_package_by_tracking_id_async", side_effect=Exception("Mock failure")):
         response = client.get("/packages/PKG123")
         assert response.status_code == 500
-        assert response.json()["detail"] == "Internal Server Error"
\ No newline at end of file
+        assert response.json()["detail"] == "Internal Server Error"
+
+
+# Test case: bulk enrichment returns results from the service
+def test_enrich_packages_success():
+    result = [{"tracking_id": "NOPE", "enriched": None, "error": "Package not found"}]
+    models = [EnrichmentResult(**item) for item in result]
+    with patch("app.api.packages.get_enriched_packages_async", return_value=models) as mock_enrich:
+        response = client.post("/packages/enriched", json={"tracking_ids": ["NOPE"]})
+        assert response.status_code == 200
+        assert response.json() == result
+        mock_enrich.assert_called_once_with(["NOPE"])
+
+
+# Test case: bulk enrichment rejects an empty ID list
+def test_enrich_packages_empty_request():
+    response = client.post("/packages/enriched", json={"tracking_ids": []})
+    assert response.status_code == 422
+
+
+# Test cases for the health router
+
+
+# Test case: health reports upstream circuit states and degrades while one is open
+def test_health_reports_circuit_state():
+    from app.services.http_client import upstream_endpoints
+
+    response = client.get("/health")
+    assert response.status_code == 200
+    assert response.json() == {"status": "ok", "upstream": []}
+
+    breaker = upstream_endpoints.get("/tracking").breaker
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+    body = client.get("/health").json()
+    assert body["status"] == "degraded"
+    assert body["upstream"][0]["endpoint"] == "/tracking"
+    assert body["upstream"][0]["state"] == "open"
+    assert body["upstream"][0]["retry_after"] > 0
+
+
+
+# Test case: the app lifespan warms the tracking and carrier snapshots in the background
+@patch("app.main.client")
+@patch("app.main.async_client")
+@patch("app.services.carrier_service.async_client")
+@patch("app.services.package_service.async_client")
+def test_lifespan_warms_snapshots(mock_package_client, mock_carrier_client, mock_main_async_client, mock_main_client, tmp_path):
+    from app.services.carrier_service import carrier_cache
+    from app.services.package_service import tracking_cache
+
+    async def stream_tracking(path, key, validators=None):
+        for pkg in mock_packages:
+            yield pkg
+
+    mock_package_client.stream_items = MagicMock(side_effect=stream_tracking)
+    mock_carrier_client.get = AsyncMock(return_value={"carriers": [{"id": "UPS", "name": "United Parcel Service"}]})
+    mock_main_async_client.close = AsyncMock()
+
+    with patch("app.config.SNAPSHOT_FILE_PATH", str(tmp_path / "snapshot.bin")), TestClient(app) as lifespan_client:
+        for _ in range(100):
+            if tracking_cache.snapshot is not None and carrier_cache.snapshot is not None:
+                break
+            time.sleep(0.01)
+        response = lifespan_client.get("/carriers")
+
+    assert response.json() == [{"id": "UPS", "name": "United Parcel Service"}]
+    assert len(tracking_cache.snapshot.value) == len(mock_packages)
+    mock_carrier_client.get.assert_awaited_once_with("/carriers", validators=ANY)
+    mock_main_client.close.assert_called_once()
+    mock_main_async_client.close.assert_awaited_once()
+    # The final save at shutdown leaves a file for the next worker
+    assert (tmp_path / "snapshot.bin").exists()
+
+
+# Test case: the lifespan restores the saved snapshot file, so the first request never waits on the upstream
+@patch("app.main.client")
+@patch("app.main.async_client")
+@patch("app.services.carrier_service.async_client")
+@patch("app.services.package_service.async_client")
+def test_lifespan_restores_snapshot_file(mock_package_client, mock_carrier_client, mock_main_async_client, mock_main_client, tmp_path):
+    from app.services.package_service import seed_tracking_snapshot, invalidate_tracking_cache
+    from app.services.http_client import CacheValidators
+    from app.services.tracking_snapshot import TrackingSnapshot
+    from app.services.warm_start import save_warm_start
+
+    path = str(tmp_path / "snapshot.bin")
+    seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": mock_packages}), CacheValidators('"v1"'))
+    assert save_warm_start(path)
+    invalidate_tracking_cache()
+
+    async def not_modified(path, key, validators=None):
+        raise NotModifiedError(path)
+        yield
+
+    mock_package_client.stream_items = MagicMock(side_effect=not_modified)
+    mock_carrier_client.get = AsyncMock(side_effect=NotModifiedError("/carriers"))
+    mock_main_async_client.close = AsyncMock()
+
+    with patch("app.config.SNAPSHOT_FILE_PATH", path), \
+            patch("app.config.BACKGROUND_REFRESH_ENABLED", False), \
+            TestClient(app) as lifespan_client:
+        response = lifespan_client.get("/packages?sort=eta")
+
+    assert response.status_code == 200
+    assert [pkg["tracking_id"] for pkg in response.json()] == \
+        [pkg["tracking_id"] for pkg in sorted(mock_packages, key=lambda pkg: (pkg["eta"], pkg["tracking_id"]))]
+    # Served stale from the restored snapshot; the refresh it triggers revalidates with the saved ETag
+    _, _, kwargs = mock_package_client.stream_items.mock_calls[0]
+    assert kwargs["validators"].etag == '"v1"'
+
+
+# Test cases for ETag validators
+
+
+# Test case: polling with the returned ETag gets an empty 304 until the snapshot version changes
+def test_list_packages_etag_round_trip(snapshot_versions):
+    tracking_version, _ = snapshot_versions
+    with patch("app.api.packages.get_all_packages_async", return_value=mock_package_models) as mock_get:
+        first = client.get("/packages?status=Delivered&sort=eta")
+        etag = first.headers["ETag"]
+        assert first.headers["Cache-Control"] == "no-cache"
+
+        # Same query in a different order, and with a weak prefix added by a proxy
+        repeat = client.get("/packages?sort=eta&status=Delivered", headers={"If-None-Match": f"W/{etag}"})
+        assert repeat.status_code == 304
+        assert repeat.content == b""
+        assert repeat.headers["ETag"] == etag
+        assert mock_get.call_count == 1
+
+        tracking_version.return_value = Snapshot(None, 2, 0, "k2")
+        changed = client.get("/packages?status=Delivered&sort=eta", headers={"If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["ETag"] != etag
+
+
+# Test case: the ETag differs per query and per representation
+def test_list_packages_etag_varies_by_query_and_media_type():
+    with patch("app.api.packages.get_all_packages_async", return_value=mock_package_models), \
+            patch("app.api.packages.iter_packages_async", side_effect=lambda **kwargs: iter(mock_package_models)):
+        plain = client.get("/packages").headers["ETag"]
+        filtered = client.get("/packages?status=Delivered").headers["ETag"]
+        ndjson = client.get("/packages", headers={"Accept": "application/x-ndjson"}).headers["ETag"]
+
+    assert len({plain, filtered, ndjson}) == 3
+
+
+# Test case: carriers answer 304 to a matching If-None-Match
+@patch("app.api.carriers.get_all_carriers_async")
+def test_list_carriers_not_modified(mock_get_all_carriers):
+    mock_get_all_carriers.return_value = [Carrier(id="UPS", name="United Parcel Service")]
+    etag = client.get("/carriers").headers["ETag"]
+
+    response = client.get("/carriers", headers={"If-None-Match": f'"other", {etag}'})
+
+    assert response.status_code == 304
+    mock_get_all_carriers.assert_called_once()
+
+
+# Test cases for cached response bytes
+
+
+# Test case: a repeated list query is served from the encoded response cache
+def test_list_packages_served_from_response_cache():
+    with patch("app.api.packages.get_all_packages_async", return_value=mock_package_models) as mock_get:
+        first = client.get("/packages?status=Delivered")
+        second = client.get("/packages?status=Delivered")
+
+    assert first.content == second.content
+    assert second.json() == mock_packages
+    assert second.headers["ETag"] == first.headers["ETag"]
+    mock_get.assert_called_once()
+
+
+# Test case: cached pages keep their pagination headers
+def test_paginated_response_cached_with_headers():
+    with patch("app.api.packages.get_packages_page_async", return_value=(mock_package_models[:1], "abc")) as mock_page:
+        client.get("/packages?limit=1")
+        response = client.get("/packages?limit=1")
+
+    assert response.headers["X-Next-Cursor"] == "abc"
+    assert 'rel="next"' in response.headers["Link"]
+    mock_page.assert_called_once()
+
+
+# Test case: large bodies are sent gzip-compressed to clients that accept it
+def test_large_response_is_gzipped():
+    many = [Package(**{**mock_packages[0], "tracking_id": f"PKG{i}"}) for i in range(200)]
+    with patch("app.api.packages.get_all_packages_async", return_value=many):
+        compressed = client.get("/packages", headers={"Accept-Encoding": "gzip"})
+        plain = client.get("/packages", headers={"Accept-Encoding": "identity"})
+
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert "Content-Encoding" not in plain.headers
+    assert compressed.json() == plain.json()
+    assert len(compressed.json()) == 200
+
+
+# Test case: concurrent identical requests for a new snapshot share one load and encoding
+@patch("app.api.packages.get_all_packages_async")
+def test_concurrent_misses_share_one_build(mock_get):
+    import asyncio
+    import httpx
+
+    async def load(**kwargs):
+        await asyncio.sleep(0.02)
+        return mock_package_models
+
+    mock_get.side_effect = load
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+            return await asyncio.gather(*(async_client.get("/packages?sort=eta") for _ in range(10)))
+
+    responses = asyncio.run(run())
+    assert all(response.json() == mock_packages for response in responses)
+    assert len({response.headers["ETag"] for response in responses}) == 1
+    mock_get.assert_called_once()
+
+
+# Test case: a package served from a warm snapshot is cached and revalidated by ETag
+@patch("app.api.packages.get_warm_tracking_key", return_value="k3")
+@patch("app.api.packages.get_package_by_tracking_id_async")
+def test_get_package_cached_while_snapshot_warm(mock_get_package, _):
+    mock_get_package.return_value = mock_package_models[0]
+
+    first = client.get("/packages/PKG123")
+    second = client.get("/packages/PKG123")
+    revalidated = client.get("/packages/PKG123", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert second.json() == mock_packages[0]
+    assert revalidated.status_code == 304
+    mock_get_package.assert_called_once()
+
+# Test case: /metrics exports request metrics labelled by route template, plus cache statistics
+@patch("app.api.carriers.get_all_carriers_async")
+@patch("app.api.packages.get_package_by_tracking_id_async")
+def test_metrics_endpoint(mock_get_package, mock_get_all_carriers):
+    mock_get_package.return_value = Package(**mock_packages[0])
+    mock_get_all_carriers.return_value = [Carrier(id="UPS", name="United Parcel Service")]
+    client.get("/packages/PKG123")
+    client.get("/packages/PKG123")
+    client.get("/carriers")
+    client.get("/carriers")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    body = response.text
+    assert 'http_requests_total{route="/packages/{tracking_id}",method="GET",status="200"} 2' in body
+    assert 'http_request_duration_seconds_count{route="/packages/{tracking_id}",method="GET"} 2' in body
+    assert 'cache_requests_total{cache="responses",result="hit"} 1' in body
+    assert "# TYPE upstream_request_duration_seconds histogram" in body
+
+
+# Test case: a request sent with X-Profile gets phase timings in Server-Timing and a written report
+@patch("app.api.carriers.get_all_carriers_async")
+def test_profiling_middleware(mock_get_all_carriers, tmp_path):
+    from app.api.middleware import ProfilingMiddleware
+
+    mock_get_all_carriers.return_value = [Carrier(id="UPS", name="United Parcel Service")]
+    profiled_client = TestClient(ProfilingMiddleware(app, report_dir=str(tmp_path)))
+
+    response = profiled_client.get("/carriers", headers={"X-Profile": "1"})
+    assert response.status_code == 200
+    assert response.json() == [{"id": "UPS", "name": "United Parcel Service"}]
+    assert "serialization;dur=" in response.headers["server-timing"]
+    assert "total;dur=" in response.headers["server-timing"]
+    report_id = response.headers["x-profile-report"]
+
+    response = profiled_client.get("/carriers")
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
+    assert len(list(tmp_path.iterdir())) == 2
+
+    report = (tmp_path / f"{report_id}.txt").read_text()
+    assert report.startswith("GET /carriers -> 200")
+    assert "serialization" in report
+    assert "cumulative" in report
+    assert (tmp_path / f"{report_id}.prof").exists()
+
+
+# Test case: profiling keeps only the newest max_reports reports and deletes the older ones
+@patch("app.api.carriers.get_all_carriers_async")
+def test_profiling_middleware_caps_reports(mock_get_all_carriers, tmp_path):
+    from app.api.middleware import ProfilingMiddleware
+
+    mock_get_all_carriers.return_value = [Carrier(id="UPS", name="United Parcel Service")]
+    profiled_client = TestClient(ProfilingMiddleware(app, report_dir=str(tmp_path), max_reports=2))
+
+    report_ids = []
+    for _ in range(4):
+        response = profiled_client.get("/carriers", headers={"X-Profile": "1"})
+        assert response.status_code == 200
+        report_ids.append(response.headers["x-profile-report"])
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        f"{report_id}{suffix}" for report_id in report_ids[-2:] for suffix in (".txt", ".prof")
+    )
+
+
+# Test case: the change feed returns the service's delta, and rejects malformed tokens with 400
+@patch("app.api.packages.get_changes_async")
+def test_list_package_changes(mock_get_changes):
+    from app.models.package import PackageChanges
+    from app.services.change_log import InvalidSyncTokenError
+
+    mock_get_changes.return_value = PackageChanges(
+        packages=[Package(**mock_packages[0])], removed=["PKG999"], token="next", reset=False
+    )
+    response = client.get("/packages/changes", params={"since": "token"})
+    assert response.status_code == 200
+    assert response.json()["packages"][0]["tracking_id"] == "PKG123"
+    assert response.json()["removed"] == ["PKG999"]
+    assert response.json()["token"] == "next"
+    mock_get_changes.assert_awaited_once_with("token", snapshot=None)
+
+    mock_get_changes.side_effect = InvalidSyncTokenError("Invalid sync token")
+    response = client.get("/packages/changes", params={"since": "garbage"})
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid sync token"}
+
+
+# Test case: the near query is routed ahead of /{tracking_id} and validates the point and radius
+@patch("app.api.packages.get_packages_near_async")
+def test_list_packages_near(mock_get_near):
+    mock_get_near.return_value = [Package(**mock_packages[0])]
+    response = client.get("/packages/near", params={"lat": 39.95, "lon": -75.16, "radius_km": 50, "sort": "eta"})
+    assert response.status_code == 200
+    assert response.json()[0]["tracking_id"] == "PKG123"
+    mock_get_near.assert_awaited_once_with(39.95, -75.16, 50.0, status=None, sort_by=SortBy.eta)
+
+    assert client.get("/packages/near", params={"lat": 91, "lon": 0, "radius_km": 50}).status_code == 422
+    assert client.get("/packages/near", params={"lat": 0, "lon": 0}).status_code == 422
+
+
+# Test case: the SSE stream sends queued events in one chunk and unsubscribes when the client goes away
+def test_stream_package_updates():
+    import asyncio
+    from app.api.packages import _EventStreamResponse
+    from app.services.package_events import PackageEvent, Subscription, package_events
+
+    class Client:
+        def __init__(self):
+            self.polls = 0
+
+        async def is_disconnected(self):
+            self.polls += 1
+            return self.polls > 1
+
+    async def run():
+        subscription = Subscription(tracking_ids=frozenset({"PKG123"}))
+        package_events.subscribe(subscription)
+        update = PackageEvent(PackageEvent.UPDATE, "PKG123", Package(**mock_packages[0]), 7)
+        removed = PackageEvent(PackageEvent.REMOVED, "PKG123", None, 8)
+        subscription.deliver([update, removed])
+
+        chunks = []
+
+        async def send(message):
+            if message["type"] == "http.response.body" and message["body"]:
+                chunks.append(message["body"])
+
+        scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+        await _EventStreamResponse(Client(), subscription)(scope, None, send)
+        return chunks, len(package_events)
+
+    chunks, subscribers = asyncio.run(run())
+    assert chunks[0] == b": subscribed\n\n"
+    assert chunks[1].startswith(b"id: 7\nevent: update\ndata: {\"tracking_id\":\"PKG123\"")
+    assert chunks[1].endswith(b'id: 8\nevent: removed\ndata: {"tracking_id": "PKG123"}\n\n')
+    assert subscribers == 0
+
+
+# Test case: a stream whose client is gone before the body starts still releases its subscription
+def test_stream_unsubscribes_when_never_started():
+    import asyncio
+    from starlette.requests import ClientDisconnect
+    from app.api.packages import _EventStreamResponse
+    from app.services.package_events import Subscription, package_events
+
+    async def run():
+        subscription = Subscription()
+        package_events.subscribe(subscription)
+
+        async def send(message):
+            raise OSError("connection reset")
+
+        with pytest.raises(ClientDisconnect):
+            await _EventStreamResponse(None, subscription)({"type": "http", "asgi": {"spec_version": "2.4"}}, None, send)
+        return len(package_events)
+
+    assert asyncio.run(run()) == 0
+
+
+# Test case: open event streams are counted as subscribers, not as in-flight or timed requests
+def test_event_streams_excluded_from_request_metrics():
+    import asyncio
+    from app.api.middleware import MetricsMiddleware
+    from app.services.metrics import registry
+
+    async def stream_app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream; charset=utf-8")]})
+        lines = registry.render().splitlines()
+        assert "http_requests_in_flight 0" in lines  # Still streaming, already out of the gauge
+        await send({"type": "http.response.body", "body": b": subscribed\n\n", "more_body": False})
+
+    async def send(message):
+        pass
+
+    asyncio.run(MetricsMiddleware(stream_app)({"type": "http", "method": "GET"}, None, send))
+
+    lines = registry.render().splitlines()
+    assert 'http_requests_total{route="unmatched",method="GET",status="200"} 1' in lines
+    assert not any(line.startswith("http_request_duration_seconds_count") for line in lines)
+    assert "http_requests_in_flight 0" in lines
+    assert "stream_subscribers 0" in lines
+
+
+# Test case: subscribing beyond the broker's limit is refused
+def test_stream_package_updates_full():
+    from app.services.package_events import package_events
+
+    with patch.object(package_events, "max_subscribers", 0):
+        response = client.get("/packages/stream", params={"tracking_id": "PKG123"})
+    assert response.status_code == 503
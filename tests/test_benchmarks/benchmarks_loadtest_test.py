@@ -0,0 +1,55 @@
+import asyncio
+import httpx
+import requests
+from benchmarks.data import generate_packages
+from benchmarks.fake_upstream import FakeUpstream
+from benchmarks.loadtest import drive, parse_mix, report
+
+# Smoke tests for the end-to-end load-test harness
+
+
+# Test case: the fake upstream serves every endpoint the services call, with ETags and 304s
+def test_fake_upstream_endpoints():
+    records = generate_packages(20)
+
+    with FakeUpstream(records) as upstream:
+        tracking = requests.get(f"{upstream.base_url}/tracking")
+        assert len(tracking.json()["packages"]) == 20
+        assert requests.get(f"{upstream.base_url}/tracking/{records[0]['tracking_id']}").json() == records[0]
+        assert requests.get(f"{upstream.base_url}/locations/New%20York").json()["state"] == "NY"
+        assert requests.get(f"{upstream.base_url}/carriers").json()["carriers"]
+        assert requests.get(f"{upstream.base_url}/tracking/UNKNOWN").status_code == 404
+
+        etag = tracking.headers["ETag"]
+        assert requests.get(f"{upstream.base_url}/tracking", headers={"If-None-Match": etag}).status_code == 304
+
+
+# Test case: injected errors are answered with 500s and counted
+def test_fake_upstream_injects_errors():
+    with FakeUpstream(generate_packages(5), error_rate=1, seed=1) as upstream:
+        assert requests.get(f"{upstream.base_url}/carriers").status_code == 500
+
+    assert upstream.requests == 1
+    assert upstream.errors == 1
+
+
+# Test case: a short closed-loop run records per-route latencies and a report with percentiles
+def test_drive_and_report():
+    records = generate_packages(50)
+    mix = parse_mix("/tracking/{id}=3,/carriers=1")
+    assert mix == {"/tracking/{id}": 3.0, "/carriers": 1.0}
+
+    async def run():
+        async with httpx.AsyncClient(base_url=upstream.base_url) as client:
+            return await drive(client, mix, [r["tracking_id"] for r in records], concurrency=4, duration=0.3, warmup=0.05)
+
+    with FakeUpstream(records, latency_ms=1) as upstream:
+        stats, elapsed = asyncio.run(run())
+
+    routes = report(stats, elapsed)
+    assert set(routes) == {"/tracking/{id}", "/carriers", "ALL"}
+    overall = routes["ALL"]
+    assert overall["requests"] > 0
+    assert overall["errors"] == 0
+    assert overall["statuses"] == {200: overall["requests"]}
+    assert 0 < overall["p50_ms"] <= overall["p95_ms"] <= overall["p99_ms"] <= overall["max_ms"]
@@ -0,0 +1,42 @@
+import json
+from collections import Counter
+from benchmarks.data import STATUS_WEIGHTS, generate_packages
+from benchmarks.run import CASES, main
+from benchmarks.stub_client import StubClient
+from app.models.package import PackageListAdapter
+
+# Smoke tests so the benchmark suite keeps working as the services change
+
+
+# Test case: generated records are valid, unique, reproducible and follow the status mix
+def test_generate_packages():
+    records = generate_packages(5000)
+
+    assert generate_packages(5000) == records
+    assert len({record["tracking_id"] for record in records}) == 5000
+    assert len(PackageListAdapter.validate_python(records)) == 5000
+
+    counts = Counter(record["status"] for record in records)
+    for status, weight in STATUS_WEIGHTS.items():
+        assert abs(counts[status] / 5000 - weight) < 0.03
+
+
+# Test case: the stub client answers every upstream endpoint the services call
+def test_stub_client_endpoints():
+    records = generate_packages(10)
+    stub = StubClient(records)
+
+    assert list(stub.stream_items("/tracking", "packages")) == records
+    assert stub.get(f"/tracking/{records[0]['tracking_id']}") == records[0]
+    assert stub.get("/locations/new%20york")["state"] == "NY"
+    assert stub.get("/carriers")["carriers"]
+
+
+# Test case: every case runs, and a saved baseline compares cleanly against a generous tolerance
+def test_run_save_and_compare(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    args = ["--sizes", "200", "--repeat", "1", "--min-time", "0"]
+
+    assert main(args + ["--save", str(baseline)]) == 0
+    assert set(json.loads(baseline.read_text())["results"]) == set(CASES)
+    assert main(args + ["--cases", "model.", "--compare", str(baseline), "--tolerance", "100"]) == 0
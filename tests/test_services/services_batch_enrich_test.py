@@ -0,0 +1,87 @@
+import asyncio
+from unittest.mock import patch, AsyncMock, MagicMock, ANY
+import requests
+from app.services.package_service import get_enriched_packages_async
+
+tracking_payload = {"packages": [
+    {
+        "tracking_id": "PKG123",
+        "carrier": "UPS",
+        "status": "In Transit",
+        "eta": "2025-07-20T10:00:00Z",
+        "last_updated": "2025-07-13T14:00:00Z",
+        "current_city": "Philadelphia"
+    },
+    {
+        "tracking_id": "PKG456",
+        "carrier": "FedEx",
+        "status": "Delivered",
+        "eta": "2025-07-12T10:00:00Z",
+        "last_updated": "2025-07-13T12:00:00Z",
+        "current_city": "New York"
+    },
+    {
+        "tracking_id": "PKG789",
+        "carrier": "USPS",
+        "status": "Delivered",
+        "eta": "2025-07-11T10:00:00Z",
+        "last_updated": "2025-07-12T12:00:00Z",
+        "current_city": "philadelphia"
+    }
+]}
+
+locations = {
+    "/locations/philadelphia": {"city": "Philadelphia", "state": "PA", "timezone": "EST", "lat": 39.9526, "lon": -75.1652},
+    "/locations/new%20york": {"city": "New York", "state": "NY", "timezone": "EST", "lat": 40.7128, "lon": -74.0060}
+}
+
+
+def fake_upstream(path):
+    return locations[path]
+
+
+async def stream_tracking(path, key, validators=None):
+    for item in tracking_payload[key]:
+        yield item
+
+
+# Test cases for batch enrichment
+
+
+# Test case: one tracking fetch and one fetch per distinct city, results in request order
+@patch("app.services.package_service.async_client")
+def test_batch_enrich_deduplicates_upstream_calls(mock_client):
+    mock_client.get = AsyncMock(side_effect=fake_upstream)
+    mock_client.stream_items = MagicMock(side_effect=stream_tracking)
+
+    results = asyncio.run(get_enriched_packages_async(["PKG789", "PKG123", "PKG456", "PKG123"]))
+
+    assert [r.tracking_id for r in results] == ["PKG789", "PKG123", "PKG456"]
+    assert all(r.error is None for r in results)
+    assert results[2].enriched.city_metadata.state == "NY"
+    paths = sorted(call.args[0] for call in mock_client.get.await_args_list)
+    assert paths == ["/locations/new%20york", "/locations/philadelphia"]
+    mock_client.stream_items.assert_called_once_with("/tracking", "packages", validators=ANY)
+
+
+# Test case: unknown IDs and failed cities are reported inline
+@patch("app.services.package_service.async_client")
+def test_batch_enrich_reports_failures_inline(mock_client):
+    def upstream(path):
+        if path == "/locations/new%20york":
+            raise requests.exceptions.HTTPError("500 Server Error", response=MagicMock(status_code=500))
+        if path == "/locations/philadelphia":
+            raise requests.exceptions.HTTPError("404 Client Error", response=MagicMock(status_code=404))
+        return fake_upstream(path)
+
+    mock_client.get = AsyncMock(side_effect=upstream)
+    mock_client.stream_items = MagicMock(side_effect=stream_tracking)
+
+    results = asyncio.run(get_enriched_packages_async(["PKG123", "PKG456", "NOPE"]))
+
+    assert [r.error for r in results] == [
+        "City metadata not found",
+        "Upstream error fetching city metadata",
+        "Package not found"
+    ]
+    assert all(r.enriched is None for r in results)
@@ -0,0 +1,171 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.services.change_log import ChangeLog, InvalidSyncTokenError, decode_sync_token, encode_sync_token
+from app.services.package_service import change_log, get_changes_async, tracking_cache
+from app.services.package_store import epoch_micros
+from app.services.tracking_snapshot import TrackingSnapshot
+from datetime import datetime, timezone
+
+# Test cases for the package change feed
+
+
+def record(tracking_id, status="In Transit", last_updated="2025-06-12T09:30:00Z"):
+    return {
+        "tracking_id": tracking_id,
+        "carrier": "UPS",
+        "status": status,
+        "eta": "2025-06-15T18:00:00Z",
+        "last_updated": last_updated,
+        "current_city": "Philadelphia"
+    }
+
+
+def get_changes(since=None):
+    return asyncio.run(get_changes_async(since))
+
+
+def streams(payload):
+    async def stream_items(path, key, validators=None):
+        for item in payload():
+            yield item
+    return stream_items
+
+
+# Test case: tokens round-trip; from another process only the snapshot key is usable
+def test_sync_token_round_trip():
+    assert decode_sync_token(encode_sync_token(42)) == (42, None)
+    assert decode_sync_token(encode_sync_token(42, '"v1"')) == (42, '"v1"')
+
+    with patch("app.services.change_log._LOG_ID", "other"):
+        foreign = encode_sync_token(42, '"v1"')
+    assert decode_sync_token(foreign) == (None, '"v1"')
+
+    with pytest.raises(InvalidSyncTokenError):
+        decode_sync_token("not a token")
+
+
+# Test case: the log answers from any sequence it still covers, and not from before a reset or trimmed entry
+def test_change_log_coverage():
+    log = ChangeLog(max_entries=2)
+    first = log.reset()
+    second = log.record({"PKG1"})
+    third = log.record({"PKG2", "PKG3"})
+
+    assert log.changed_since(first, third) == {"PKG1", "PKG2", "PKG3"}
+    assert log.changed_since(second, third) == {"PKG2", "PKG3"}
+    assert log.changed_since(second, second) == set()
+    assert log.changed_since(first - 1, third) is None
+
+    log.record({"PKG4"})  # Trims the entry for `second`
+    assert log.changed_since(first, log.sequence) is None
+    assert log.changed_since(second, log.sequence) == {"PKG2", "PKG3", "PKG4"}
+
+    log.reset()
+    assert log.changed_since(third, log.sequence) is None
+
+
+# Test case: snapshots recorded with a key can be found again by it, until they leave the log
+def test_change_log_keys():
+    log = ChangeLog(max_entries=2)
+    first = log.reset('"v1"')
+    second = log.record({"PKG1"}, '"v2"')
+    third = log.record({"PKG2"})
+
+    assert (log.sequence_of('"v1"'), log.sequence_of('"v2"'), log.sequence_of('"v9"')) == (first, second, None)
+    assert (log.key_of(first), log.key_of(second), log.key_of(third)) == ('"v1"', '"v2"', None)
+
+    log.record({"PKG3"}, '"v4"')  # Trims the entry for `second`, which becomes the oldest covered sequence
+    assert log.sequence_of('"v1"') is None
+    assert log.sequence_of('"v2"') == second
+
+
+# Test case: updated_after reads the head of the last_updated index, oldest first
+def test_snapshot_updated_after():
+    snapshot = TrackingSnapshot.from_items(iter([
+        record("PKG1", last_updated="2025-06-10T00:00:00Z"),
+        record("PKG2", last_updated="2025-06-12T00:00:00Z"),
+        record("PKG3", last_updated="2025-06-11T00:00:00Z")
+    ]))
+    since = epoch_micros(datetime(2025, 6, 10, tzinfo=timezone.utc))
+
+    assert [pkg.tracking_id for pkg in snapshot.updated_after(since)] == ["PKG3", "PKG2"]
+    assert snapshot.updated_after(epoch_micros(datetime(2025, 7, 1, tzinfo=timezone.utc))) == []
+
+
+# Test case: polling with a token returns only what changed between snapshots, and removals
+@patch("app.services.package_service.async_client")
+def test_get_changes_with_token(mock_async_client):
+    payload = [record("PKG1"), record("PKG2"), record("PKG3")]
+    mock_async_client.stream_items = streams(lambda: payload)
+
+    initial = get_changes()
+    assert initial.reset
+    assert [pkg.tracking_id for pkg in initial.packages] == ["PKG1", "PKG2", "PKG3"]
+
+    # Nothing new yet
+    unchanged = get_changes(initial.token)
+    assert (unchanged.packages, unchanged.removed, unchanged.reset) == ([], [], False)
+
+    payload = [record("PKG1"), record("PKG2", status="Delivered", last_updated="2025-06-13T09:30:00Z"), record("PKG4")]
+    with patch.object(tracking_cache, "ttl_seconds", 0), patch.object(tracking_cache, "max_stale_seconds", 0):
+        changes = get_changes(initial.token)
+
+    assert not changes.reset
+    assert [pkg.tracking_id for pkg in changes.packages] == ["PKG4", "PKG2"]
+    assert changes.packages[1].status == "Delivered"
+    assert changes.removed == ["PKG3"]
+    assert changes.token != initial.token
+    assert get_changes(changes.token).packages == []
+
+
+# Test case: polling with a timestamp uses last_updated and the change log; one from before the log starts over
+@patch("app.services.package_service.async_client")
+def test_get_changes_since_timestamp(mock_async_client):
+    payload = [record("PKG1", last_updated="2025-06-10T00:00:00Z"), record("PKG2", last_updated="2025-06-12T00:00:00Z")]
+    mock_async_client.stream_items = streams(lambda: payload)
+
+    # The log only covers snapshots since this process's first load, so it cannot tell what was removed before then
+    changes = get_changes("2025-06-11T00:00:00Z")
+    assert changes.reset
+    assert [pkg.tracking_id for pkg in changes.packages] == ["PKG1", "PKG2"]
+
+    loaded = datetime.now(timezone.utc).isoformat()
+    payload = [record("PKG1", status="Delivered", last_updated="2025-06-10T00:00:00Z")]
+    with patch.object(tracking_cache, "ttl_seconds", 0), patch.object(tracking_cache, "max_stale_seconds", 0):
+        changes = get_changes(loaded)
+    assert not changes.reset
+    assert [pkg.tracking_id for pkg in changes.packages] == ["PKG1"]
+    assert changes.removed == ["PKG2"]
+
+    with pytest.raises(InvalidSyncTokenError):
+        get_changes("yesterday")
+
+
+# Test case: a token from another worker is resolved by its snapshot's upstream ETag, or starts over without one
+@patch("app.services.package_service.async_client")
+def test_get_changes_with_foreign_token(mock_async_client):
+    payload = [record("PKG1"), record("PKG2")]
+    etag = '"v1"'
+
+    async def stream_items(path, key, validators=None):
+        validators.etag = etag
+        for item in payload:
+            yield item
+
+    mock_async_client.stream_items = stream_items
+    initial = get_changes()
+    assert change_log.key_of(tracking_cache.snapshot.value.sequence) == '"v1"'
+
+    payload, etag = [record("PKG1", status="Delivered")], '"v2"'
+    with patch.object(tracking_cache, "ttl_seconds", 0), patch.object(tracking_cache, "max_stale_seconds", 0):
+        get_changes()
+
+    with patch("app.services.change_log._LOG_ID", "other"):
+        foreign = encode_sync_token(99, '"v1"')
+        unknown = encode_sync_token(1)
+    changes = get_changes(foreign)
+    assert not changes.reset
+    assert ([pkg.tracking_id for pkg in changes.packages], changes.removed) == (["PKG1"], ["PKG2"])
+    assert get_changes(unknown).reset
+    assert not get_changes(initial.token).reset
@@ -0,0 +1,111 @@
+import asyncio
+import time
+import pytest
+from fastapi import HTTPException
+from unittest.mock import patch, MagicMock, AsyncMock
+import requests
+from app.models.enriched_package import CityMetadata
+from app.services.city_cache import CityMetadataCache
+from app.services.package_service import get_all_packages_async, get_enriched_package_async, city_cache
+
+philadelphia = {"city": "Philadelphia", "state": "PA", "timezone": "EST", "lat": 39.9526, "lon": -75.1652}
+
+tracking_payload = {"packages": [{
+    "tracking_id": "PKG123",
+    "carrier": "UPS",
+    "status": "In Transit",
+    "eta": "2025-07-20T10:00:00Z",
+    "last_updated": "2025-07-13T14:00:00Z",
+    "current_city": "Philadelphia"
+}]}
+
+
+async def stream_tracking(path, key, validators=None):
+    for item in tracking_payload[key]:
+        yield item
+
+
+# Test cases for the city metadata LRU cache
+
+
+# Test case: lookups are keyed by normalized city name and counted as hits and misses
+def test_cache_hit_after_miss():
+    cache = CityMetadataCache(maxsize=10, ttl_seconds=60, negative_ttl_seconds=60)
+    load = MagicMock(return_value=CityMetadata(**philadelphia))
+
+    cache.get("Philadelphia", load)
+    cache.get("  philadelphia ", load)
+
+    load.assert_called_once_with("philadelphia")
+    assert cache.stats() == {"hits": 1, "misses": 1, "size": 1, "maxsize": 10}
+
+
+# Test case: unknown cities are cached as negative entries
+def test_cache_negative_entry():
+    cache = CityMetadataCache(maxsize=10, ttl_seconds=60, negative_ttl_seconds=60)
+    load = MagicMock(return_value=None)
+
+    assert cache.get("Atlantis", load) is None
+    assert cache.get("Atlantis", load) is None
+    load.assert_called_once()
+
+
+# Test case: negative entries expire on their own TTL
+def test_cache_negative_entry_expires():
+    cache = CityMetadataCache(maxsize=10, ttl_seconds=60, negative_ttl_seconds=0.01)
+    load = MagicMock(return_value=None)
+
+    cache.get("Atlantis", load)
+    time.sleep(0.02)
+    cache.get("Atlantis", load)
+    assert load.call_count == 2
+
+
+# Test case: the least recently used city is evicted when the cache is full
+def test_cache_evicts_least_recently_used():
+    cache = CityMetadataCache(maxsize=2, ttl_seconds=60, negative_ttl_seconds=60)
+    load = MagicMock(side_effect=lambda city: CityMetadata(**{**philadelphia, "city": city}))
+
+    cache.get("a", load)
+    cache.get("b", load)
+    cache.get("a", load)  # "a" becomes most recently used
+    cache.get("c", load)  # evicts "b"
+    cache.get("a", load)
+    cache.get("b", load)
+
+    assert [call.args[0] for call in load.call_args_list] == ["a", "b", "c", "b"]
+
+
+# Test case: a warm tracking snapshot and city cache make enrichment free of upstream calls
+@patch("app.services.package_service.async_client")
+def test_enriched_package_uses_caches(mock_async_client):
+    mock_async_client.stream_items = MagicMock(side_effect=stream_tracking)
+    mock_async_client.get = AsyncMock(return_value=philadelphia)
+
+    async def run():
+        await get_all_packages_async()
+        return await get_enriched_package_async("PKG123"), await get_enriched_package_async("PKG123")
+
+    first, second = asyncio.run(run())
+
+    assert first == second
+    assert first.city_metadata.state == "PA"
+    mock_async_client.stream_items.assert_called_once()
+    mock_async_client.get.assert_awaited_once_with("/locations/philadelphia")
+    assert city_cache.stats()["hits"] == 1
+
+
+# Test case: a city the upstream does not know fails enrichment once and is then served from the negative cache
+@patch("app.services.package_service.async_client")
+def test_enriched_package_unknown_city(mock_async_client):
+    not_found = requests.exceptions.HTTPError("404 Client Error", response=MagicMock(status_code=404))
+    mock_async_client.stream_items = stream_tracking
+    mock_async_client.get = AsyncMock(side_effect=not_found)
+    asyncio.run(get_all_packages_async())
+
+    for _ in range(2):
+        with pytest.raises(HTTPException) as exc_info:
+            asyncio.run(get_enriched_package_async("PKG123"))
+        assert exc_info.value.status_code == 500
+
+    mock_async_client.get.assert_awaited_once_with("/locations/philadelphia")
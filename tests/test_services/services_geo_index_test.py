@@ -0,0 +1,123 @@
+import asyncio
+import random
+import pytest
+from array import array
+from unittest.mock import AsyncMock, patch
+from app.models.enriched_package import CityMetadata
+from app.services.geo_index import GeoIndex, InvalidLocationError, haversine_km
+from app.services import package_service
+from app.services.package_service import city_cache, get_packages_near_async, tracking_cache
+from app.services.tracking_snapshot import TrackingSnapshot
+
+# Test cases for the geo index behind GET /packages/near
+
+
+def random_index(count, cell_degrees, seed=11):
+    rng = random.Random(seed)
+    coordinates = {f"City{i}": (rng.uniform(-90, 90), rng.uniform(-180, 180)) for i in range(count)}
+    city_rows = {city: array("I", [i]) for i, city in enumerate(coordinates)}
+    return GeoIndex(city_rows, coordinates, cell_degrees), coordinates
+
+
+# Test case: queries match a brute-force haversine scan, including near the poles and across the antimeridian
+@pytest.mark.parametrize("cell_degrees", [0.5, 5, 45])
+def test_query_matches_brute_force(cell_degrees):
+    index, coordinates = random_index(1000, cell_degrees)
+    rng = random.Random(3)
+    points = [(rng.uniform(-90, 90), rng.uniform(-180, 180)) for _ in range(30)] + [(89.9, 10), (-89.5, -170), (10, 179.9), (-5, -179.8)]
+
+    for lat, lon in points:
+        for radius_km in (0, 50, 800, 5000):
+            expected = sorted(
+                city for city, (city_lat, city_lon) in coordinates.items()
+                if haversine_km(lat, lon, city_lat, city_lon) <= radius_km
+            )
+            matches = index.query(lat, lon, radius_km)
+            found = sorted(f"City{rows[0]}" for _, rows in matches)
+            assert found == expected
+            distances = [distance for distance, _ in matches]
+            assert distances == sorted(distances)
+
+
+# Test case: cities without coordinates are left out and reported; invalid points are rejected
+def test_missing_cities_and_invalid_points():
+    index = GeoIndex(
+        {"Philadelphia": array("I", [0, 2]), "Atlantis": array("I", [1])},
+        {"Philadelphia": (39.9526, -75.1652)},
+        cell_degrees=0.5
+    )
+    assert len(index) == 1
+    assert index.missing == ["Atlantis"]
+    assert [list(rows) for _, rows in index.query(40.0, -75.0, 50)] == [[0, 2]]
+
+    with pytest.raises(InvalidLocationError):
+        index.query(91, 0, 10)
+    with pytest.raises(InvalidLocationError):
+        index.query(0, 0, -1)
+
+
+def record(tracking_id, city, status="In Transit", eta="2025-06-15T18:00:00Z"):
+    return {
+        "tracking_id": tracking_id,
+        "carrier": "UPS",
+        "status": status,
+        "eta": eta,
+        "last_updated": "2025-06-12T09:30:00Z",
+        "current_city": city
+    }
+
+
+locations = {
+    "philadelphia": {"city": "Philadelphia", "state": "PA", "timezone": "EST", "lat": 39.9526, "lon": -75.1652},
+    "camden": {"city": "Camden", "state": "NJ", "timezone": "EST", "lat": 39.9259, "lon": -75.1196},
+    "chicago": {"city": "Chicago", "state": "IL", "timezone": "CST", "lat": 41.8781, "lon": -87.6298}
+}
+
+
+# Test case: the service joins packages to city coordinates, loading unknown cities once per snapshot
+@patch("app.services.package_service.async_client")
+def test_packages_near(mock_async_client):
+    tracking_cache.put(TrackingSnapshot.from_payload({"packages": [
+        record("PKG1", "Chicago"),
+        record("PKG2", "Camden", eta="2025-06-14T08:00:00Z"),
+        record("PKG3", "Philadelphia", status="Delivered"),
+        record("PKG4", "Philadelphia", eta="2025-06-13T08:00:00Z")
+    ]}))
+    city_cache.put("Chicago", CityMetadata(**locations["chicago"]))
+    mock_async_client.get = AsyncMock(side_effect=lambda path: locations[path.rsplit("/", 1)[1]])
+
+    near = asyncio.run(get_packages_near_async(39.95, -75.16, 50))
+    assert [pkg.tracking_id for pkg in near] == ["PKG3", "PKG4", "PKG2"]
+    assert mock_async_client.get.await_count == 2  # Chicago was already cached
+
+    near = asyncio.run(get_packages_near_async(39.95, -75.16, 50, status="In Transit", sort_by="eta"))
+    assert [pkg.tracking_id for pkg in near] == ["PKG4", "PKG2"]
+    assert [pkg.tracking_id for pkg in asyncio.run(get_packages_near_async(39.95, -75.16, 1500))] == ["PKG3", "PKG4", "PKG2", "PKG1"]
+    assert mock_async_client.get.await_count == 2
+
+
+# Test case: concurrent queries against a new snapshot share one build, requesting each unknown city once
+@patch("app.services.package_service.async_client")
+def test_packages_near_concurrent_build(mock_async_client):
+    snapshot = TrackingSnapshot.from_payload({"packages": [
+        record("PKG1", "Camden"),
+        record("PKG2", "Philadelphia")
+    ]})
+    tracking_cache.put(snapshot)
+
+    async def get(path):
+        await asyncio.sleep(0.01)
+        return locations[path.rsplit("/", 1)[1]]
+
+    mock_async_client.get = AsyncMock(side_effect=get)
+
+    async def run():
+        return await asyncio.gather(*(get_packages_near_async(39.95, -75.16, 50) for _ in range(10)))
+
+    with patch("app.services.package_service._build_geo_index", wraps=package_service._build_geo_index) as build:
+        results = asyncio.run(run())
+
+    assert all([pkg.tracking_id for pkg in near] == ["PKG2", "PKG1"] for near in results)
+    build.assert_called_once_with(snapshot)
+    assert mock_async_client.get.await_count == 2
+    assert snapshot.geo_index_build.result() is not None
@@ -0,0 +1,67 @@
+import json
+import pytest
+from unittest.mock import patch, MagicMock
+from app.services.http_client import MockApiClient
+from app.services.json_stream import JsonArrayStreamParser, iter_array_items
+
+payload = {
+    "meta": {"note": "\"packages\": [ is not the array", "nested": [1, 2, {"packages": []}]},
+    "count": 123456,
+    "packages": [
+        {"tracking_id": f"PKG{i}", "current_city": "Zürich ] },", "weight": i * 1.5}
+        for i in range(20)
+    ],
+    "done": True
+}
+
+
+def chunked(raw, size):
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+# Test cases for the incremental JSON array parser
+
+
+# Test case: items come out intact no matter where chunk boundaries fall
+@pytest.mark.parametrize("indent", [None, 2])
+@pytest.mark.parametrize("size", [1, 3, 17, 1 << 20])
+def test_items_parsed_across_chunk_boundaries(indent, size):
+    raw = json.dumps(payload, indent=indent, ensure_ascii=False).encode()
+
+    assert list(iter_array_items(chunked(raw, size), "packages")) == payload["packages"]
+
+
+# Test case: items are produced as soon as their bytes arrive
+def test_items_yielded_incrementally():
+    parser = JsonArrayStreamParser("packages")
+
+    assert parser.feed(b'{"packages": [{"a": 1}, {"b"') == [{"a": 1}]
+    assert parser.feed(b': 2}]}') == [{"b": 2}]
+    parser.close()
+
+
+# Test case: a missing key yields no items
+def test_missing_key_yields_nothing():
+    assert list(iter_array_items([b'{"carriers": []}'], "packages")) == []
+
+
+# Test case: truncated or malformed bodies raise instead of silently returning partial data
+@pytest.mark.parametrize("body", [b'{"packages": [{"a": 1}', b'', b'[1, 2]', b'{"packages": {}}'])
+def test_truncated_or_malformed_body_raises(body):
+    with pytest.raises(ValueError):
+        list(iter_array_items([body], "packages"))
+
+
+# Test case: the client streams items from the response body
+def test_client_stream_items():
+    client = MockApiClient(base_url="http://upstream")
+    mock_response = MagicMock()
+    mock_response.__enter__.return_value = mock_response
+    mock_response.iter_content.return_value = chunked(json.dumps(payload).encode(), 10)
+
+    with patch.object(client.session, "get", return_value=mock_response) as mock_get:
+        items = list(client.stream_items("/tracking", "packages"))
+
+    assert items == payload["packages"]
+    mock_get.assert_called_once_with("http://upstream/tracking", timeout=client.timeout, stream=True)
+    mock_response.raise_for_status.assert_called_once()
@@ -0,0 +1,73 @@
+import pytest
+import requests
+from unittest.mock import patch, MagicMock
+from app.services.http_client import MockApiClient
+from app.services.metrics import MetricFamily, MetricsRegistry, UpstreamCall, registry
+from app.services.resilience import RetryPolicy, UpstreamEndpoints
+
+# Test cases for the metrics registry and upstream call instrumentation
+
+
+# Test case: counters, gauges and histograms render in the Prometheus text format
+def test_registry_renders_text_format():
+    metrics = MetricsRegistry()
+    hits = metrics.counter("hits_total", "Hits.", ("route",))
+    in_flight = metrics.gauge("in_flight", "In flight.")
+    latency = metrics.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+
+    hits.labels("/a").inc()
+    hits.labels("/a").inc(2)
+    in_flight.labels().inc()
+    for value in (0.05, 0.1, 0.5, 3):
+        latency.labels().observe(value)
+    metrics.add_collector(lambda: [MetricFamily("entries", "gauge", "Entries.", [({"cache": 'say "hi"'}, 4)])])
+
+    lines = metrics.render().splitlines()
+    assert "# TYPE hits_total counter" in lines
+    assert 'hits_total{route="/a"} 3' in lines
+    assert "in_flight 1" in lines
+    assert 'latency_seconds_bucket{le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 3.65" in lines
+    assert "latency_seconds_count 4" in lines
+    assert 'entries{cache="say \\"hi\\""} 4' in lines
+
+
+# Test case: a wrong number of label values is rejected
+def test_labels_must_match():
+    with pytest.raises(ValueError):
+        MetricsRegistry().counter("hits_total", "Hits.", ("route",)).labels()
+
+
+# Test case: upstream GETs record status, latency and body size per endpoint, and failures as "error"
+def test_upstream_calls_are_recorded():
+    client = MockApiClient(
+        base_url="http://upstream",
+        retry=RetryPolicy(max_attempts=1, base_delay=0, max_delay=0),
+        endpoints=UpstreamEndpoints(failure_threshold=5, reset_timeout=60, latency_window=10)
+    )
+    response = MagicMock(status_code=200, content=b'{"carriers": []}')
+    response.json.return_value = {"carriers": []}
+
+    with patch.object(client.session, "get", return_value=response):
+        client.get("/carriers")
+    with patch.object(client.session, "get", side_effect=requests.ConnectionError()):
+        with pytest.raises(requests.ConnectionError):
+            client.get("/tracking/PKG1")
+
+    lines = registry.render().splitlines()
+    assert 'upstream_requests_total{endpoint="/carriers",status="200"} 1' in lines
+    assert 'upstream_requests_total{endpoint="/tracking/*",status="error"} 1' in lines
+    assert 'upstream_response_size_bytes_sum{endpoint="/carriers"} 16' in lines
+    assert 'upstream_request_duration_seconds_count{endpoint="/carriers"} 1' in lines
+    assert 'upstream_requests_in_flight{endpoint="/carriers"} 0' in lines
+
+
+# Test case: streamed chunks are counted as they pass through
+def test_upstream_call_counts_chunks():
+    with UpstreamCall("/tracking") as call:
+        call.status = 200
+        assert list(call.count([b"abc", b"de"])) == [b"abc", b"de"]
+
+    assert call.size == 5
@@ -0,0 +1,107 @@
+import asyncio
+from unittest.mock import patch
+from app.models.package import PackageStatus
+from app.services.package_events import PackageEvent, PackageEventBroker, Subscription
+from app.services.package_service import get_all_packages, package_events, tracking_cache
+from app.services.tracking_snapshot import TrackingSnapshot
+
+# Test cases for pushing snapshot changes to stream subscribers
+
+
+def record(tracking_id, status="In Transit", carrier="UPS"):
+    return {
+        "tracking_id": tracking_id,
+        "carrier": carrier,
+        "status": status,
+        "eta": "2025-06-15T18:00:00Z",
+        "last_updated": "2025-06-12T09:30:00Z",
+        "current_city": "Philadelphia"
+    }
+
+
+def snapshots(before, after):
+    previous = TrackingSnapshot.from_items(iter(before))
+    snapshot = TrackingSnapshot.from_items(iter(after), previous=previous)
+    snapshot.sequence = 2
+    return previous, snapshot
+
+
+def drain(subscription):
+    events = []
+    while not subscription.queue.empty():
+        events.append(subscription.queue.get_nowait())
+    return [(event.kind, event.tracking_id) for event in events]
+
+
+# Test case: each subscriber gets only the changes matching its filters, including packages leaving a watched status
+def test_publish_routes_changes_by_filter():
+    async def run():
+        broker = PackageEventBroker(max_subscribers=10)
+        by_id = Subscription(tracking_ids=frozenset({"PKG1"}))
+        in_transit = Subscription(statuses=frozenset({PackageStatus.IN_TRANSIT}))
+        fedex = Subscription(carriers=frozenset({"FedEx"}))
+        for subscription in (by_id, in_transit, fedex):
+            assert broker.subscribe(subscription)
+
+        previous, snapshot = snapshots(
+            [record("PKG1"), record("PKG2"), record("PKG3")],
+            [record("PKG1", status="Delivered"), record("PKG3"), record("PKG4", carrier="FedEx", status="Delivered")]
+        )
+        broker.publish(snapshot, previous, snapshot.changed_ids | snapshot.removed_ids)
+        await asyncio.sleep(0)
+
+        assert drain(by_id) == [("update", "PKG1")]
+        assert sorted(drain(in_transit)) == [("removed", "PKG2"), ("update", "PKG1")]
+        assert drain(fedex) == [("update", "PKG4")]
+
+        broker.unsubscribe(by_id)
+        assert len(broker) == 2
+
+    asyncio.run(run())
+
+
+# Test case: a subscriber that falls behind has its queue replaced by one resync event
+def test_slow_subscriber_gets_resync():
+    async def run():
+        broker = PackageEventBroker(max_subscribers=1)
+        subscription = Subscription(max_queue=2)
+        broker.subscribe(subscription)
+        assert not broker.subscribe(Subscription())  # Full
+
+        previous, snapshot = snapshots([], [record(f"PKG{i}") for i in range(5)])
+        broker.publish(snapshot, previous, snapshot.changed_ids)
+        await asyncio.sleep(0)
+
+        assert drain(subscription) == [("resync", None)]
+        assert subscription.dropped == 2
+
+    asyncio.run(run())
+
+
+# Test case: a snapshot refreshed on another thread reaches subscribers on the event loop
+@patch("app.services.package_service.client")
+def test_refresh_pushes_to_subscribers(mock_client):
+    payload = [record("PKG1")]
+    mock_client.stream_items.side_effect = lambda path, key, validators=None: iter(payload)
+
+    async def run():
+        subscription = Subscription(tracking_ids=frozenset({"PKG1"}))
+        package_events.subscribe(subscription)
+        try:
+            await asyncio.to_thread(get_all_packages)
+            first = await asyncio.wait_for(subscription.get(), 1)  # First snapshot: nothing to diff from
+
+            payload[0] = record("PKG1", status="Delivered")
+            with patch.object(tracking_cache, "ttl_seconds", 0), patch.object(tracking_cache, "max_stale_seconds", 0):
+                await asyncio.to_thread(get_all_packages)
+            second = await asyncio.wait_for(subscription.get(), 1)
+        finally:
+            package_events.unsubscribe(subscription)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first.kind == PackageEvent.RESYNC
+    assert second.kind == PackageEvent.UPDATE
+    assert second.package.status == PackageStatus.DELIVERED
+    assert second.encode().startswith(b"id: ")
+    assert b'"status":"Delivered"' in second.encode()
@@ -1,10 +1,17 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
-from app.services.package_service import get_all_packages, get_package_by_tracking_id
+from unittest.mock import patch, MagicMock, AsyncMock, ANY
+from app.services.package_service import (
+    get_all_packages,
+    get_package_by_tracking_id,
+    get_all_packages_async,
+    get_package_by_tracking_id_async,
+    get_enriched_package_async
+)
 from app.models.package import Package, PackageStatus
-from app.services.carrier_service import get_all_carriers
+from app.services.carrier_service import get_all_carriers, get_all_carriers_async
 from app.models.carrier import Carrier
-from app.services.http_client import MockApiClient
+from app.services.http_client import MockApiClient, AsyncMockApiClient
 import requests
 
 
@@ -28,7 +35,7 @@ def test_get_all_carriers_success():
         assert carriers[0].name == "United Parcel Service"
         assert carriers[1].id == "FEDEX"
         assert carriers[1].name == "FedEx"
-        mock_client.get.assert_called_once_with("/carriers")
+        mock_client.get.assert_called_once_with("/carriers", validators=ANY)
 
 
 # Test case: get all carriers when the list is empty
@@ -39,7 +46,7 @@ def test_get_all_carriers_empty_list():
         carriers = get_all_carriers()
 
         assert carriers == []
-        mock_client.get.assert_called_once_with("/carriers")
+        mock_client.get.assert_called_once_with("/carriers", validators=ANY)
 
 
 # Test case: get all carriers with HTTP client exception
@@ -51,7 +58,7 @@ def test_get_all_carriers_http_client_exception():
             get_all_carriers()
 
         assert "API failure" in str(exc_info.value)
-        mock_client.get.assert_called_once_with("/carriers")
+        mock_client.get.assert_called_once_with("/carriers", validators=ANY)
 
 
 # mock data for packages
@@ -77,23 +84,28 @@ mock_packages = {
 }
 
 
+async def stream_tracking(path, key, validators=None):
+    for item in mock_packages[key]:
+        yield item
+
+
 # Test case: get all packages successfully
 @patch("app.services.package_service.client")
 def test_get_all_packages_success(mock_client):
-    mock_client.get.return_value = mock_packages
+    mock_client.stream_items.side_effect = lambda path, key, validators=None: iter(mock_packages[key])
 
     packages = get_all_packages()
 
     assert len(packages) == 2
     assert all(isinstance(p, Package) for p in packages)
     assert packages[0].tracking_id == "PKG123"
-    mock_client.get.assert_called_once_with("/tracking")
+    mock_client.stream_items.assert_called_once_with("/tracking", "packages", validators=ANY)
 
 
 # Test case: get all packages successfully with filters
 @patch("app.services.package_service.client")
 def test_get_all_packages_filter_by_status(mock_client):
-    mock_client.get.return_value = mock_packages
+    mock_client.stream_items.side_effect = lambda path, key, validators=None: iter(mock_packages[key])
 
     packages = get_all_packages(status=PackageStatus.DELIVERED)
 
@@ -104,7 +116,7 @@ def test_get_all_packages_filter_by_status(mock_client):
 # Test case: get all packages successfully with sorting by eta
 @patch("app.services.package_service.client")
 def test_get_all_packages_sort_by_eta(mock_client):
-    mock_client.get.return_value = mock_packages
+    mock_client.stream_items.side_effect = lambda path, key, validators=None: iter(mock_packages[key])
 
     packages = get_all_packages(sort_by="eta")
 
@@ -112,60 +124,223 @@ def test_get_all_packages_sort_by_eta(mock_client):
     assert packages[1].tracking_id == "PKG123"
 
 
-# Test case: get package by tracking ID successfully
+# Test case: get package by tracking ID successfully from the per-ID endpoint when the snapshot is cold
 @patch("app.services.package_service.client")
 def test_get_package_by_tracking_id_found(mock_client):
-    mock_client.get.return_value = mock_packages
+    mock_client.get.return_value = mock_packages["packages"][1]
 
     pkg = get_package_by_tracking_id("PKG456")
 
     assert isinstance(pkg, Package)
     assert pkg.tracking_id == "PKG456"
     assert pkg.carrier == "FedEx"
+    mock_client.get.assert_called_once_with("/tracking/PKG456")
 
 
-# Test case: get package by tracking ID not found
+# Test case: get package by tracking ID not found upstream
 @patch("app.services.package_service.client")
 def test_get_package_by_tracking_id_not_found(mock_client):
-    mock_client.get.return_value = mock_packages
+    not_found = requests.exceptions.HTTPError("404 Client Error", response=MagicMock(status_code=404))
+    mock_client.get.side_effect = not_found
 
     pkg = get_package_by_tracking_id("NONEXISTENT")
 
     assert pkg is None
 
 
+# Test case: upstream 5xx on the per-ID endpoint is raised, not treated as not found
+@patch("app.services.package_service.client")
+def test_get_package_by_tracking_id_upstream_error(mock_client):
+    mock_client.get.side_effect = requests.exceptions.HTTPError("500 Server Error", response=MagicMock(status_code=500))
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        get_package_by_tracking_id("PKGFAIL001")
+
+
+# Test case: a warm snapshot answers lookups from its index without another upstream call
+@patch("app.services.package_service.client")
+def test_get_package_by_tracking_id_uses_warm_snapshot(mock_client):
+    mock_client.stream_items.side_effect = lambda path, key, validators=None: iter(mock_packages[key])
+    get_all_packages()
+
+    assert get_package_by_tracking_id("PKG456").carrier == "FedEx"
+    assert get_package_by_tracking_id("NONEXISTENT") is None
+    mock_client.stream_items.assert_called_once_with("/tracking", "packages", validators=ANY)
+    mock_client.get.assert_not_called()
+
+
+# Test case: async get all carriers successfully
+@patch("app.services.carrier_service.async_client")
+def test_get_all_carriers_async_success(mock_client):
+    mock_client.get = AsyncMock(return_value={"carriers": [{"id": "UPS", "name": "United Parcel Service"}]})
+
+    carriers = asyncio.run(get_all_carriers_async())
+
+    assert carriers == [Carrier(id="UPS", name="United Parcel Service")]
+    mock_client.get.assert_awaited_once_with("/carriers", validators=ANY)
+
+
+# Test case: a 304 for /carriers reuses the list the request was made for, even if the cache was invalidated meanwhile
+@patch("app.services.carrier_service.async_client")
+def test_carriers_not_modified_after_invalidate(mock_client):
+    from app.services.carrier_service import carrier_cache, invalidate_carrier_cache, refresh_carriers
+    from app.services.http_client import NotModifiedError
+    mock_client.get = AsyncMock(return_value={"carriers": [{"id": "UPS", "name": "United Parcel Service"}]})
+    asyncio.run(get_all_carriers_async())
+
+    async def not_modified(path, validators=None):
+        invalidate_carrier_cache()
+        raise NotModifiedError(path)
+
+    mock_client.get = AsyncMock(side_effect=not_modified)
+    asyncio.run(refresh_carriers())
+
+    assert carrier_cache.snapshot is None
+
+
+# Test case: async get all packages with filter and sort
+@patch("app.services.package_service.async_client")
+def test_get_all_packages_async_filter_and_sort(mock_client):
+    mock_client.stream_items = MagicMock(side_effect=stream_tracking)
+
+    packages = asyncio.run(get_all_packages_async(status=PackageStatus.IN_TRANSIT, sort_by="eta"))
+
+    assert [p.tracking_id for p in packages] == ["PKG123"]
+    mock_client.stream_items.assert_called_once_with("/tracking", "packages", validators=ANY)
+
+
+# Test case: async get package by tracking ID
+@patch("app.services.package_service.async_client")
+def test_get_package_by_tracking_id_async_found(mock_client):
+    mock_client.get = AsyncMock(return_value=mock_packages["packages"][0])
+
+    pkg = asyncio.run(get_package_by_tracking_id_async("PKG123"))
+
+    assert pkg.tracking_id == "PKG123"
+    mock_client.get.assert_awaited_once_with("/tracking/PKG123")
+
+
+# Test case: async enriched package joins tracking and location data
+@patch("app.services.package_service.async_client")
+def test_get_enriched_package_async_success(mock_client):
+    city = {"city": "Philadelphia", "state": "PA", "timezone": "EST", "lat": 39.9526, "lon": -75.1652}
+    mock_client.get = AsyncMock(side_effect=[mock_packages["packages"][0], city])
+
+    enriched = asyncio.run(get_enriched_package_async("PKG123"))
+
+    assert enriched.package.tracking_id == "PKG123"
+    assert enriched.city_metadata.state == "PA"
+    mock_client.get.assert_awaited_with("/locations/philadelphia")
+
+
 # Test case: a successful GET request
-@patch("app.services.http_client.requests.get")
-def test_get_success(mock_get):
+def test_get_success():
     mock_response = MagicMock()
     mock_response.status_code = 200
     mock_response.json.return_value = {"message": "Success"}
     mock_response.raise_for_status.return_value = None
-    mock_get.return_value = mock_response
 
-    client = MockApiClient(base_url="http://localhost:8080")
-    result = client.get("/test-endpoint")
+    client = MockApiClient(base_url="http://localhost:8080", connect_timeout=1.0, read_timeout=5.0)
+
+    with patch.object(client.session, "get", return_value=mock_response) as mock_get:
+        result = client.get("/test-endpoint")
 
-    mock_get.assert_called_once_with("http://localhost:8080/test-endpoint")
+    mock_get.assert_called_once_with("http://localhost:8080/test-endpoint", timeout=(1.0, 5.0))
     assert result == {"message": "Success"}
 
 
 # Test case: GET request raises HTTPError
-@patch("app.services.http_client.requests.get")
-def test_get_http_error(mock_get):
+def test_get_http_error():
     mock_response = MagicMock()
     mock_response.raise_for_status.side_effect = requests.exceptions.HTTPError("404 Client Error")
-    mock_get.return_value = mock_response
 
     client = MockApiClient()
 
-    with pytest.raises(requests.exceptions.HTTPError):
-        client.get("/bad-endpoint")
+    with patch.object(client.session, "get", return_value=mock_response) as mock_get:
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.get("/bad-endpoint")
 
-    mock_get.assert_called_once_with("http://localhost:8080/bad-endpoint")
+    mock_get.assert_called_once_with("http://localhost:8080/bad-endpoint", timeout=client.timeout)
 
 
 # Test case: Test default base URL
 def test_default_base_url():
     client = MockApiClient()
-    assert client.base_url == "http://localhost:8080"
\ No newline at end of file
+    assert client.base_url == "http://localhost:8080"
+
+
+# Test case: the session mounts a pooled adapter sized from the constructor
+def test_session_uses_pooled_adapter():
+    client = MockApiClient(pool_connections=2, pool_maxsize=7)
+    adapter = client.session.get_adapter("http://localhost:8080/tracking")
+
+    assert adapter._pool_connections == 2
+    assert adapter._pool_maxsize == 7
+
+
+# Test case: package and carrier services share one client instance
+def test_services_share_one_client():
+    from app.services import package_service, carrier_service, http_client
+
+    assert package_service.client is http_client.client
+    assert carrier_service.client is http_client.client
+
+
+# Test case: async client GET returns parsed JSON
+def test_async_get_success():
+    async def run():
+        client = AsyncMockApiClient(base_url="http://upstream")
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"message": "Success"}
+        with patch.object(client.session, "get", AsyncMock(return_value=mock_response)) as mock_get:
+            result = await client.get("/test-endpoint")
+        await client.close()
+        mock_get.assert_awaited_once_with("http://upstream/test-endpoint")
+        return result
+
+    assert asyncio.run(run()) == {"message": "Success"}
+
+
+# Test case: a snapshot refresh is conditional, and a 304 keeps the parsed snapshot and its version
+def test_tracking_refresh_reuses_snapshot_on_not_modified():
+    from app.services.http_client import NotModifiedError
+    from app.services.package_service import tracking_cache
+    calls = []
+
+    def stream_items(path, key, validators=None):
+        calls.append(validators.request_headers())
+        if len(calls) == 1:
+            validators.etag = '"v1"'
+            return iter(mock_packages[key])
+        raise NotModifiedError(path)
+
+    with patch("app.services.package_service.client") as mock_client:
+        mock_client.stream_items.side_effect = stream_items
+        get_all_packages()
+        snapshot = tracking_cache.snapshot
+        with patch.object(tracking_cache, "ttl_seconds", 0), patch.object(tracking_cache, "max_stale_seconds", 0):
+            assert len(get_all_packages()) == len(mock_packages["packages"])
+
+    assert calls == [{}, {"If-None-Match": '"v1"'}]
+    assert tracking_cache.snapshot.value is snapshot.value
+    assert tracking_cache.snapshot.version == snapshot.version
+
+
+# Test case: the client sends validators, records new ones from a 200, and raises on a 304
+def test_get_conditional_request():
+    from app.services.http_client import CacheValidators, NotModifiedError
+    client = MockApiClient(base_url="http://upstream")
+    validators = CacheValidators()
+    fresh = MagicMock(status_code=200, headers={"ETag": '"abc"', "Last-Modified": "Wed, 01 Jul 2025 00:00:00 GMT"})
+    fresh.json.return_value = {"carriers": []}
+    unchanged = MagicMock(status_code=304)
+
+    with patch.object(client.session, "get", side_effect=[fresh, unchanged]) as mock_get:
+        assert client.get("/carriers", validators=validators) == {"carriers": []}
+        with pytest.raises(NotModifiedError):
+            client.get("/carriers", validators=validators)
+
+    assert mock_get.call_args.kwargs["headers"] == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Wed, 01 Jul 2025 00:00:00 GMT"
+    }
@@ -0,0 +1,122 @@
+import asyncio
+import pytest
+from unittest.mock import patch
+from app.models.package import PackageStatus, SortBy
+from app.services.package_service import get_packages_page_async, invalidate_tracking_cache
+from app.services.pagination import InvalidCursorError, encode_cursor
+
+
+def make_package(tracking_id, status="In Transit", eta="2025-07-20T10:00:00Z", last_updated="2025-07-13T14:00:00Z"):
+    return {
+        "tracking_id": tracking_id,
+        "carrier": "UPS",
+        "status": status,
+        "eta": eta,
+        "last_updated": last_updated,
+        "current_city": "Philadelphia"
+    }
+
+
+mock_packages = {"packages": [
+    make_package("PKG5", eta="2025-07-15T10:00:00Z", last_updated="2025-07-10T10:00:00Z"),
+    make_package("PKG1", eta="2025-07-11T10:00:00Z", last_updated="2025-07-14T10:00:00Z", status="Delivered"),
+    make_package("PKG3", eta="2025-07-13T10:00:00Z", last_updated="2025-07-12T10:00:00Z"),
+    make_package("PKG2", eta="2025-07-13T10:00:00Z", last_updated="2025-07-13T10:00:00Z"),
+    make_package("PKG4", eta="2025-07-14T10:00:00Z", last_updated="2025-07-11T10:00:00Z", status="Delivered"),
+]}
+
+
+def streams(payload):
+    async def stream_items(path, key, validators=None):
+        for item in payload[key]:
+            yield item
+    return stream_items
+
+
+def get_packages_page(**kwargs):
+    return asyncio.run(get_packages_page_async(**kwargs))
+
+
+def collect_pages(limit, **kwargs):
+    ids, cursor = [], None
+    while True:
+        page, cursor = get_packages_page(limit=limit, cursor=cursor, **kwargs)
+        ids.extend(p.tracking_id for p in page)
+        if cursor is None:
+            return ids
+
+
+# Test cases for keyset pagination
+
+
+# Test case: without a sort, pages walk the packages in tracking ID order
+@patch("app.services.package_service.async_client")
+def test_pages_default_order(mock_async_client):
+    mock_async_client.stream_items = streams(mock_packages)
+
+    assert collect_pages(2) == ["PKG1", "PKG2", "PKG3", "PKG4", "PKG5"]
+
+
+# Test case: eta pages ascend, with ties broken by tracking ID
+@patch("app.services.package_service.async_client")
+def test_pages_sorted_by_eta(mock_async_client):
+    mock_async_client.stream_items = streams(mock_packages)
+
+    assert collect_pages(2, sort_by=SortBy.eta) == ["PKG1", "PKG2", "PKG3", "PKG4", "PKG5"]
+
+
+# Test case: last_updated pages descend and respect the status filter
+@patch("app.services.package_service.async_client")
+def test_pages_sorted_by_last_updated_with_status(mock_async_client):
+    mock_async_client.stream_items = streams(mock_packages)
+
+    ids = collect_pages(1, status=PackageStatus.IN_TRANSIT, sort_by=SortBy.last_updated)
+
+    assert ids == ["PKG2", "PKG3", "PKG5"]
+
+
+# Test case: the last page has no next cursor
+@patch("app.services.package_service.async_client")
+def test_last_page_has_no_cursor(mock_async_client):
+    mock_async_client.stream_items = streams(mock_packages)
+
+    page, cursor = get_packages_page(limit=10)
+
+    assert len(page) == 5
+    assert cursor is None
+
+
+# Test case: a cursor keeps its position when the snapshot refreshes with new packages
+@patch("app.services.package_service.async_client")
+def test_cursor_stable_across_refresh(mock_async_client):
+    mock_async_client.stream_items = streams(mock_packages)
+    first, cursor = get_packages_page(limit=2)
+    assert [p.tracking_id for p in first] == ["PKG1", "PKG2"]
+
+    refreshed = {"packages": mock_packages["packages"] + [make_package("PKG0")]}
+    mock_async_client.stream_items = streams(refreshed)
+    invalidate_tracking_cache()
+    second, _ = get_packages_page(limit=2, cursor=cursor)
+
+    assert [p.tracking_id for p in second] == ["PKG3", "PKG4"]
+
+
+# Test case: a cursor issued for one sort cannot be used with another
+@patch("app.services.package_service.async_client")
+def test_cursor_for_other_sort_rejected(mock_async_client):
+    mock_async_client.stream_items = streams(mock_packages)
+    _, cursor = get_packages_page(limit=1, sort_by=SortBy.eta)
+
+    with pytest.raises(InvalidCursorError):
+        get_packages_page(limit=1, sort_by=SortBy.last_updated, cursor=cursor)
+
+
+# Test case: malformed cursors are rejected
+@patch("app.services.package_service.async_client")
+def test_malformed_cursor_rejected(mock_async_client):
+    mock_async_client.stream_items = streams(mock_packages)
+
+    with pytest.raises(InvalidCursorError):
+        get_packages_page(limit=1, cursor="not-a-cursor")
+    with pytest.raises(InvalidCursorError):
+        get_packages_page(limit=1, sort_by=SortBy.eta, cursor=encode_cursor(None, "eta", ("x", 1)))
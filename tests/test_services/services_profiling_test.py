@@ -0,0 +1,35 @@
+import asyncio
+from app.services.profiling import phase, record, start_profile, stop_profile
+
+# Test cases for per-request phase timings
+
+
+# Test case: outside a profiled request, phases and records are no-ops
+def test_phase_without_profile_is_noop():
+    with phase("validation"):
+        pass
+    record("upstream", 1.0)
+
+
+# Test case: phases add up per name, and the profile follows the request into tasks it starts
+def test_phases_are_recorded_per_request():
+    async def handle():
+        profile = start_profile()
+        try:
+            with phase("validation"):
+                pass
+            record("upstream", 0.25)
+            await asyncio.gather(*(asyncio.ensure_future(upstream_call()) for _ in range(2)))
+        finally:
+            stop_profile(profile)
+        record("upstream", 5.0)  # After the request: not counted
+        return profile
+
+    async def upstream_call():
+        record("upstream", 0.25)
+
+    profile = asyncio.run(handle())
+    assert profile.calls == {"validation": 1, "upstream": 3}
+    assert profile.phases["upstream"] == 0.75
+    assert profile.server_timing().startswith("validation;dur=")
+    assert "upstream;dur=750.00" in profile.server_timing()
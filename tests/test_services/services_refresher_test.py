@@ -0,0 +1,81 @@
+import asyncio
+from unittest.mock import AsyncMock
+from app.services.refresher import BackgroundRefresher, RefreshTarget
+from app.services.snapshot_cache import SnapshotCache
+
+# Test cases for the background snapshot refresher
+
+
+def make_target(name: str, ttl_seconds: float, refresh=None) -> RefreshTarget:
+    cache = SnapshotCache(ttl_seconds=ttl_seconds, max_stale_seconds=60)
+
+    async def load():
+        return [name]
+
+    async def default_refresh():
+        await cache.refresh(load)
+
+    return RefreshTarget(name, cache, refresh or default_refresh)
+
+
+# Test case: missing snapshots are due, and fresh ones only once they near expiry
+def test_is_due_refreshes_ahead_of_expiry():
+    target = make_target("/tracking", ttl_seconds=60)
+    refresher = BackgroundRefresher([target], interval_seconds=1, ahead_fraction=0.5)
+
+    assert refresher.is_due(target)
+    asyncio.run(refresher.refresh_due())
+    assert target.cache.snapshot.value == ["/tracking"]
+    assert not refresher.is_due(target)
+
+    target.cache.ttl_seconds = 0
+    assert refresher.is_due(target)
+
+
+# Test case: the running task warms every cache and stops cleanly
+def test_start_warms_caches():
+    tracking = make_target("/tracking", ttl_seconds=60)
+    carriers = make_target("/carriers", ttl_seconds=60)
+    refresher = BackgroundRefresher([tracking, carriers], interval_seconds=0.01)
+
+    async def run():
+        refresher.start()
+        await asyncio.sleep(0.05)
+        await refresher.stop()
+
+    asyncio.run(run())
+    assert tracking.cache.snapshot.value == ["/tracking"]
+    assert carriers.cache.snapshot.value == ["/carriers"]
+
+
+# Test case: a failed refresh is logged with its traceback and backs off instead of retrying on every tick
+def test_failed_refresh_backs_off(caplog):
+    refresh = AsyncMock(side_effect=RuntimeError("upstream down"))
+    target = make_target("/carriers", ttl_seconds=60, refresh=refresh)
+    refresher = BackgroundRefresher([target], interval_seconds=10)
+
+    asyncio.run(refresher.refresh_due())
+    asyncio.run(refresher.refresh_due())
+
+    refresh.assert_awaited_once()
+    assert not refresher.is_due(target)
+    [logged] = caplog.records
+    assert logged.levelname == "ERROR" and logged.name == "app.services.refresher"
+    assert isinstance(logged.exc_info[1], RuntimeError)
+
+
+# Test case: a refresh failing inside the cache is logged once, by the refresher
+def test_failed_cache_refresh_logged_once(caplog):
+    cache = SnapshotCache(ttl_seconds=60)
+
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def refresh():
+        await cache.refresh(fail)
+
+    refresher = BackgroundRefresher([RefreshTarget("/tracking", cache, refresh)], interval_seconds=10)
+    asyncio.run(refresher.refresh_due())
+
+    [logged] = caplog.records
+    assert logged.name == "app.services.refresher"
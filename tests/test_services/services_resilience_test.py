@@ -0,0 +1,244 @@
+import asyncio
+import time
+import pytest
+import requests
+from unittest.mock import patch, MagicMock, AsyncMock
+from app.services.http_client import MockApiClient, AsyncMockApiClient
+from app.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    RetryPolicy,
+    UpstreamEndpoints,
+    endpoint_name,
+    is_retryable
+)
+from app.services.package_service import get_all_packages_async, get_package_by_tracking_id_async, tracking_cache
+
+# Test cases for retries, hedged requests and circuit breaking on upstream calls
+
+NO_WAIT = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+
+
+def http_error(status_code: int) -> requests.HTTPError:
+    response = MagicMock()
+    response.status_code = status_code
+    return requests.HTTPError(f"{status_code} Error", response=response)
+
+
+def ok_response(body):
+    response = MagicMock()
+    response.json.return_value = body
+    response.raise_for_status.return_value = None
+    return response
+
+
+def failing_response(status_code: int):
+    response = MagicMock()
+    response.raise_for_status.side_effect = http_error(status_code)
+    return response
+
+
+def make_client(**kwargs) -> MockApiClient:
+    endpoints = UpstreamEndpoints(failure_threshold=2, reset_timeout=60, latency_window=50)
+    return MockApiClient(base_url="http://upstream", retry=NO_WAIT, endpoints=endpoints, **kwargs)
+
+
+# Test case: only connection errors, timeouts, 429 and 5xx are retried
+def test_is_retryable():
+    assert is_retryable(http_error(500))
+    assert is_retryable(http_error(503))
+    assert is_retryable(http_error(429))
+    assert is_retryable(requests.ConnectionError())
+    assert is_retryable(requests.Timeout())
+    assert not is_retryable(http_error(404))
+    assert not is_retryable(requests.HTTPError("no response"))
+    assert not is_retryable(ValueError())
+
+
+# Test case: per-ID paths share one endpoint
+def test_endpoint_name():
+    assert endpoint_name("/tracking") == "/tracking"
+    assert endpoint_name("/tracking/PKG1") == "/tracking/*"
+    assert endpoint_name("/locations/new%20york") == "/locations/*"
+
+
+# Test case: backoff delays are jittered below a capped exponential bound
+def test_retry_delays_are_capped():
+    policy = RetryPolicy(max_attempts=6, base_delay=0.1, max_delay=0.5)
+    delays = list(policy.delays())
+
+    assert len(delays) == 5
+    for attempt, delay in enumerate(delays):
+        assert 0 <= delay <= min(0.5, 0.1 * 2 ** attempt)
+
+
+# Test case: a 5xx is retried and the later success is returned
+def test_get_retries_server_errors():
+    client = make_client()
+    responses = [failing_response(500), failing_response(503), ok_response({"ok": True})]
+
+    with patch.object(client.session, "get", side_effect=responses) as mock_get:
+        assert client.get("/tracking/PKGFAIL001") == {"ok": True}
+
+    assert mock_get.call_count == 3
+    assert client.endpoints.get("/tracking/PKGFAIL001").breaker.state == CircuitBreaker.CLOSED
+
+
+# Test case: a 404 is an answer, so it is neither retried nor counted against the breaker
+def test_get_does_not_retry_not_found():
+    client = make_client()
+
+    with patch.object(client.session, "get", return_value=failing_response(404)) as mock_get:
+        with pytest.raises(requests.HTTPError):
+            client.get("/tracking/UNKNOWN")
+
+    mock_get.assert_called_once()
+    assert client.endpoints.get("/tracking/UNKNOWN").breaker.consecutive_failures == 0
+
+
+# Test case: after the threshold of failed calls the circuit opens and later calls fail fast
+def test_circuit_opens_and_fails_fast():
+    client = make_client()
+
+    with patch.object(client.session, "get", return_value=failing_response(500)) as mock_get:
+        for _ in range(2):
+            with pytest.raises(requests.HTTPError):
+                client.get("/carriers")
+        assert mock_get.call_count == 6  # two calls, three attempts each
+
+        with pytest.raises(CircuitOpenError):
+            client.get("/carriers")
+        assert mock_get.call_count == 6
+
+    assert client.endpoints.get("/carriers").breaker.state == CircuitBreaker.OPEN
+
+
+# Test case: after the reset timeout one probe is let through, and its success closes the circuit
+def test_circuit_half_open_probe():
+    breaker = CircuitBreaker("/carriers", failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()  # Only one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+# Test case: a failed probe re-opens the circuit immediately
+def test_circuit_failed_probe_reopens():
+    breaker = CircuitBreaker("/carriers", failure_threshold=3, reset_timeout=0.05)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.06)
+    breaker.before_call()
+    breaker.record_failure()
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+# Test case: a streamed body is retried when it fails before any item was produced
+def test_stream_items_retries_before_first_item():
+    client = make_client()
+    body = MagicMock()
+    body.__enter__.return_value = body
+    body.raise_for_status.return_value = None
+    body.iter_content.return_value = iter([b'{"packages": [{"id": 1}]}'])
+    failing = MagicMock()
+    failing.__enter__.return_value = failing
+    failing.raise_for_status.side_effect = http_error(502)
+
+    with patch.object(client.session, "get", side_effect=[failing, body]):
+        assert list(client.stream_items("/tracking", "packages")) == [{"id": 1}]
+
+
+# Test case: a slow first attempt is hedged and the faster duplicate wins
+def test_get_hedges_slow_request():
+    client = make_client(hedge=True)
+    calls = []
+
+    def get(url, timeout):
+        calls.append(url)
+        if len(calls) == 1:
+            time.sleep(0.5)
+            return ok_response({"attempt": "first"})
+        return ok_response({"attempt": "hedge"})
+
+    with patch("app.services.http_client.config.HTTP_HEDGE_MAX_DELAY", 0.05):
+        with patch.object(client.session, "get", side_effect=get):
+            started = time.monotonic()
+            assert client.get("/carriers") == {"attempt": "hedge"}
+            assert time.monotonic() - started < 0.4
+
+    assert len(calls) == 2
+    client.close()
+
+
+# Test case: the async client hedges too, and cancels the losing request
+def test_async_get_hedges_slow_request():
+    cancelled = []
+
+    async def get(url):
+        if not cancelled:
+            cancelled.append(False)
+            try:
+                await asyncio.sleep(0.5)
+            except asyncio.CancelledError:
+                cancelled[0] = True
+                raise
+            return ok_response({"attempt": "first"})
+        return ok_response({"attempt": "hedge"})
+
+    async def run():
+        endpoints = UpstreamEndpoints(failure_threshold=2, reset_timeout=60, latency_window=50)
+        client = AsyncMockApiClient(base_url="http://upstream", retry=NO_WAIT, endpoints=endpoints, hedge=True)
+        with patch.object(client.session, "get", AsyncMock(side_effect=get)):
+            result = await client.get("/carriers")
+            await asyncio.sleep(0)
+        await client.close()
+        return result
+
+    with patch("app.services.http_client.config.HTTP_HEDGE_MAX_DELAY", 0.05):
+        assert asyncio.run(run()) == {"attempt": "hedge"}
+    assert cancelled == [True]
+
+
+# Test case: the expired snapshot keeps being served while the /tracking circuit is open
+@patch("app.services.package_service.async_client")
+def test_stale_snapshot_served_while_circuit_open(mock_async_client):
+    payload = [{
+        "tracking_id": "PKG1",
+        "carrier": "UPS",
+        "status": "In Transit",
+        "eta": "2025-06-15T18:00:00Z",
+        "last_updated": "2025-06-12T09:30:00Z",
+        "current_city": "Philadelphia"
+    }]
+
+    async def stream_items(path, key, validators=None):
+        for item in payload:
+            yield item
+
+    mock_async_client.stream_items = stream_items
+    assert len(asyncio.run(get_all_packages_async())) == 1
+
+    mock_async_client.stream_items = MagicMock(side_effect=CircuitOpenError("/tracking", 30))
+    mock_async_client.get = AsyncMock(side_effect=CircuitOpenError("/tracking/*", 30))
+    with patch.object(tracking_cache, "ttl_seconds", 0), patch.object(tracking_cache, "max_stale_seconds", 0):
+        assert [pkg.tracking_id for pkg in asyncio.run(get_all_packages_async())] == ["PKG1"]
+        assert asyncio.run(get_package_by_tracking_id_async("PKG1")).tracking_id == "PKG1"
+
+
+# Test case: with nothing cached, an open circuit surfaces as an error
+@patch("app.services.package_service.async_client")
+def test_open_circuit_without_snapshot_raises(mock_async_client):
+    mock_async_client.stream_items = MagicMock(side_effect=CircuitOpenError("/tracking", 30))
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(get_all_packages_async())
@@ -0,0 +1,53 @@
+import gzip
+from app.services.response_cache import ResponseCache
+
+# Test cases for the encoded response cache
+
+
+# Test case: a stored body is returned by key and counted as a hit
+def test_put_and_get():
+    cache = ResponseCache(max_bytes=1000, gzip_min_bytes=10_000)
+    cache.put('"v1"', b"[1,2,3]", "application/json", {"etag": '"v1"'})
+
+    entry = cache.get('"v1"')
+    assert entry.body == b"[1,2,3]"
+    assert entry.gzipped is None
+    assert entry.headers == {"etag": '"v1"'}
+    assert cache.get('"v2"') is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+# Test case: bodies above the threshold get a gzip copy that decompresses to the original
+def test_large_bodies_are_precompressed():
+    cache = ResponseCache(max_bytes=1_000_000, gzip_min_bytes=100)
+    body = b'{"status": "In Transit"},' * 200
+
+    entry = cache.put("key", body, "application/json", {})
+
+    assert gzip.decompress(entry.gzipped) == body
+    assert cache.stats()["bytes"] == len(body) + len(entry.gzipped)
+
+
+# Test case: least recently used entries are evicted to stay within the byte budget
+def test_evicts_least_recently_used_within_budget():
+    cache = ResponseCache(max_bytes=25, gzip_min_bytes=10_000)
+    cache.put("a", b"a" * 10, "application/json", {})
+    cache.put("b", b"b" * 10, "application/json", {})
+    cache.get("a")
+    cache.put("c", b"c" * 10, "application/json", {})
+
+    assert cache.get("a") is not None
+    assert cache.get("b") is None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] == 20
+
+
+# Test case: a body larger than the whole budget is delivered but not cached
+def test_oversized_body_not_cached():
+    cache = ResponseCache(max_bytes=5, gzip_min_bytes=10_000)
+    entry = cache.put("big", b"x" * 10, "application/json", {})
+
+    assert entry.body == b"x" * 10
+    assert cache.get("big") is None
+    assert cache.stats()["bytes"] == 0
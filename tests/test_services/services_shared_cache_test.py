@@ -0,0 +1,170 @@
+import asyncio
+import os
+import time
+from unittest.mock import AsyncMock, patch
+from app.models.carrier import Carrier
+from app.models.enriched_package import CityMetadata
+from app.services.carrier_service import carrier_cache, seed_carriers
+from app.services.http_client import CacheValidators
+from app.services.package_service import change_log, city_cache, prefetch_cities_async, seed_tracking_snapshot, tracking_cache
+from app.services.shared_cache import SharedSnapshotCache
+from app.services.tracking_snapshot import TrackingSnapshot
+
+# Test cases for the cache shared between worker processes
+
+
+def record(tracking_id, status="In Transit", city="Philadelphia"):
+    return {
+        "tracking_id": tracking_id,
+        "carrier": "UPS",
+        "status": status,
+        "eta": "2025-06-15T18:00:00Z",
+        "last_updated": "2025-06-12T09:30:00Z",
+        "current_city": city
+    }
+
+
+philadelphia = CityMetadata(city="Philadelphia", state="PA", timezone="America/New_York", lat=39.95, lon=-75.17)
+
+
+# Test case: only one instance at a time holds the leader lock, and resigning hands it over
+def test_single_leader(tmp_path):
+    path = str(tmp_path / "shared.bin")
+    first, second = SharedSnapshotCache(path), SharedSnapshotCache(path)
+
+    assert first.try_lead()
+    assert first.try_lead()
+    assert not second.try_lead()
+    assert not second.is_leader
+
+    first.resign()
+    assert second.try_lead()
+    second.resign()
+
+
+# Test case: a follower installs what the leader published, once per published file, diffing /tracking changes
+def test_follower_syncs_published_file(tmp_path):
+    path = str(tmp_path / "shared.bin")
+    leader, follower = SharedSnapshotCache(path), SharedSnapshotCache(path)
+    assert not follower.sync()  # Nothing published yet
+
+    seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": [record("PKG1"), record("PKG2")]}), CacheValidators('"t1"'))
+    seed_carriers([Carrier(id="UPS", name="United Parcel Service")], CacheValidators('"c1"'))
+    city_cache.put("Philadelphia", philadelphia)
+    assert leader.publish()
+
+    tracking_cache.invalidate()
+    carrier_cache.invalidate()
+    city_cache.clear()
+    assert follower.sync()
+    assert not follower.sync()
+
+    snapshot = tracking_cache.snapshot
+    assert [pkg.tracking_id for pkg in snapshot.value.select(None, None)] == ["PKG1", "PKG2"]
+    assert tracking_cache.is_fresh(snapshot)
+    assert carrier_cache.snapshot.value == [Carrier(id="UPS", name="United Parcel Service")]
+    assert city_cache.contains("philadelphia")
+
+    # The leader's next snapshot changes one package; the follower diffs it into its change log
+    tracking_cache.put(TrackingSnapshot.from_payload({"packages": [record("PKG1", status="Delivered"), record("PKG2")]}))
+    leader.publish()
+    tracking_cache.put(snapshot.value)
+    sequence = change_log.sequence
+
+    assert follower.sync()
+    assert tracking_cache.snapshot.value.get("PKG1").status == "Delivered"
+    assert change_log.changed_since(sequence, change_log.sequence) == {"PKG1"}
+
+
+# Test case: after a refresh that changed nothing the leader only revalidates the file, and a follower keeps its version
+def test_unchanged_publish_revalidates_file(tmp_path):
+    path = str(tmp_path / "shared.bin")
+    leader, follower = SharedSnapshotCache(path), SharedSnapshotCache(path)
+    seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": [record("PKG1")]}), CacheValidators())
+    assert leader.publish()
+    inode, written = os.stat(path).st_ino, os.stat(path).st_mtime_ns
+
+    # e.g. the leader's refresh got a 304: the file is not rewritten, only its mtime moves
+    time.sleep(0.01)
+    assert not leader.publish()
+    assert os.stat(path).st_ino == inode
+    assert os.stat(path).st_mtime_ns > written
+
+    tracking_cache.invalidate()
+    follower.sync()
+    snapshot = tracking_cache.snapshot
+    time.sleep(0.01)
+    os.utime(path)
+    assert follower.sync()
+    assert tracking_cache.snapshot.value is snapshot.value
+    assert tracking_cache.snapshot.version == snapshot.version
+
+    # Something changed, so the next publish writes a new file
+    city_cache.put("Philadelphia", philadelphia)
+    assert leader.publish()
+    assert os.stat(path).st_ino != inode
+
+
+# Test case: a follower ignores a file the leader has not written or revalidated within the age limit
+def test_follower_ignores_old_file(tmp_path):
+    path = str(tmp_path / "shared.bin")
+    leader, follower = SharedSnapshotCache(path), SharedSnapshotCache(path, max_age_seconds=60)
+    seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": [record("PKG1")]}), CacheValidators())
+    leader.publish()
+    tracking_cache.invalidate()
+
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert not follower.sync()
+    assert tracking_cache.snapshot is None
+
+
+# Test case: while attached, requests serve a loaded snapshot however old instead of calling the upstream
+def test_attached_requests_do_not_refresh(tmp_path):
+    shared = SharedSnapshotCache(str(tmp_path / "shared.bin"))
+    tracking_cache.put(TrackingSnapshot.from_payload({"packages": [record("PKG1")]}), age=3600)
+    refresh = AsyncMock()
+
+    shared.attach()
+    try:
+        assert asyncio.run(tracking_cache.aget(refresh)).get("PKG1") is not None
+        refresh.assert_not_called()
+    finally:
+        shared.detach()
+    assert tracking_cache.refresh_on_read and carrier_cache.refresh_on_read
+
+
+# Test case: the leader refreshes from the upstream and publishes; a follower only reads the file
+def test_refresh_goes_to_upstream_only_on_leader(tmp_path):
+    path = str(tmp_path / "shared.bin")
+    leader, follower = SharedSnapshotCache(path), SharedSnapshotCache(path)
+
+    async def refresh():
+        seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": [record("PKG1")]}), CacheValidators())
+
+    with patch("app.services.shared_cache.refresh_tracking_snapshot", AsyncMock(side_effect=refresh)) as mock_refresh, \
+            patch("app.services.shared_cache.prefetch_cities_async", AsyncMock(return_value=0)):
+        asyncio.run(leader.refresh_tracking())
+        tracking_cache.invalidate()
+        asyncio.run(follower.refresh_tracking())
+
+    mock_refresh.assert_awaited_once()
+    assert tracking_cache.snapshot.value.get("PKG1") is not None
+    leader.resign()
+
+
+# Test case: prefetching requests only the snapshot's cities that are not cached yet
+@patch("app.services.package_service.async_client")
+def test_prefetch_cities(mock_async_client):
+    seed_tracking_snapshot(
+        TrackingSnapshot.from_payload({"packages": [record("PKG1"), record("PKG2", city="Newark")]}),
+        CacheValidators()
+    )
+    city_cache.put("Philadelphia", philadelphia)
+    mock_async_client.get = AsyncMock(return_value={
+        "city": "Newark", "state": "NJ", "timezone": "America/New_York", "lat": 40.74, "lon": -74.17
+    })
+
+    assert asyncio.run(prefetch_cities_async()) == 1
+    mock_async_client.get.assert_awaited_once_with("/locations/newark")
+    assert city_cache.contains("Newark")
@@ -0,0 +1,248 @@
+import asyncio
+import threading
+import time
+from unittest.mock import patch, MagicMock
+from app.services.snapshot_cache import SnapshotCache
+from app.services.package_service import get_all_packages_async, get_package_by_tracking_id_async, invalidate_tracking_cache
+
+# Test cases for the process-wide snapshot cache
+
+
+# Test case: a fresh snapshot is served without calling the loader again
+def test_get_reuses_fresh_snapshot():
+    cache = SnapshotCache(ttl_seconds=60)
+    load = MagicMock(return_value=["a"])
+
+    assert cache.get(load) == ["a"]
+    assert cache.get(load) == ["a"]
+    load.assert_called_once()
+    assert cache.snapshot.version == 1
+
+
+# Test case: an expired snapshot is refreshed
+def test_get_refreshes_expired_snapshot():
+    cache = SnapshotCache(ttl_seconds=0)
+    load = MagicMock(side_effect=[["old"], ["new"]])
+
+    assert cache.get(load) == ["old"]
+    assert cache.get(load) == ["new"]
+    assert cache.snapshot.version == 2
+
+
+# Test case: invalidate forces the next call to reload
+def test_invalidate_drops_snapshot():
+    cache = SnapshotCache(ttl_seconds=60)
+    load = MagicMock(return_value=["a"])
+
+    cache.get(load)
+    cache.invalidate()
+    assert cache.snapshot is None
+    cache.get(load)
+    assert load.call_count == 2
+
+
+# Test case: concurrent threads share a single refresh
+def test_get_single_flight_across_threads():
+    cache = SnapshotCache(ttl_seconds=60)
+    calls = []
+
+    def load():
+        calls.append(1)
+        time.sleep(0.05)
+        return ["a"]
+
+    threads = [threading.Thread(target=cache.get, args=(load,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+
+
+# Test case: concurrent coroutines await one in-flight refresh
+def test_aget_single_flight():
+    cache = SnapshotCache(ttl_seconds=60)
+    calls = []
+
+    async def load():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["a"]
+
+    async def run():
+        return await asyncio.gather(*(cache.aget(load) for _ in range(50)))
+
+    results = asyncio.run(run())
+
+    assert len(calls) == 1
+    assert all(result == ["a"] for result in results)
+
+
+# Test case: aget_snapshot hands back the version and value of one snapshot, unaffected by a later invalidate
+def test_aget_snapshot_is_consistent():
+    cache = SnapshotCache(ttl_seconds=60)
+
+    async def load():
+        return ["a"]
+
+    async def run():
+        snapshot = await cache.aget_snapshot(load)
+        cache.invalidate()
+        return snapshot
+
+    snapshot = asyncio.run(run())
+    assert (snapshot.value, snapshot.version) == (["a"], 1)
+    assert cache.snapshot is None
+
+
+# Test case: package lookups share one upstream call until the snapshot is invalidated
+@patch("app.services.package_service.async_client")
+def test_package_service_reuses_tracking_snapshot(mock_async_client):
+    payload = {"packages": [{
+        "tracking_id": "PKG123",
+        "carrier": "UPS",
+        "status": "In Transit",
+        "eta": "2025-07-20T10:00:00Z",
+        "last_updated": "2025-07-13T14:00:00Z",
+        "current_city": "Philadelphia"
+    }]}
+
+    async def stream_items(path, key, validators=None):
+        for item in payload[key]:
+            yield item
+
+    mock_async_client.stream_items = MagicMock(side_effect=stream_items)
+
+    asyncio.run(get_all_packages_async())
+    asyncio.run(get_package_by_tracking_id_async("PKG123"))
+    assert mock_async_client.stream_items.call_count == 1
+
+    invalidate_tracking_cache()
+    asyncio.run(get_all_packages_async())
+    assert mock_async_client.stream_items.call_count == 2
+
+
+# Test case: an expired snapshot within the staleness limit is served at once while async callers refresh it in the background
+def test_aget_serves_stale_while_revalidating():
+    cache = SnapshotCache(ttl_seconds=0, max_stale_seconds=60)
+    versions = iter([["old"], ["new"]])
+
+    async def load():
+        await asyncio.sleep(0.01)
+        return next(versions)
+
+    async def run():
+        first = await cache.aget(load)
+        stale = await cache.aget(load)
+        await asyncio.sleep(0.05)
+        return first, stale
+
+    assert asyncio.run(run()) == (["old"], ["old"])
+    assert cache.snapshot.value == ["new"]
+
+
+# Test case: sync callers are also served stale while one background thread refreshes
+def test_get_serves_stale_while_revalidating():
+    cache = SnapshotCache(ttl_seconds=0, max_stale_seconds=60)
+    refreshed = threading.Event()
+
+    def load_new():
+        time.sleep(0.02)
+        refreshed.set()
+        return ["new"]
+
+    cache.get(lambda: ["old"])
+    load = MagicMock(side_effect=load_new)
+    assert cache.get(load) == ["old"]
+    assert cache.get(load) == ["old"]
+
+    assert refreshed.wait(1)
+    time.sleep(0.01)
+    assert cache.snapshot.value == ["new"]
+    load.assert_called_once()
+
+
+# Test case: a failing background refresh keeps the last good snapshot, until it is older than the limit
+def test_failed_refresh_keeps_last_good_snapshot():
+    cache = SnapshotCache(ttl_seconds=0, max_stale_seconds=0.05)
+
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def run():
+        await cache.aget(lambda: asyncio.sleep(0, result=["good"]))
+        assert await cache.aget(fail) == ["good"]
+        await asyncio.sleep(0.06)
+        await cache.aget(fail)
+
+    try:
+        asyncio.run(run())
+        assert False, "expected the refresh error once the snapshot is too stale"
+    except RuntimeError as e:
+        assert str(e) == "upstream down"
+    assert cache.snapshot.value == ["good"]
+
+
+# Test case: an async refresh never waits on a sync load in progress on another thread
+def test_async_refresh_not_blocked_by_sync_load():
+    cache = SnapshotCache(ttl_seconds=60)
+    release = threading.Event()
+
+    def slow_load():
+        release.wait(5)
+        return ["sync"]
+
+    thread = threading.Thread(target=cache.get, args=(slow_load,))
+    thread.start()
+    time.sleep(0.02)  # The sync load now holds the refresh lock
+
+    started = time.monotonic()
+    snapshot = asyncio.run(cache.refresh(lambda: asyncio.sleep(0, result=["async"])))
+    assert time.monotonic() - started < 1
+    assert snapshot.value == ["async"]
+
+    release.set()
+    thread.join()
+
+
+# Test case: with refresh_on_read off, reads serve a loaded snapshot however old and only load when nothing is loaded
+def test_reads_without_refresh_on_read():
+    cache = SnapshotCache(ttl_seconds=0, refresh_on_read=False)
+    load = MagicMock(return_value=["a"])
+
+    assert cache.get(load) == ["a"]
+    assert cache.get(load) == ["a"]
+    assert asyncio.run(cache.aget(lambda: asyncio.sleep(0, result=["b"]))) == ["a"]
+    load.assert_called_once()
+
+    assert asyncio.run(cache.refresh(lambda: asyncio.sleep(0, result=["b"]))).value == ["b"]
+
+
+# Test case: a refresh in flight when the cache is invalidated is handed to its callers but not stored
+def test_invalidate_discards_inflight_refresh():
+    cache = SnapshotCache(ttl_seconds=60)
+
+    async def load():
+        await asyncio.sleep(0.01)
+        return ["old"]
+
+    async def run():
+        waiting = asyncio.ensure_future(cache.aget(load))
+        await asyncio.sleep(0)
+        cache.invalidate()
+        return await waiting
+
+    assert asyncio.run(run()) == ["old"]
+    assert cache.snapshot is None
+
+
+# Test case: a content key is computed once per new value and kept when the same value is stored again
+def test_content_key_per_value():
+    keys = MagicMock(side_effect=lambda value: "-".join(value))
+    cache = SnapshotCache(ttl_seconds=60, content_key=keys)
+
+    first = cache.put(["a"])
+    assert cache.put(first.value).key == "a"
+    assert cache.put(["b"]).key == "b"
+    assert keys.call_count == 2
@@ -0,0 +1,272 @@
+import asyncio
+import random
+import threading
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+from pydantic import ValidationError
+from app.models.package import Package, PackageStatus, SortBy
+from app.services.tracking_snapshot import TrackingSnapshot
+from app.services.package_service import get_all_packages_async, get_changes_async, get_packages_page_async, tracking_cache
+from app.services.package_store import PackageStore
+
+start = datetime(2025, 7, 1, tzinfo=timezone.utc)
+statuses = [status.value for status in PackageStatus]
+
+
+def make_packages(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        Package(
+            tracking_id=f"PKG{i:05d}",
+            carrier=rng.choice(["UPS", "FEDEX", "USPS"]),
+            status=rng.choice(statuses),
+            eta=start + timedelta(hours=rng.randint(0, 48)),  # Plenty of ties to exercise tie-breaking
+            last_updated=start - timedelta(hours=rng.randint(0, 48)),
+            current_city=rng.choice(["Philadelphia", "Chicago"])
+        )
+        for i in range(count)
+    ]
+
+
+def expected(packages, status, sort_by):
+    matching = [p for p in packages if status is None or p.status == status]
+    if sort_by == SortBy.eta:
+        return sorted(matching, key=lambda p: (p.eta, p.tracking_id))
+    if sort_by == SortBy.last_updated:
+        return sorted(matching, key=lambda p: (-p.last_updated.timestamp(), p.tracking_id))
+    return matching
+
+
+def assert_indexes_match(snapshot, packages):
+    for status in (None, *PackageStatus):
+        for sort_by in (None, *SortBy):
+            assert snapshot.select(status, sort_by) == expected(packages, status, sort_by)
+            # Pages without a sort are keyed by tracking ID
+            page, _ = snapshot.page(status, sort_by, limit=len(packages) + 1)
+            if sort_by is None:
+                assert page == sorted(expected(packages, status, None), key=lambda p: p.tracking_id)
+            else:
+                assert page == expected(packages, status, sort_by)
+
+
+# Test cases for the precomputed snapshot indexes
+
+
+# Test case: every status and sort combination is served from a precomputed index
+def test_indexes_match_filter_and_sort():
+    packages = make_packages(200)
+    assert_indexes_match(TrackingSnapshot(packages), packages)
+
+
+# Test case: select returns a copy, so callers cannot corrupt the index
+def test_select_returns_copy():
+    packages = make_packages(5)
+    snapshot = TrackingSnapshot(packages)
+
+    snapshot.select(None, SortBy.eta).clear()
+
+    assert len(snapshot.select(None, SortBy.eta)) == 5
+
+
+# Test case: a refresh with a few changes patches the previous indexes and records what changed
+def test_incremental_update_matches_rebuild():
+    packages = make_packages(200)
+    previous = TrackingSnapshot(packages)
+
+    updated = list(packages)
+    updated[3] = updated[3].model_copy(update={"status": PackageStatus.DELIVERED, "eta": start})
+    updated[10] = updated[10].model_copy(update={"last_updated": start + timedelta(days=1)})
+    del updated[50]
+    updated.append(make_packages(201, seed=9)[200])
+
+    with patch.object(TrackingSnapshot, "_build_orderings", side_effect=AssertionError("should patch")):
+        snapshot = TrackingSnapshot(updated, previous=previous)
+
+    assert_indexes_match(snapshot, updated)
+    assert snapshot.changed_ids == {"PKG00003", "PKG00010", "PKG00200"}
+    assert snapshot.removed_ids == {"PKG00050"}
+    # The previous snapshot's indexes are untouched
+    assert_indexes_match(previous, packages)
+
+
+# Test case: a refresh with many changes rebuilds the indexes
+@patch("app.services.tracking_snapshot.config.TRACKING_INCREMENTAL_MAX_CHANGES", 1)
+def test_large_change_rebuilds():
+    previous = TrackingSnapshot(make_packages(50))
+    packages = make_packages(50, seed=8)
+
+    with patch.object(TrackingSnapshot, "_patch_orderings", side_effect=AssertionError("should rebuild")):
+        snapshot = TrackingSnapshot(packages, previous=previous)
+
+    assert_indexes_match(snapshot, packages)
+
+
+# Test case: rows materialize back into equal Package models
+def test_store_round_trip():
+    packages = make_packages(20)
+    snapshot = TrackingSnapshot(packages)
+
+    assert [snapshot.get(p.tracking_id) for p in packages] == packages
+    assert snapshot.get("NOPE") is None
+    assert snapshot.get("PKG00001").model_dump_json() == packages[1].model_dump_json()
+
+
+# Test case: timestamps come back in the offset the upstream sent, or naive, and a changed offset is a change
+def test_store_keeps_timestamp_offsets():
+    records = [
+        {"tracking_id": "PKG1", "carrier": "UPS", "status": "In Transit", "current_city": "Berlin",
+         "eta": "2025-07-20T10:00:00+02:00", "last_updated": "2025-07-13T14:00:00"},
+        {"tracking_id": "PKG2", "carrier": "UPS", "status": "In Transit", "current_city": "Delhi",
+         "eta": "2025-07-20T10:00:00+05:30", "last_updated": "2025-07-13T14:00:00Z"}
+    ]
+    snapshot = TrackingSnapshot.from_items(records)
+
+    first, second = snapshot.get("PKG1"), snapshot.get("PKG2")
+    assert first.model_dump(mode="json")["eta"] == "2025-07-20T10:00:00+02:00"
+    assert first.last_updated == datetime(2025, 7, 13, 14) and first.last_updated.tzinfo is None
+    assert second.model_dump(mode="json")["eta"] == "2025-07-20T10:00:00+05:30"
+    assert second.model_dump(mode="json")["last_updated"] == "2025-07-13T14:00:00Z"
+    assert [p.tracking_id for p in snapshot.select(None, SortBy.eta)] == ["PKG2", "PKG1"]  # Ordered by instant
+
+    records[0] = dict(records[0], eta="2025-07-20T08:00:00Z")  # Same instant, other offset
+    refreshed = TrackingSnapshot.from_items(records, previous=snapshot)
+    assert refreshed.changed_ids == {"PKG1"}
+    assert refreshed.get("PKG1").model_dump(mode="json")["eta"] == "2025-07-20T08:00:00Z"
+
+
+# Test case: the content digest depends only on the packages, however each process arrived at them
+def test_digest_follows_content():
+    packages = make_packages(50)
+    fresh = TrackingSnapshot(packages)
+    # Another worker's history: different rows, string codes and dead rows before reaching the same packages
+    other = TrackingSnapshot(list(reversed(make_packages(80, seed=3))))
+    converged = TrackingSnapshot(packages, previous=other)
+
+    assert converged.digest == fresh.digest
+    assert TrackingSnapshot.from_store(converged.live_store()).digest == fresh.digest
+    assert TrackingSnapshot(packages, previous=fresh).digest == fresh.digest
+    assert TrackingSnapshot(packages[1:]).digest != fresh.digest
+    assert TrackingSnapshot(list(reversed(packages))).digest != fresh.digest
+
+
+# Test case: strings are interned as codes in the columnar store
+def test_store_interns_strings():
+    snapshot = TrackingSnapshot(make_packages(100))
+
+    assert sorted(snapshot.store.carriers.values) == ["FEDEX", "UPS", "USPS"]
+    assert sorted(snapshot.store.cities.values) == ["Chicago", "Philadelphia"]
+    assert snapshot.store.eta.itemsize == 8
+
+
+# Test case: rows of removed packages are compacted once they outnumber live rows
+@patch("app.services.tracking_snapshot.config.TRACKING_COMPACT_MIN_DEAD_ROWS", 0)
+def test_removed_rows_compacted():
+    packages = make_packages(100)
+    previous = TrackingSnapshot(packages)
+
+    kept = packages[:10]
+    snapshot = TrackingSnapshot(kept, previous=previous)
+
+    assert len(snapshot.store) == 10
+    assert len(snapshot.removed_ids) == 90
+    assert_indexes_match(snapshot, kept)
+
+
+# Test case: records are validated in batches and one invalid record rejects the whole snapshot
+@patch("app.services.tracking_snapshot.config.VALIDATION_BATCH_SIZE", 3)
+def test_invalid_record_rejects_snapshot():
+    records = [p.model_dump(mode="json") for p in make_packages(10)]
+    assert len(TrackingSnapshot.from_items(iter(records))) == 10
+
+    records[7]["eta"] = "not-a-date"
+    with pytest.raises(ValidationError):
+        TrackingSnapshot.from_items(iter(records))
+
+
+# Test case: a snapshot refresh with an invalid record keeps serving the previous snapshot's data
+@patch("app.services.package_service.async_client")
+def test_invalid_refresh_keeps_previous_snapshot(mock_async_client):
+    records = [p.model_dump(mode="json") for p in make_packages(3)]
+
+    async def stream_items(path, key, validators=None):
+        for item in records:
+            yield item
+
+    mock_async_client.stream_items = stream_items
+    asyncio.run(get_all_packages_async())
+    version = tracking_cache.snapshot.version
+
+    records = records + [{**records[0], "tracking_id": "BAD", "status": "Lost"}]
+    with patch.object(tracking_cache, "ttl_seconds", 0), patch.object(tracking_cache, "max_stale_seconds", 0):
+        with pytest.raises(ValidationError):
+            asyncio.run(get_all_packages_async())
+
+    assert tracking_cache.snapshot.version == version
+    assert len(tracking_cache.snapshot.value) == 3
+
+
+# Test case: the async loader validates and builds the snapshot on worker threads, not on the event loop
+@patch("app.services.package_service.async_client")
+def test_async_load_builds_off_the_loop(mock_async_client):
+    records = [p.model_dump(mode="json") for p in make_packages(3)]
+
+    async def stream_items(path, key, validators=None):
+        for item in records:
+            yield item
+
+    mock_async_client.stream_items = stream_items
+    build = TrackingSnapshot.__init__
+    threads = []
+
+    def record_thread(self, *args, **kwargs):
+        threads.append(threading.current_thread())
+        build(self, *args, **kwargs)
+
+    with patch.object(TrackingSnapshot, "__init__", record_thread):
+        assert len(asyncio.run(get_all_packages_async())) == 3
+
+    assert threads and threading.main_thread() not in threads
+
+
+# Test case: query results are materialized on worker threads, not on the event loop
+def test_async_queries_materialize_off_the_loop():
+    snapshot = TrackingSnapshot(make_packages(3))
+    materialize = PackageStore.package
+    threads = []
+
+    def record_thread(self, index):
+        threads.append(threading.current_thread())
+        return materialize(self, index)
+
+    async def run():
+        await get_all_packages_async(snapshot=snapshot)
+        await get_packages_page_async(limit=2, snapshot=snapshot)
+        await get_changes_async(snapshot=snapshot)
+
+    with patch.object(PackageStore, "package", record_thread):
+        asyncio.run(run())
+
+    assert len(threads) == 3 + 2 + 3
+    assert threading.main_thread() not in threads
+
+
+# Test case: a 200 with the same packages keeps the cached snapshot and its version
+@patch("app.services.package_service.async_client")
+def test_identical_refresh_keeps_snapshot(mock_async_client):
+    records = [p.model_dump(mode="json") for p in make_packages(3)]
+
+    async def stream_items(path, key, validators=None):
+        for item in records:
+            yield item
+
+    mock_async_client.stream_items = stream_items
+    asyncio.run(get_all_packages_async())
+    snapshot = tracking_cache.snapshot
+
+    with patch.object(tracking_cache, "ttl_seconds", 0), patch.object(tracking_cache, "max_stale_seconds", 0):
+        asyncio.run(get_all_packages_async())
+
+    assert tracking_cache.snapshot is not snapshot  # Reloaded...
+    assert tracking_cache.snapshot.value is snapshot.value  # ...but nothing changed
+    assert tracking_cache.snapshot.version == snapshot.version
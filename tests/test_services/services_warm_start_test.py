@@ -0,0 +1,177 @@
+import asyncio
+import os
+import time
+import pytest
+from unittest.mock import patch
+from app.models.carrier import Carrier
+from app.models.enriched_package import CityMetadata
+from app.models.package import PackageStatus, SortBy
+from app.services.carrier_service import carrier_cache, seed_carriers
+from app.services.http_client import CacheValidators
+from app.services.package_service import city_cache, seed_tracking_snapshot, tracking_cache
+from app.services.snapshot_file import SnapshotFileError, read_snapshot_file, write_snapshot_file
+from app.services.tracking_snapshot import TrackingSnapshot
+from app.services.warm_start import SnapshotPersister, load_warm_start, save_warm_start
+
+# Test cases for the snapshot file and warm startup
+
+
+def record(tracking_id, status="In Transit", city="Philadelphia", eta="2025-06-15T18:00:00Z"):
+    return {
+        "tracking_id": tracking_id,
+        "carrier": "UPS" if tracking_id.endswith(("1", "3")) else "FedEx",
+        "status": status,
+        "eta": eta,
+        "last_updated": "2025-06-12T09:30:00Z",
+        "current_city": city
+    }
+
+
+packages = [
+    record("PKG1"),
+    record("PKG2", status="Delivered", city="Newark", eta="2025-06-13T12:00:00Z"),
+    record("PKG3", status="Out for Delivery", city="Zürich"),
+    record("PKG4", eta="2025-06-14T08:00:00Z")
+]
+
+
+# Test case: a package store round-trips through the file column for column, dead rows dropped
+def test_snapshot_file_round_trip(tmp_path):
+    previous = TrackingSnapshot.from_payload({"packages": packages})
+    snapshot = TrackingSnapshot.from_payload({"packages": packages[1:]}, previous=previous)
+    path = str(tmp_path / "snapshot.bin")
+
+    write_snapshot_file(path, snapshot.live_store(), {"answer": 42})
+    contents = read_snapshot_file(path)
+
+    assert contents.meta == {"answer": 42}
+    assert contents.age() < 5
+    restored = TrackingSnapshot.from_store(contents.store)
+    assert len(restored) == 3
+    assert restored.select(None, None) == snapshot.select(None, None)
+    for status in (None, *PackageStatus):
+        for sort_by in (None, *SortBy):
+            assert restored.select(status, sort_by) == snapshot.select(status, sort_by)
+
+
+# Test case: truncated or foreign files are rejected rather than half-loaded
+def test_snapshot_file_rejects_bad_files(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot_file(path, TrackingSnapshot.from_payload({"packages": packages}).store, {})
+    with open(path, "rb") as f:
+        data = f.read()
+
+    with open(path, "wb") as f:
+        f.write(data[:-16])
+    with pytest.raises(SnapshotFileError):
+        read_snapshot_file(path)
+
+    with open(path, "wb") as f:
+        f.write(b"not a snapshot file at all")
+    with pytest.raises(SnapshotFileError):
+        read_snapshot_file(path)
+
+
+# Test case: saved caches are seeded as stale on load, with their validators, without overriding loaded ones
+def test_warm_start_seeds_caches(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": packages}), CacheValidators('"t1"'))
+    seed_carriers([Carrier(id="UPS", name="United Parcel Service")], CacheValidators(None, "Wed, 11 Jun 2025 10:00:00 GMT"))
+    city_cache.put("Philadelphia", CityMetadata(city="Philadelphia", state="PA", timezone="America/New_York", lat=39.95, lon=-75.17))
+    assert save_warm_start(path)
+
+    tracking_cache.invalidate()
+    carrier_cache.invalidate()
+    city_cache.clear()
+    assert load_warm_start(path)
+
+    snapshot = tracking_cache.snapshot
+    assert [pkg.tracking_id for pkg in snapshot.value.select(None, SortBy.eta)] == ["PKG2", "PKG4", "PKG1", "PKG3"]
+    assert snapshot.value.sequence > 0
+    assert not tracking_cache.is_fresh(snapshot) and tracking_cache.is_usable(snapshot)
+    assert carrier_cache.snapshot.value == [Carrier(id="UPS", name="United Parcel Service")]
+    assert city_cache.get("philadelphia", lambda city: None).lat == 39.95
+
+    from app.services import carrier_service, package_service
+    assert package_service._last_tracking_validators.etag == '"t1"'
+    assert carrier_service._last_carrier_validators.last_modified == "Wed, 11 Jun 2025 10:00:00 GMT"
+
+    # A second load finds the caches populated and leaves them alone
+    assert load_warm_start(path)
+    assert tracking_cache.snapshot is snapshot
+
+
+# Test case: a missing, corrupt or too old file is ignored
+def test_warm_start_ignores_unusable_files(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    assert not load_warm_start(path)
+
+    with open(path, "wb") as f:
+        f.write(b"garbage")
+    assert not load_warm_start(path)
+
+    seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": packages}), CacheValidators())
+    save_warm_start(path)
+    tracking_cache.invalidate()
+    assert not load_warm_start(path, max_age_seconds=-1)
+    assert tracking_cache.snapshot is None
+
+
+# Test case: the persister only rewrites the file after a snapshot changed
+def test_persister_saves_on_change(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    persister = SnapshotPersister(path, interval_seconds=3600)
+    assert not asyncio.run(persister.load())
+    assert not asyncio.run(persister.save_if_changed())
+
+    seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": packages}), CacheValidators())
+    assert asyncio.run(persister.save_if_changed())
+    written = os.stat(path).st_mtime_ns
+
+    time.sleep(0.01)
+    assert not asyncio.run(persister.save_if_changed())
+    assert os.stat(path).st_mtime_ns == written
+
+
+# Test case: the persister saves when a city is evicted for another, though the count is unchanged
+def test_persister_saves_on_city_eviction(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    persister = SnapshotPersister(path, interval_seconds=3600)
+    seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": packages}), CacheValidators())
+    with patch.object(city_cache, "maxsize", 1):
+        city_cache.put("Philadelphia", CityMetadata(city="Philadelphia", state="PA", timezone="America/New_York", lat=39.95, lon=-75.17))
+        assert asyncio.run(persister.save_if_changed())
+
+        city_cache.put("Newark", CityMetadata(city="Newark", state="NJ", timezone="America/New_York", lat=40.74, lon=-74.17))
+        assert [key for key, _, _ in city_cache.entries()] == ["newark"]
+        assert asyncio.run(persister.save_if_changed())
+
+
+# Test case: a file saved from another upstream is ignored
+def test_warm_start_ignores_other_upstream(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": packages}), CacheValidators())
+    with patch("app.config.MOCK_API_BASE_URL", "http://localhost:9999"):
+        assert save_warm_start(path)
+
+    tracking_cache.invalidate()
+    assert not load_warm_start(path)
+    assert tracking_cache.snapshot is None
+
+
+# Test case: city entries are restored with the TTL they had left, expired ones not at all
+def test_warm_start_keeps_city_ttl(tmp_path):
+    path = str(tmp_path / "snapshot.bin")
+    seed_tracking_snapshot(TrackingSnapshot.from_payload({"packages": packages}), CacheValidators())
+    city_cache.put("Philadelphia", CityMetadata(city="Philadelphia", state="PA", timezone="America/New_York", lat=39.95, lon=-75.17), 30)
+    city_cache.put("Newark", CityMetadata(city="Newark", state="NJ", timezone="America/New_York", lat=40.74, lon=-74.17), 0.05)
+    assert save_warm_start(path)
+
+    time.sleep(0.06)
+    tracking_cache.invalidate()
+    city_cache.clear()
+    assert load_warm_start(path)
+
+    entries = {key: ttl for key, _, ttl in city_cache.entries()}
+    assert list(entries) == ["philadelphia"]
+    assert 0 < entries["philadelphia"] <= 30